@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date, timedelta
 
-from app.database.database import get_db
+from app.core.cache import cache
+from app.database.database import get_async_db
 from app.schemas.schemas import HealthAnalytics, PatientStatistics
-from app.services.analytics_service import AnalyticsService
+from app.services.async_services import AsyncAnalyticsService
+from app.services.patient_export_service import EXPORT_MEDIA_TYPES, stream_patient_export
+from app.services.population_risk_service import RISK_LEVELS
 
 router = APIRouter()
 
@@ -14,42 +18,42 @@ router = APIRouter()
 async def get_health_analytics(
     patient_id: str,
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить аналитику здоровья пациента
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    analytics = service.get_health_analytics(patient_id, days)
+    analytics = await service.get_health_analytics(patient_id, days)
     return analytics
 
 
 @router.get("/patient/{patient_id}/statistics", response_model=PatientStatistics)
 async def get_patient_statistics(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить общую статистику пациента
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    statistics = service.get_patient_statistics(patient_id)
+    statistics = await service.get_patient_statistics(patient_id)
     return statistics
 
 
@@ -58,15 +62,15 @@ async def get_health_trends(
     patient_id: str,
     metric: str,
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить тренды конкретной метрики здоровья
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
@@ -84,53 +88,69 @@ async def get_health_trends(
             detail=f"Недопустимая метрика. Доступные: {', '.join(valid_metrics)}"
         )
     
-    trends = service.get_health_trends(patient_id, metric, days)
+    trends = await service.get_health_trends(patient_id, metric, days)
     return trends
 
 
 @router.get("/dashboard/overview", response_model=dict)
 async def get_dashboard_overview(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить общий обзор для дашборда
     """
-    service = AnalyticsService(db)
-    overview = service.get_dashboard_overview()
+    service = AsyncAnalyticsService(db)
+    overview = await service.get_dashboard_overview()
     return overview
 
 
+@router.get("/dashboard/cache-stats", response_model=dict)
+async def get_dashboard_cache_stats():
+    """
+    Получить счетчики попаданий и промахов кэша дашборда (по текущему процессу)
+    """
+    return cache.get_stats()
+
+
 @router.get("/alerts/critical", response_model=List[dict])
 async def get_critical_alerts(
+    hours: int = Query(24, ge=1, le=168),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить критические уведомления
     """
-    service = AnalyticsService(db)
-    alerts = service.get_critical_alerts(limit)
+    service = AsyncAnalyticsService(db)
+    alerts = await service.get_critical_alerts(hours, limit)
     return alerts
 
 
-@router.get("/patients/risk-assessment", response_model=List[dict])
+@router.get("/patients/risk-assessment", response_model=dict)
 async def get_patients_risk_assessment(
     risk_level: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=500),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить оценку рисков пациентов
+    Получить пациентов с наибольшим риском (оценки пересчитываются периодически).
+    В computed_at - время последнего пересчета; 503, если пересчета еще не было.
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
-    if risk_level and risk_level not in ['low', 'medium', 'high', 'critical']:
+    if risk_level and risk_level not in RISK_LEVELS:
         raise HTTPException(
             status_code=400,
-            detail="Недопустимый уровень риска. Доступные: low, medium, high, critical"
+            detail=f"Недопустимый уровень риска. Доступные: {', '.join(RISK_LEVELS)}"
+        )
+    
+    risk_assessment = await service.get_patients_risk_assessment(risk_level, limit)
+    if risk_assessment is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Оценки риска еще не рассчитаны: запустите refresh_population_risk"
         )
     
-    risk_assessment = service.get_patients_risk_assessment(risk_level, limit)
     return risk_assessment
 
 
@@ -139,12 +159,12 @@ async def get_appointment_statistics(
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
     doctor_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить статистику назначений
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Устанавливаем дефолтные даты если не указаны
     if not date_from:
@@ -158,7 +178,7 @@ async def get_appointment_statistics(
             detail="Дата начала не может быть больше даты окончания"
         )
     
-    statistics = service.get_appointment_statistics(date_from, date_to, doctor_id)
+    statistics = await service.get_appointment_statistics(date_from, date_to, doctor_id)
     return statistics
 
 
@@ -166,12 +186,12 @@ async def get_appointment_statistics(
 async def get_health_metrics_summary(
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить сводку по метрикам здоровья
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Устанавливаем дефолтные даты если не указаны
     if not date_from:
@@ -185,27 +205,27 @@ async def get_health_metrics_summary(
             detail="Дата начала не может быть больше даты окончания"
         )
     
-    summary = service.get_health_metrics_summary(date_from, date_to)
+    summary = await service.get_health_metrics_summary(date_from, date_to)
     return summary
 
 
 @router.get("/organs/health-status", response_model=List[dict])
 async def get_organs_health_status(
     patient_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить статус здоровья органов
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
-    if patient_id and not service.patient_exists(patient_id):
+    if patient_id and not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    organs_status = service.get_organs_health_status(patient_id)
+    organs_status = await service.get_organs_health_status(patient_id)
     return organs_status
 
 
@@ -213,21 +233,21 @@ async def get_organs_health_status(
 async def get_health_predictions(
     patient_id: str,
     days_ahead: int = Query(30, ge=1, le=90),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить прогнозы здоровья пациента
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    predictions = service.get_health_predictions(patient_id, days_ahead)
+    predictions = await service.get_health_predictions(patient_id, days_ahead)
     return predictions
 
 
@@ -235,12 +255,12 @@ async def get_health_predictions(
 async def get_monthly_report(
     year: int = Query(..., ge=2020, le=2030),
     month: int = Query(..., ge=1, le=12),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить месячный отчет
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     try:
         report_date = date(year, month, 1)
@@ -256,25 +276,27 @@ async def get_monthly_report(
             detail="Нельзя получить отчет для будущего месяца"
         )
     
-    report = service.get_monthly_report(year, month)
+    report = await service.get_monthly_report(year, month)
     return report
 
 
-@router.get("/export/patient-data/{patient_id}", response_model=dict)
+@router.get("/export/patient-data/{patient_id}")
 async def export_patient_data(
     patient_id: str,
-    format: str = Query("json", regex="^(json|csv|pdf)$"),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    gzip: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Экспортировать данные пациента
+    Экспортировать данные пациента: показатели здоровья, назначения и медицинские записи.
+    Ответ передается потоком (json, ndjson или csv), gzip=true - сжатый файл .gz.
     """
-    service = AnalyticsService(db)
+    service = AsyncAnalyticsService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
@@ -292,7 +314,14 @@ async def export_patient_data(
             detail="Дата начала не может быть больше даты окончания"
         )
     
-    export_data = service.export_patient_data(
-        patient_id, format, date_from, date_to
-    )
-    return export_data
\ No newline at end of file
+    filename = f"patient_{patient_id}_{date_from.isoformat()}_{date_to.isoformat()}.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        stream_patient_export(patient_id, format, date_from, date_to, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
\ No newline at end of file
@@ -1,20 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, date
 
-from app.database.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.database.database import get_async_db
 from app.schemas.schemas import (
     Appointment, AppointmentCreate, AppointmentUpdate, 
     ApiResponse, AppointmentStatusEnum
 )
-from app.services.appointment_service import AppointmentService
+from app.services.async_services import AsyncAppointmentService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Appointment])
 async def get_appointments(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     patient_id: Optional[str] = Query(None),
@@ -22,36 +24,45 @@ async def get_appointments(
     status: Optional[AppointmentStatusEnum] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить список назначений с фильтрацией
+    Получить список назначений с фильтрацией.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor и передается в cursor.
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
-    appointments = service.get_appointments(
-        skip=skip,
-        limit=limit,
-        patient_id=patient_id,
-        doctor_id=doctor_id,
-        status=status,
-        date_from=date_from,
-        date_to=date_to
-    )
+    try:
+        page = await service.get_appointments(
+            skip=skip,
+            limit=limit,
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            status=status,
+            date_from=date_from,
+            date_to=date_to,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return appointments
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    
+    return page.items
 
 
 @router.get("/{appointment_id}", response_model=Appointment)
 async def get_appointment(
     appointment_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить информацию о конкретном назначении
     """
-    service = AppointmentService(db)
-    appointment = service.get_appointment(appointment_id)
+    service = AsyncAppointmentService(db)
+    appointment = await service.get_appointment(appointment_id)
     
     if not appointment:
         raise HTTPException(status_code=404, detail="Назначение не найдено")
@@ -62,32 +73,33 @@ async def get_appointment(
 @router.post("/", response_model=Appointment)
 async def create_appointment(
     appointment_data: AppointmentCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать новое назначение
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(appointment_data.patient_id):
+    if not await service.patient_exists(appointment_data.patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
     # Проверяем, что врач существует
-    if not service.doctor_exists(appointment_data.doctor_id):
+    if not await service.doctor_exists(appointment_data.doctor_id):
         raise HTTPException(
             status_code=404,
             detail="Врач не найден"
         )
     
     # Проверяем доступность времени
-    if service.is_time_slot_taken(
+    if await service.is_time_slot_taken(
         appointment_data.doctor_id,
         appointment_data.appointment_date,
-        appointment_data.appointment_time
+        appointment_data.appointment_time,
+        duration=appointment_data.duration
     ):
         raise HTTPException(
             status_code=400,
@@ -106,7 +118,7 @@ async def create_appointment(
             detail="Время назначения должно быть в будущем"
         )
     
-    appointment = service.create_appointment(appointment_data)
+    appointment = await service.create_appointment(appointment_data)
     return appointment
 
 
@@ -114,15 +126,15 @@ async def create_appointment(
 async def update_appointment(
     appointment_id: str,
     appointment_data: AppointmentUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить назначение
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, существует ли назначение
-    existing_appointment = service.get_appointment(appointment_id)
+    existing_appointment = await service.get_appointment(appointment_id)
     if not existing_appointment:
         raise HTTPException(status_code=404, detail="Назначение не найдено")
     
@@ -131,33 +143,34 @@ async def update_appointment(
         new_date = appointment_data.appointment_date or existing_appointment.appointment_date
         new_time = appointment_data.appointment_time or existing_appointment.appointment_time
         doctor_id = appointment_data.doctor_id or existing_appointment.doctor_id
+        duration = appointment_data.duration or existing_appointment.duration
         
-        if service.is_time_slot_taken(doctor_id, new_date, new_time, appointment_id):
+        if await service.is_time_slot_taken(doctor_id, new_date, new_time, appointment_id, duration):
             raise HTTPException(
                 status_code=400,
                 detail="Это время уже занято"
             )
     
-    appointment = service.update_appointment(appointment_id, appointment_data)
+    appointment = await service.update_appointment(appointment_id, appointment_data)
     return appointment
 
 
 @router.delete("/{appointment_id}", response_model=ApiResponse)
 async def cancel_appointment(
     appointment_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отменить назначение
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, существует ли назначение
-    existing_appointment = service.get_appointment(appointment_id)
+    existing_appointment = await service.get_appointment(appointment_id)
     if not existing_appointment:
         raise HTTPException(status_code=404, detail="Назначение не найдено")
     
-    success = service.cancel_appointment(appointment_id)
+    success = await service.cancel_appointment(appointment_id)
     
     if success:
         return ApiResponse(
@@ -176,35 +189,69 @@ async def update_appointment_status(
     appointment_id: str,
     status: AppointmentStatusEnum,
     notes: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить статус назначения
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, существует ли назначение
-    existing_appointment = service.get_appointment(appointment_id)
+    existing_appointment = await service.get_appointment(appointment_id)
     if not existing_appointment:
         raise HTTPException(status_code=404, detail="Назначение не найдено")
     
-    appointment = service.update_appointment_status(appointment_id, status, notes)
+    appointment = await service.update_appointment_status(appointment_id, status, notes)
     return appointment
 
 
+@router.get("/available-slots/range", response_model=dict)
+async def get_available_slots_range(
+    doctor_ids: List[str] = Query(..., min_length=1),
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить сетку слотов для нескольких врачей за период (например, неделя отделения)
+    """
+    service = AsyncAppointmentService(db)
+    
+    if date_from < datetime.now().date():
+        raise HTTPException(
+            status_code=400,
+            detail="Нельзя получить слоты для прошедшей даты"
+        )
+    
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=400,
+            detail="Дата начала не может быть больше даты окончания"
+        )
+    
+    if (date_to - date_from).days > 31:
+        raise HTTPException(
+            status_code=400,
+            detail="Период не может превышать 31 день"
+        )
+    
+    available_slots = await service.get_available_slots_range(doctor_ids, date_from, date_to)
+    return available_slots
+
+
 @router.get("/available-slots/{doctor_id}", response_model=List[dict])
 async def get_available_slots(
     doctor_id: str,
     date: date,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить доступные временные слоты для врача на определенную дату
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, что врач существует
-    if not service.doctor_exists(doctor_id):
+    if not await service.doctor_exists(doctor_id):
         raise HTTPException(
             status_code=404,
             detail="Врач не найден"
@@ -217,7 +264,7 @@ async def get_available_slots(
             detail="Нельзя получить слоты для прошедшей даты"
         )
     
-    available_slots = service.get_available_slots(doctor_id, date)
+    available_slots = await service.get_available_slots(doctor_id, date)
     return available_slots
 
 
@@ -225,21 +272,21 @@ async def get_available_slots(
 async def get_upcoming_appointments(
     patient_id: str,
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить предстоящие назначения пациента
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    appointments = service.get_upcoming_appointments(patient_id, limit)
+    appointments = await service.get_upcoming_appointments(patient_id, limit)
     return appointments
 
 
@@ -248,21 +295,21 @@ async def get_doctor_appointment_statistics(
     doctor_id: str,
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить статистику назначений врача
     """
-    service = AppointmentService(db)
+    service = AsyncAppointmentService(db)
     
     # Проверяем, что врач существует
-    if not service.doctor_exists(doctor_id):
+    if not await service.doctor_exists(doctor_id):
         raise HTTPException(
             status_code=404,
             detail="Врач не найден"
         )
     
-    statistics = service.get_doctor_appointment_statistics(
+    statistics = await service.get_doctor_appointment_statistics(
         doctor_id, date_from, date_to
     )
     return statistics
\ No newline at end of file
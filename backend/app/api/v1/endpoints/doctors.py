@@ -1,47 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from app.database.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.database.database import get_async_db
 from app.schemas.schemas import Doctor, DoctorCreate, DoctorUpdate, ApiResponse
-from app.services.doctor_service import DoctorService
+from app.services.async_services import AsyncDoctorService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Doctor])
 async def get_doctors(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     specialization: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить список всех врачей
+    Получить список всех врачей.
+    Без поиска список отсортирован по фамилии; курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor и передается в cursor.
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     if search:
-        doctors = service.search_doctors(search, skip, limit)
-    elif specialization:
-        doctors = service.get_doctors_by_specialization(specialization, skip, limit)
-    else:
-        doctors = service.get_doctors(skip, limit)
+        return await service.search_doctors(search, skip, limit)
+    if specialization:
+        return await service.get_doctors_by_specialization(specialization, skip, limit)
+    
+    try:
+        page = await service.get_doctors(skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return doctors
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    
+    return page.items
 
 
 @router.get("/{doctor_id}", response_model=Doctor)
 async def get_doctor(
     doctor_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить информацию о конкретном враче
     """
-    service = DoctorService(db)
-    doctor = service.get_doctor(doctor_id)
+    service = AsyncDoctorService(db)
+    doctor = await service.get_doctor(doctor_id)
     
     if not doctor:
         raise HTTPException(status_code=404, detail="Врач не найден")
@@ -52,15 +63,15 @@ async def get_doctor(
 @router.post("/", response_model=Doctor)
 async def create_doctor(
     doctor_data: DoctorCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать нового врача
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     # Проверяем уникальность email
-    existing_doctor = service.get_doctor_by_email(doctor_data.email)
+    existing_doctor = await service.get_doctor_by_email(doctor_data.email)
     if existing_doctor:
         raise HTTPException(
             status_code=400,
@@ -68,14 +79,14 @@ async def create_doctor(
         )
     
     # Проверяем уникальность номера лицензии
-    existing_license = service.get_doctor_by_license(doctor_data.license_number)
+    existing_license = await service.get_doctor_by_license(doctor_data.license_number)
     if existing_license:
         raise HTTPException(
             status_code=400,
             detail="Врач с таким номером лицензии уже существует"
         )
     
-    doctor = service.create_doctor(doctor_data)
+    doctor = await service.create_doctor(doctor_data)
     return doctor
 
 
@@ -83,21 +94,21 @@ async def create_doctor(
 async def update_doctor(
     doctor_id: str,
     doctor_data: DoctorUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить информацию о враче
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     # Проверяем, существует ли врач
-    existing_doctor = service.get_doctor(doctor_id)
+    existing_doctor = await service.get_doctor(doctor_id)
     if not existing_doctor:
         raise HTTPException(status_code=404, detail="Врач не найден")
     
     # Проверяем уникальность email при обновлении
     if doctor_data.email:
-        email_doctor = service.get_doctor_by_email(doctor_data.email)
+        email_doctor = await service.get_doctor_by_email(doctor_data.email)
         if email_doctor and email_doctor.id != doctor_id:
             raise HTTPException(
                 status_code=400,
@@ -106,33 +117,33 @@ async def update_doctor(
     
     # Проверяем уникальность лицензии при обновлении
     if doctor_data.license_number:
-        license_doctor = service.get_doctor_by_license(doctor_data.license_number)
+        license_doctor = await service.get_doctor_by_license(doctor_data.license_number)
         if license_doctor and license_doctor.id != doctor_id:
             raise HTTPException(
                 status_code=400,
                 detail="Врач с таким номером лицензии уже существует"
             )
     
-    doctor = service.update_doctor(doctor_id, doctor_data)
+    doctor = await service.update_doctor(doctor_id, doctor_data)
     return doctor
 
 
 @router.delete("/{doctor_id}", response_model=ApiResponse)
 async def delete_doctor(
     doctor_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удалить врача
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     # Проверяем, существует ли врач
-    existing_doctor = service.get_doctor(doctor_id)
+    existing_doctor = await service.get_doctor(doctor_id)
     if not existing_doctor:
         raise HTTPException(status_code=404, detail="Врач не найден")
     
-    success = service.delete_doctor(doctor_id)
+    success = await service.delete_doctor(doctor_id)
     
     if success:
         return ApiResponse(
@@ -148,13 +159,13 @@ async def delete_doctor(
 
 @router.get("/specializations/list", response_model=List[str])
 async def get_specializations(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить список всех специализаций
     """
-    service = DoctorService(db)
-    specializations = service.get_specializations()
+    service = AsyncDoctorService(db)
+    specializations = await service.get_specializations()
     return specializations
 
 
@@ -163,55 +174,67 @@ async def get_doctor_appointments(
     doctor_id: str,
     status: Optional[str] = Query(None),
     date: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить назначения врача
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     # Проверяем, существует ли врач
-    doctor = service.get_doctor(doctor_id)
+    doctor = await service.get_doctor(doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Врач не найден")
     
-    appointments = service.get_doctor_appointments(doctor_id, status, date)
+    appointments = await service.get_doctor_appointments(doctor_id, status, date)
     return appointments
 
 
 @router.get("/{doctor_id}/patients", response_model=List[dict])
 async def get_doctor_patients(
+    response: Response,
     doctor_id: str,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить пациентов врача
+    Получить пациентов врача, отсортированных по ID пациента.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor и передается в cursor.
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     # Проверяем, существует ли врач
-    doctor = service.get_doctor(doctor_id)
+    doctor = await service.get_doctor(doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Врач не найден")
     
-    patients = service.get_doctor_patients(doctor_id)
-    return patients
+    try:
+        page = await service.get_doctor_patients(doctor_id, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    
+    return page.items
 
 
 @router.get("/{doctor_id}/statistics", response_model=dict)
 async def get_doctor_statistics(
     doctor_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить статистику врача
     """
-    service = DoctorService(db)
+    service = AsyncDoctorService(db)
     
     # Проверяем, существует ли врач
-    doctor = service.get_doctor(doctor_id)
+    doctor = await service.get_doctor(doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Врач не найден")
     
-    statistics = service.get_doctor_statistics(doctor_id)
+    statistics = await service.get_doctor_statistics(doctor_id)
     return statistics
\ No newline at end of file
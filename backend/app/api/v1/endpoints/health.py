@@ -1,25 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List, Optional
 from datetime import datetime, timedelta
 
-from app.database.database import get_db
-from app.schemas.schemas import HealthData, HealthDataCreate, HealthDataUpdate, ApiResponse
-from app.services.health_service import HealthService
+from app.database.database import get_async_db
+from app.schemas.schemas import HealthData, HealthDataCreate, HealthDataUpdate, HealthDataBatchResult, ApiResponse
+from app.services.async_services import AsyncHealthService
 
 router = APIRouter()
 
+# Максимальное число записей в одном пакете
+MAX_BATCH_SIZE = 10000
+
 
 @router.get("/{patient_id}", response_model=HealthData)
 async def get_latest_health_data(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить последние показатели здоровья пациента
     """
-    service = HealthService(db)
-    health_data = service.get_latest_health_data(patient_id)
+    service = AsyncHealthService(db)
+    health_data = await service.get_latest_health_data(patient_id)
     
     if not health_data:
         # Если нет данных, возвращаем базовые показатели
@@ -43,15 +46,15 @@ async def get_health_data_history(
     patient_id: str,
     days: int = Query(7, ge=1, le=365),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить историю показателей здоровья пациента
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
     start_date = datetime.now() - timedelta(days=days)
-    health_data = service.get_health_data_history(patient_id, start_date, limit)
+    health_data = await service.get_health_data_history(patient_id, start_date, limit)
     
     return health_data
 
@@ -59,25 +62,25 @@ async def get_health_data_history(
 @router.post("/", response_model=HealthData)
 async def create_health_data(
     health_data: HealthDataCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Добавить новые показатели здоровья
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
     # Валидация показателей
-    validation_result = service.validate_health_data(health_data)
+    validation_result = await service.validate_health_data(health_data)
     if not validation_result["valid"]:
         raise HTTPException(
             status_code=400,
             detail=f"Некорректные показатели здоровья: {validation_result['errors']}"
         )
     
-    new_health_data = service.create_health_data(health_data)
+    new_health_data = await service.create_health_data(health_data)
     
     # Проверяем критические показатели и создаем уведомления при необходимости
-    critical_alerts = service.check_critical_values(new_health_data)
+    critical_alerts = await service.check_critical_values(new_health_data)
     if critical_alerts:
         # Здесь можно добавить логику отправки уведомлений
         pass
@@ -85,42 +88,62 @@ async def create_health_data(
     return new_health_data
 
 
+@router.post("/batch", response_model=HealthDataBatchResult)
+async def create_health_data_batch(
+    items: List[Any] = Body(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Пакетно добавить показатели здоровья (например, с прикроватных мониторов).
+    Ошибочные элементы не прерывают пакет и возвращаются в errors с индексом.
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много записей в пакете. Максимум: {MAX_BATCH_SIZE}"
+        )
+    
+    service = AsyncHealthService(db)
+    result = await service.create_health_data_batch(items)
+    return result
+
+
 @router.put("/{health_data_id}", response_model=HealthData)
 async def update_health_data(
     health_data_id: str,
     health_data: HealthDataUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить показатели здоровья
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
     # Проверяем, существуют ли данные
-    existing_data = service.get_health_data_by_id(health_data_id)
+    existing_data = await service.get_health_data_by_id(health_data_id)
     if not existing_data:
         raise HTTPException(status_code=404, detail="Данные о здоровье не найдены")
     
-    updated_data = service.update_health_data(health_data_id, health_data)
+    updated_data = await service.update_health_data(health_data_id, health_data)
     return updated_data
 
 
 @router.delete("/{health_data_id}", response_model=ApiResponse)
 async def delete_health_data(
     health_data_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удалить запись о показателях здоровья
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
     # Проверяем, существуют ли данные
-    existing_data = service.get_health_data_by_id(health_data_id)
+    existing_data = await service.get_health_data_by_id(health_data_id)
     if not existing_data:
         raise HTTPException(status_code=404, detail="Данные о здоровье не найдены")
     
-    success = service.delete_health_data(health_data_id)
+    success = await service.delete_health_data(health_data_id)
     
     if success:
         return ApiResponse(
@@ -138,12 +161,12 @@ async def delete_health_data(
 async def get_health_analytics(
     patient_id: str,
     period: str = Query("7d", regex="^(1d|7d|30d|90d|1y)$"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить аналитику показателей здоровья
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
     # Определяем период
     period_days = {
@@ -157,24 +180,22 @@ async def get_health_analytics(
     days = period_days.get(period, 7)
     start_date = datetime.now() - timedelta(days=days)
     
-    analytics = service.get_health_analytics(patient_id, start_date)
+    analytics = await service.get_health_analytics(patient_id, start_date)
     return analytics
 
 
-@router.get("/{patient_id}/trends", response_model=dict)
+@router.get("/{patient_id}/trends", response_model=List[dict])
 async def get_health_trends(
     patient_id: str,
     metric: str = Query("heart_rate", regex="^(heart_rate|blood_pressure|temperature|oxygen_saturation)$"),
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить тренды конкретного показателя здоровья
     """
-    service = HealthService(db)
-    
-    start_date = datetime.now() - timedelta(days=days)
-    trends = service.get_health_trends(patient_id, metric, start_date)
+    service = AsyncHealthService(db)
+    trends = await service.get_health_trends(patient_id, metric, days)
     
     return trends
 
@@ -183,13 +204,13 @@ async def get_health_trends(
 async def get_health_alerts(
     patient_id: str,
     active_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить предупреждения о здоровье пациента
     """
-    service = HealthService(db)
-    alerts = service.get_health_alerts(patient_id, active_only)
+    service = AsyncHealthService(db)
+    alerts = await service.get_health_alerts(patient_id, active_only)
     
     return alerts
 
@@ -197,18 +218,18 @@ async def get_health_alerts(
 @router.post("/{patient_id}/simulate", response_model=HealthData)
 async def simulate_health_data(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Симулировать новые показатели здоровья (для демонстрации)
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
     # Получаем последние показатели или используем базовые
-    latest_data = service.get_latest_health_data(patient_id)
+    latest_data = await service.get_latest_health_data(patient_id)
     
-    simulated_data = service.simulate_health_data(patient_id, latest_data)
-    new_health_data = service.create_health_data(simulated_data)
+    simulated_data = await service.simulate_health_data(patient_id, latest_data)
+    new_health_data = await service.create_health_data(simulated_data)
     
     return new_health_data
 
@@ -216,14 +237,14 @@ async def simulate_health_data(
 @router.get("/{patient_id}/status", response_model=dict)
 async def get_health_status(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить общий статус здоровья пациента
     """
-    service = HealthService(db)
+    service = AsyncHealthService(db)
     
-    latest_data = service.get_latest_health_data(patient_id)
+    latest_data = await service.get_latest_health_data(patient_id)
     if not latest_data:
         return {
             "status": "unknown",
@@ -231,5 +252,5 @@ async def get_health_status(
             "last_update": None
         }
     
-    status = service.calculate_health_status(latest_data)
+    status = await service.calculate_health_status(latest_data)
     return status
\ No newline at end of file
@@ -1,52 +1,168 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from collections import deque
+import asyncio
+import json
+import os
 
-from app.database.database import get_db
+from app.core.config import settings
+from app.core.events import get_broker
+from app.core.pagination import NEXT_CURSOR_HEADER
+
+from app.database.database import get_async_db
 from app.schemas.schemas import (
     Notification, NotificationCreate, NotificationUpdate,
     ApiResponse, NotificationTypeEnum
 )
-from app.services.notification_service import NotificationService
+from app.services.async_services import AsyncNotificationService
+from app.services.notification_cleanup_service import (
+    CleanupJob, CLEANUP_BATCH_SIZE, cleanup_jobs, register_cleanup_job, run_cleanup_job
+)
+from app.services.notification_events import notification_channel, CRITICAL_ALERTS_CHANNEL
 
 router = APIRouter()
 
+# Максимальное число уведомлений в одном массовом запросе
+MAX_BULK_SIZE = 10000
+
 
 @router.get("/", response_model=List[Notification])
 async def get_notifications(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     patient_id: Optional[str] = Query(None),
     notification_type: Optional[NotificationTypeEnum] = Query(None),
     is_read: Optional[bool] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить список уведомлений с фильтрацией.
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor и передается в cursor.
+    """
+    service = AsyncNotificationService(db)
+    
+    try:
+        page = await service.get_notifications(
+            skip=skip,
+            limit=limit,
+            patient_id=patient_id,
+            notification_type=notification_type,
+            is_read=is_read,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    
+    return page.items
+
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    recipient_id: Optional[str] = Query(None),
+    critical_alerts: bool = Query(False)
 ):
     """
-    Получить список уведомлений с фильтрацией
+    Поток новых уведомлений (Server-Sent Events) вместо опроса /unread и /analytics/alerts/critical.
+    recipient_id - уведомления получателя, critical_alerts - все критические предупреждения.
     """
-    service = NotificationService(db)
+    channels = []
+    if recipient_id:
+        channels.append(notification_channel(recipient_id))
+    if critical_alerts:
+        channels.append(CRITICAL_ALERTS_CHANNEL)
+    
+    if not channels:
+        raise HTTPException(
+            status_code=400,
+            detail="Укажите recipient_id и/или critical_alerts=true"
+        )
     
-    notifications = service.get_notifications(
-        skip=skip,
-        limit=limit,
-        patient_id=patient_id,
-        notification_type=notification_type,
-        is_read=is_read
+    async def event_stream():
+        # Уведомление может прийти и по каналу получателя, и по общему каналу
+        recent_ids = deque(maxlen=settings.events_queue_size)
+        
+        async with get_broker().subscribe(channels) as subscription:
+            yield "retry: 5000\n\n"
+            
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.get(),
+                        timeout=settings.events_keepalive_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                # Клиент не успевал читать: часть старых сообщений вытеснена, их нужно дочитать через REST
+                dropped = subscription.take_dropped()
+                if dropped:
+                    yield f"event: overflow\ndata: {json.dumps({'dropped': dropped})}\n\n"
+                
+                if message["id"] in recent_ids:
+                    continue
+                recent_ids.append(message["id"])
+                
+                yield f"id: {message['id']}\nevent: notification\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
+
+
+@router.post("/cleanup", response_model=dict)
+async def start_notifications_cleanup(
+    background_tasks: BackgroundTasks,
+    days_old: int = Query(30, ge=1, le=365),
+    batch_size: int = Query(CLEANUP_BATCH_SIZE, ge=100, le=10000),
+    pause: float = Query(0.05, ge=0, le=10),
+    archive: bool = Query(False)
+):
+    """
+    Запустить фоновую очистку старых прочитанных уведомлений (пачками по первичному ключу).
+    При archive=true строки перед удалением сохраняются в сжатый файл.
+    """
+    job = CleanupJob(days_old=days_old, batch_size=batch_size, pause=pause)
+    if archive:
+        job.archive_path = os.path.join("archive", f"notifications_{job.id}.jsonl.gz")
     
-    return notifications
+    register_cleanup_job(job)
+    background_tasks.add_task(run_cleanup_job, job)
+    return job.to_dict()
+
+
+@router.get("/cleanup/{job_id}", response_model=dict)
+async def get_notifications_cleanup(job_id: str):
+    """
+    Получить прогресс задачи очистки
+    """
+    job = cleanup_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача очистки не найдена")
+    
+    return job.to_dict()
 
 
 @router.get("/{notification_id}", response_model=Notification)
 async def get_notification(
     notification_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить конкретное уведомление
     """
-    service = NotificationService(db)
-    notification = service.get_notification(notification_id)
+    service = AsyncNotificationService(db)
+    notification = await service.get_notification(notification_id)
     
     if not notification:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
@@ -57,60 +173,79 @@ async def get_notification(
 @router.post("/", response_model=Notification)
 async def create_notification(
     notification_data: NotificationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать новое уведомление
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(notification_data.patient_id):
+    if not await service.patient_exists(notification_data.patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    notification = service.create_notification(notification_data)
+    notification = await service.create_notification(notification_data)
     return notification
 
 
+@router.post("/bulk", response_model=List[Notification])
+async def bulk_create_notifications(
+    notifications_data: List[NotificationCreate],
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Массово создать уведомления (например, рассылка тысячам пациентов) одной вставкой
+    """
+    if len(notifications_data) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Слишком много уведомлений в запросе. Максимум: {MAX_BULK_SIZE}"
+        )
+    
+    service = AsyncNotificationService(db)
+    notifications = await service.bulk_create_notifications(notifications_data)
+    return notifications
+
+
 @router.put("/{notification_id}", response_model=Notification)
 async def update_notification(
     notification_id: str,
     notification_data: NotificationUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить уведомление
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, существует ли уведомление
-    existing_notification = service.get_notification(notification_id)
+    existing_notification = await service.get_notification(notification_id)
     if not existing_notification:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
     
-    notification = service.update_notification(notification_id, notification_data)
+    notification = await service.update_notification(notification_id, notification_data)
     return notification
 
 
 @router.delete("/{notification_id}", response_model=ApiResponse)
 async def delete_notification(
     notification_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удалить уведомление
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, существует ли уведомление
-    existing_notification = service.get_notification(notification_id)
+    existing_notification = await service.get_notification(notification_id)
     if not existing_notification:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
     
-    success = service.delete_notification(notification_id)
+    success = await service.delete_notification(notification_id)
     
     if success:
         return ApiResponse(
@@ -127,40 +262,40 @@ async def delete_notification(
 @router.patch("/{notification_id}/read", response_model=Notification)
 async def mark_notification_as_read(
     notification_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отметить уведомление как прочитанное
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, существует ли уведомление
-    existing_notification = service.get_notification(notification_id)
+    existing_notification = await service.get_notification(notification_id)
     if not existing_notification:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
     
-    notification = service.mark_as_read(notification_id)
+    notification = await service.mark_as_read(notification_id)
     return notification
 
 
 @router.patch("/patient/{patient_id}/read-all", response_model=ApiResponse)
 async def mark_all_notifications_as_read(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отметить все уведомления пациента как прочитанные
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    count = service.mark_all_as_read(patient_id)
+    count = await service.mark_all_as_read(patient_id)
     
     return ApiResponse(
         success=True,
@@ -172,63 +307,69 @@ async def mark_all_notifications_as_read(
 async def get_unread_notifications(
     patient_id: str,
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить непрочитанные уведомления пациента
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    notifications = service.get_unread_notifications(patient_id, limit)
+    notifications = await service.get_unread_notifications(patient_id, limit)
     return notifications
 
 
 @router.get("/patient/{patient_id}/count", response_model=dict)
 async def get_notification_count(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить количество уведомлений пациента
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    count_data = service.get_notification_count(patient_id)
+    count_data = await service.get_notification_count(patient_id)
     return count_data
 
 
 @router.post("/send-reminder", response_model=ApiResponse)
 async def send_appointment_reminder(
     appointment_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отправить напоминание о назначении
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что назначение существует
-    if not service.appointment_exists(appointment_id):
+    if not await service.appointment_exists(appointment_id):
         raise HTTPException(
             status_code=404,
             detail="Назначение не найдено"
         )
     
-    success = service.send_appointment_reminder(appointment_id)
+    if await service.reminder_sent(appointment_id):
+        raise HTTPException(
+            status_code=409,
+            detail="Напоминание о назначении уже отправлено"
+        )
+    
+    success = await service.send_appointment_reminder(appointment_id)
     
     if success:
         return ApiResponse(
@@ -247,21 +388,21 @@ async def send_health_alert(
     patient_id: str,
     message: str,
     priority: str = "medium",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Отправить уведомление о здоровье
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    success = service.send_health_alert(patient_id, message, priority)
+    success = await service.send_health_alert(patient_id, message, priority)
     
     if success:
         return ApiResponse(
@@ -278,24 +419,28 @@ async def send_health_alert(
 @router.delete("/patient/{patient_id}/cleanup", response_model=ApiResponse)
 async def cleanup_old_notifications(
     patient_id: str,
+    background_tasks: BackgroundTasks,
     days_old: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Очистить старые уведомления пациента
+    Запустить фоновую очистку старых уведомлений пациента
+    (прогресс - GET /notifications/cleanup/{job_id})
     """
-    service = NotificationService(db)
+    service = AsyncNotificationService(db)
     
     # Проверяем, что пациент существует
-    if not service.patient_exists(patient_id):
+    if not await service.patient_exists(patient_id):
         raise HTTPException(
             status_code=404,
             detail="Пациент не найден"
         )
     
-    deleted_count = service.cleanup_old_notifications(patient_id, days_old)
+    job = register_cleanup_job(CleanupJob(days_old=days_old, recipient_id=patient_id))
+    background_tasks.add_task(run_cleanup_job, job)
     
     return ApiResponse(
         success=True,
-        message=f"Удалено {deleted_count} старых уведомлений"
+        message="Очистка старых уведомлений запущена",
+        data=job.to_dict()
     )
\ No newline at end of file
@@ -1,68 +1,135 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from app.database.database import get_db
+from app.database.database import get_async_db
 from app.schemas.schemas import Organ, OrganCreate, OrganUpdate, ApiResponse
-from app.services.organ_service import OrganService
+from app.services.async_services import AsyncOrganService
+from app.services.organ_catalog import OrganCatalog
 
 router = APIRouter()
 
 
+def catalog_response(request: Request, catalog: OrganCatalog, key: str) -> Response:
+    """
+    Ответ из снимка справочника: готовое тело со строгим ETag.
+    При совпадении If-None-Match возвращается 304 без тела.
+    """
+    document = catalog.document(key)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Орган не найден")
+    
+    headers = {
+        "ETag": document.etag,
+        "Cache-Control": "no-cache",
+        "X-Catalog-Version": str(catalog.version)
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in tags or document.etag in tags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=document.body, media_type="application/json", headers=headers)
+
+
 @router.get("/", response_model=List[Organ])
 async def get_organs(
-    active_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить список всех органов
+    Получить список всех органов (из снимка справочника, с ETag)
     """
-    service = OrganService(db)
-    organs = service.get_organs(active_only)
+    service = AsyncOrganService(db)
+    catalog = await service.get_catalog()
     
     # Если нет органов в базе, создаем базовый набор
-    if not organs:
-        organs = service.create_default_organs()
+    if not catalog.organs:
+        await service.create_default_organs()
+        catalog = await service.get_catalog()
+    
+    return catalog_response(request, catalog, "organs")
+
+
+@router.get("/at", response_model=dict)
+async def get_organs_at(
+    x: float = Query(...),
+    y: float = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Определить орган по точке на изображении (клик или наведение).
+    Органы упорядочены от самой мелкой области к самой крупной: первый - точное попадание.
+    """
+    service = AsyncOrganService(db)
+    organs = await service.get_organs_at(x, y)
+    
+    return {
+        "x": x,
+        "y": y,
+        "organ": organs[0] if organs else None,
+        "organs": organs
+    }
+
+
+@router.get("/health-map/{patient_id}", response_model=dict)
+async def get_health_map(
+    patient_id: str,
+    days: int = Query(30, ge=1, le=365),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить состояние всех органов пациента (последние значения метрик одним запросом)
+    """
+    service = AsyncOrganService(db)
     
-    return organs
+    # Проверяем, что пациент существует
+    if not await service.patient_exists(patient_id):
+        raise HTTPException(
+            status_code=404,
+            detail="Пациент не найден"
+        )
+    
+    health_map = await service.get_health_map(patient_id, days)
+    return health_map
 
 
 @router.get("/{organ_id}", response_model=Organ)
 async def get_organ(
     organ_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить информацию о конкретном органе
     """
-    service = OrganService(db)
-    organ = service.get_organ(organ_id)
-    
-    if not organ:
-        raise HTTPException(status_code=404, detail="Орган не найден")
+    service = AsyncOrganService(db)
+    catalog = await service.get_catalog()
     
-    return organ
+    return catalog_response(request, catalog, f"organ:{organ_id}")
 
 
 @router.post("/", response_model=Organ)
 async def create_organ(
     organ_data: OrganCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать новый орган
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     # Проверяем, не существует ли уже орган с таким ID
-    existing_organ = service.get_organ(organ_data.id)
+    existing_organ = await service.get_organ(organ_data.id)
     if existing_organ:
         raise HTTPException(
             status_code=400,
             detail="Орган с таким ID уже существует"
         )
     
-    organ = service.create_organ(organ_data)
+    organ = await service.create_organ(organ_data)
     return organ
 
 
@@ -70,38 +137,38 @@ async def create_organ(
 async def update_organ(
     organ_id: str,
     organ_data: OrganUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить информацию об органе
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     # Проверяем, существует ли орган
-    existing_organ = service.get_organ(organ_id)
+    existing_organ = await service.get_organ(organ_id)
     if not existing_organ:
         raise HTTPException(status_code=404, detail="Орган не найден")
     
-    organ = service.update_organ(organ_id, organ_data)
+    organ = await service.update_organ(organ_id, organ_data)
     return organ
 
 
 @router.delete("/{organ_id}", response_model=ApiResponse)
 async def delete_organ(
     organ_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удалить орган (мягкое удаление)
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     # Проверяем, существует ли орган
-    existing_organ = service.get_organ(organ_id)
+    existing_organ = await service.get_organ(organ_id)
     if not existing_organ:
         raise HTTPException(status_code=404, detail="Орган не найден")
     
-    success = service.delete_organ(organ_id)
+    success = await service.delete_organ(organ_id)
     
     if success:
         return ApiResponse(
@@ -119,71 +186,78 @@ async def delete_organ(
 async def get_organ_health_info(
     organ_id: str,
     patient_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить информацию о здоровье конкретного органа
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     # Проверяем, существует ли орган
-    organ = service.get_organ(organ_id)
+    organ = await service.get_organ(organ_id)
     if not organ:
         raise HTTPException(status_code=404, detail="Орган не найден")
     
-    health_info = service.get_organ_health_info(organ_id, patient_id)
+    health_info = await service.get_organ_health_info(organ_id, patient_id)
     return health_info
 
 
 @router.get("/{organ_id}/diseases", response_model=List[dict])
 async def get_organ_diseases(
     organ_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить список заболеваний, связанных с органом
     """
-    service = OrganService(db)
-    
-    # Проверяем, существует ли орган
-    organ = service.get_organ(organ_id)
-    if not organ:
-        raise HTTPException(status_code=404, detail="Орган не найден")
+    service = AsyncOrganService(db)
+    catalog = await service.get_catalog()
     
-    diseases = service.get_organ_diseases(organ_id)
-    return diseases
+    return catalog_response(request, catalog, f"diseases:{organ_id}")
 
 
 @router.get("/{organ_id}/tips", response_model=List[dict])
 async def get_organ_health_tips(
     organ_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить советы по здоровью для конкретного органа
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
+    catalog = await service.get_catalog()
     
-    # Проверяем, существует ли орган
-    organ = service.get_organ(organ_id)
-    if not organ:
-        raise HTTPException(status_code=404, detail="Орган не найден")
+    return catalog_response(request, catalog, f"tips:{organ_id}")
+
+
+@router.get("/{organ_id}/interactions", response_model=List[dict])
+async def get_organ_interactions(
+    organ_id: str,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить взаимодействия органа с другими органами
+    """
+    service = AsyncOrganService(db)
+    catalog = await service.get_catalog()
     
-    tips = service.get_organ_health_tips(organ_id)
-    return tips
+    return catalog_response(request, catalog, f"interactions:{organ_id}")
 
 
 @router.post("/initialize-default", response_model=ApiResponse)
 async def initialize_default_organs(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Инициализировать базовый набор органов
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     try:
-        organs = service.create_default_organs()
+        organs = await service.create_default_organs()
         return ApiResponse(
             success=True,
             message=f"Создано {len(organs)} органов",
@@ -199,19 +273,19 @@ async def initialize_default_organs(
 @router.get("/{organ_id}/statistics", response_model=dict)
 async def get_organ_statistics(
     organ_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить статистику по органу
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     # Проверяем, существует ли орган
-    organ = service.get_organ(organ_id)
+    organ = await service.get_organ(organ_id)
     if not organ:
         raise HTTPException(status_code=404, detail="Орган не найден")
     
-    statistics = service.get_organ_statistics(organ_id)
+    statistics = await service.get_organ_statistics(organ_id)
     return statistics
 
 
@@ -219,17 +293,17 @@ async def get_organ_statistics(
 async def interact_with_organ(
     organ_id: str,
     patient_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обработать взаимодействие с органом (клик)
     """
-    service = OrganService(db)
+    service = AsyncOrganService(db)
     
     # Проверяем, существует ли орган
-    organ = service.get_organ(organ_id)
+    organ = await service.get_organ(organ_id)
     if not organ:
         raise HTTPException(status_code=404, detail="Орган не найден")
     
-    interaction_result = service.handle_organ_interaction(organ_id, patient_id)
+    interaction_result = await service.handle_organ_interaction(organ_id, patient_id)
     return interaction_result
\ No newline at end of file
@@ -1,45 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from app.database.database import get_db
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.database.database import get_async_db
 from app.models.models import Patient as PatientModel
 from app.schemas.schemas import Patient, PatientCreate, PatientUpdate, ApiResponse
-from app.services.patient_service import PatientService
+from app.services.async_services import AsyncPatientService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Patient])
 async def get_patients(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Получить список всех пациентов с возможностью поиска и пагинации
+    Получить список всех пациентов с возможностью поиска и пагинации.
+    Без поиска список отсортирован по фамилии; курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor и передается в cursor.
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     if search:
-        patients = service.search_patients(search, skip, limit)
-    else:
-        patients = service.get_patients(skip, limit)
+        return await service.search_patients(search, skip, limit)
+    
+    try:
+        page = await service.get_patients(skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
     
-    return patients
+    return page.items
 
 
 @router.get("/{patient_id}", response_model=Patient)
 async def get_patient(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить информацию о конкретном пациенте
     """
-    service = PatientService(db)
-    patient = service.get_patient(patient_id)
+    service = AsyncPatientService(db)
+    patient = await service.get_patient(patient_id)
     
     if not patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
@@ -50,22 +61,22 @@ async def get_patient(
 @router.post("/", response_model=Patient)
 async def create_patient(
     patient_data: PatientCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Создать нового пациента
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, не существует ли уже пациент с таким email
-    existing_patient = service.get_patient_by_email(patient_data.email)
+    existing_patient = await service.get_patient_by_email(patient_data.email)
     if existing_patient:
         raise HTTPException(
             status_code=400, 
             detail="Пациент с таким email уже существует"
         )
     
-    patient = service.create_patient(patient_data)
+    patient = await service.create_patient(patient_data)
     return patient
 
 
@@ -73,47 +84,47 @@ async def create_patient(
 async def update_patient(
     patient_id: str,
     patient_data: PatientUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновить информацию о пациенте
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, существует ли пациент
-    existing_patient = service.get_patient(patient_id)
+    existing_patient = await service.get_patient(patient_id)
     if not existing_patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
     
     # Если обновляется email, проверяем уникальность
     if patient_data.email:
-        email_patient = service.get_patient_by_email(patient_data.email)
+        email_patient = await service.get_patient_by_email(patient_data.email)
         if email_patient and email_patient.id != patient_id:
             raise HTTPException(
                 status_code=400,
                 detail="Пациент с таким email уже существует"
             )
     
-    patient = service.update_patient(patient_id, patient_data)
+    patient = await service.update_patient(patient_id, patient_data)
     return patient
 
 
 @router.delete("/{patient_id}", response_model=ApiResponse)
 async def delete_patient(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Удалить пациента (мягкое удаление - устанавливает is_active = False)
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, существует ли пациент
-    existing_patient = service.get_patient(patient_id)
+    existing_patient = await service.get_patient(patient_id)
     if not existing_patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
     
-    success = service.delete_patient(patient_id)
+    success = await service.delete_patient(patient_id)
     
     if success:
         return ApiResponse(
@@ -130,19 +141,19 @@ async def delete_patient(
 @router.get("/{patient_id}/medical-history", response_model=List[dict])
 async def get_patient_medical_history(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить медицинскую историю пациента
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, существует ли пациент
-    patient = service.get_patient(patient_id)
+    patient = await service.get_patient(patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
     
-    medical_history = service.get_patient_medical_history(patient_id)
+    medical_history = await service.get_patient_medical_history(patient_id)
     return medical_history
 
 
@@ -150,19 +161,19 @@ async def get_patient_medical_history(
 async def get_patient_appointments(
     patient_id: str,
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить назначения пациента
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, существует ли пациент
-    patient = service.get_patient(patient_id)
+    patient = await service.get_patient(patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
     
-    appointments = service.get_patient_appointments(patient_id, status)
+    appointments = await service.get_patient_appointments(patient_id, status)
     return appointments
 
 
@@ -170,36 +181,36 @@ async def get_patient_appointments(
 async def get_patient_health_data(
     patient_id: str,
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить последние показатели здоровья пациента
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, существует ли пациент
-    patient = service.get_patient(patient_id)
+    patient = await service.get_patient(patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
     
-    health_data = service.get_patient_health_data(patient_id, limit)
+    health_data = await service.get_patient_health_data(patient_id, limit)
     return health_data
 
 
 @router.get("/{patient_id}/statistics", response_model=dict)
 async def get_patient_statistics(
     patient_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить статистику по пациенту
     """
-    service = PatientService(db)
+    service = AsyncPatientService(db)
     
     # Проверяем, существует ли пациент
-    patient = service.get_patient(patient_id)
+    patient = await service.get_patient(patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Пациент не найден")
     
-    statistics = service.get_patient_statistics(patient_id)
+    statistics = await service.get_patient_statistics(patient_id)
     return statistics
\ No newline at end of file
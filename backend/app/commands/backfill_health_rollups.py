@@ -0,0 +1,32 @@
+"""
+Пересчет дневных агрегатов показателей здоровья по историческим данным.
+
+Пример:
+    python -m app.commands.backfill_health_rollups
+    python -m app.commands.backfill_health_rollups --patient-id <id> --date-from 2025-01-01
+"""
+import argparse
+from datetime import date
+
+from app.database.database import SessionLocal
+from app.services.health_rollup_service import HealthRollupService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет таблицы health_daily_rollup")
+    parser.add_argument("--patient-id", help="Пересчитать только для указанного пациента")
+    parser.add_argument("--date-from", type=date.fromisoformat, help="Начальная дата (YYYY-MM-DD)")
+    parser.add_argument("--date-to", type=date.fromisoformat, help="Конечная дата (YYYY-MM-DD)")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        inserted = HealthRollupService(db).rebuild(args.patient_id, args.date_from, args.date_to)
+        db.commit()
+        print(f"Пересчитано дневных агрегатов: {inserted}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Очистка старых прочитанных уведомлений пачками по первичному ключу.
+
+Пример:
+    python -m app.commands.cleanup_notifications --days-old 90
+    python -m app.commands.cleanup_notifications --days-old 90 --archive archive/notifications.jsonl.gz
+    python -m app.commands.cleanup_notifications --after-id <id>   # продолжить прерванную очистку
+"""
+import argparse
+
+from app.database.database import SessionLocal
+from app.services.notification_cleanup_service import NotificationCleanupService, CleanupJob, CLEANUP_BATCH_SIZE
+
+
+def print_progress(job: CleanupJob):
+    print(f"Пачка {job.batches}: удалено {job.deleted}, архивировано {job.archived}, последний id {job.last_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Очистка старых прочитанных уведомлений")
+    parser.add_argument("--days-old", type=int, default=30, help="Удалять уведомления старше N дней")
+    parser.add_argument("--recipient-id", help="Очистить только уведомления указанного получателя")
+    parser.add_argument("--batch-size", type=int, default=CLEANUP_BATCH_SIZE, help="Размер пачки удаления")
+    parser.add_argument("--pause", type=float, default=0.05, help="Пауза между пачками, секунды")
+    parser.add_argument("--archive", help="Сохранить удаляемые строки в файл (.jsonl.gz)")
+    parser.add_argument("--after-id", help="Продолжить с указанного id (из вывода прерванного запуска)")
+    args = parser.parse_args()
+    
+    job = CleanupJob(
+        days_old=args.days_old,
+        recipient_id=args.recipient_id,
+        batch_size=args.batch_size,
+        archive_path=args.archive,
+        pause=args.pause,
+        after_id=args.after_id
+    )
+    
+    db = SessionLocal()
+    try:
+        NotificationCleanupService(db).run(job, progress=print_progress)
+        print(f"Удалено уведомлений: {job.deleted}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
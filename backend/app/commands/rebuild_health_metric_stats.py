@@ -0,0 +1,28 @@
+"""
+Пересчет дневных счетчиков и скетчей пациентов по метрикам здоровья
+(health_metric_daily_counts, health_metric_sketch_registers) по таблице health_daily_rollup.
+
+Пример:
+    python -m app.commands.rebuild_health_metric_stats
+"""
+import argparse
+
+from app.database.database import SessionLocal
+from app.services.health_metric_stats_service import HealthMetricStatsService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет статистики по метрикам здоровья")
+    parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        result = HealthMetricStatsService(db).rebuild()
+        db.commit()
+        print(f"Пересчитано дневных счетчиков: {result['days']}, скетчей метрик: {result['metrics']}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
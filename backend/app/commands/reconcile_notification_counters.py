@@ -0,0 +1,36 @@
+"""
+Сверка счетчиков непрочитанных уведомлений с таблицей notifications.
+
+Пример:
+    python -m app.commands.reconcile_notification_counters
+    python -m app.commands.reconcile_notification_counters --recipient-id <id> --dry-run
+"""
+import argparse
+
+from app.database.database import SessionLocal
+from app.services.notification_counter_service import NotificationCounterService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сверка таблицы notification_unread_counters")
+    parser.add_argument("--recipient-id", help="Проверить только указанного получателя")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать расхождения, не исправлять")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        drift = NotificationCounterService(db).reconcile(args.recipient_id, repair=not args.dry_run)
+        if not args.dry_run:
+            db.commit()
+        
+        for item in drift:
+            print(f"{item['recipient_id']}: счетчик {item['stored']}, фактически {item['actual']}")
+        
+        action = "Найдено" if args.dry_run else "Исправлено"
+        print(f"{action} расхождений: {len(drift)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
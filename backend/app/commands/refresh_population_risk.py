@@ -0,0 +1,26 @@
+"""
+Пересчет материализованных оценок риска пациентов (без планировщика приложения).
+
+Пример:
+    python -m app.commands.refresh_population_risk
+"""
+import argparse
+
+from app.services.population_risk_service import run_population_risk_refresh
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчет оценок риска пациентов")
+    parser.parse_args()
+    
+    result = run_population_risk_refresh()
+    if result.get("skipped"):
+        print("Пересчет уже выполняется другим процессом")
+        return
+    
+    distribution = ", ".join(f"{level}: {count}" for level, count in result["distribution"].items())
+    print(f"Оценено пациентов: {result['patients']} ({distribution})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Рассылка напоминаний о приемах, попадающих в окно (например, по cron вместо планировщика приложения).
+
+Пример:
+    python -m app.commands.send_appointment_reminders
+    python -m app.commands.send_appointment_reminders --hours-before 2
+"""
+import argparse
+
+from app.database.database import SessionLocal
+from app.services.appointment_reminder_service import AppointmentReminderService, REMINDER_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Рассылка напоминаний о приеме")
+    parser.add_argument("--hours-before", type=int, help="Окно напоминания, часов до приема (по умолчанию из настроек)")
+    parser.add_argument("--batch-size", type=int, default=REMINDER_BATCH_SIZE, help="Напоминаний в одной транзакции")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        result = AppointmentReminderService(db).dispatch_due_reminders(
+            hours_before=args.hours_before,
+            batch_size=args.batch_size
+        )
+        print(f"Отправлено напоминаний: {result['sent']} (пачек: {result['batches']}, окно {result['hours_before']} ч)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.core.config import settings
+
+
+class CacheBackend(ABC):
+    """Интерфейс хранилища кэша"""
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Значение по ключу или None, если его нет или срок истек"""
+    
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        """Сохранить значение на ttl секунд"""
+    
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Удалить ключ"""
+    
+    @abstractmethod
+    def clear(self) -> None:
+        """Удалить все ключи"""
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Кэш в памяти процесса (один воркер uvicorn)"""
+    
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            
+            return value
+    
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+    
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Кэш в локальном файле SQLite, общий для нескольких воркеров на одной машине"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+    
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Соединение на одну операцию: транзакция фиксируется, соединение закрывается"""
+        with closing(sqlite3.connect(self.path, timeout=5)) as connection:
+            with connection:
+                yield connection
+    
+    def get(self, key: str) -> Optional[Any]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time())
+            ).fetchone()
+        
+        return json.loads(row[0]) if row else None
+    
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), time.time() + ttl)
+            )
+    
+    def delete(self, key: str) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+    
+    def clear(self) -> None:
+        with self._connect() as connection:
+            connection.execute("DELETE FROM cache")
+
+
+class Cache:
+    """Кэш со сменным хранилищем и счетчиками попаданий/промахов"""
+    
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def set_backend(self, backend: CacheBackend) -> None:
+        """Заменить хранилище (например, на общее для нескольких воркеров)"""
+        self.backend = backend
+    
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: int) -> Any:
+        """Вернуть значение из кэша или вычислить и сохранить его"""
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        self.misses += 1
+        value = factory()
+        self.backend.set(key, value, ttl)
+        return value
+    
+    def invalidate(self, *keys: str) -> None:
+        """Сбросить значения по ключам"""
+        for key in keys:
+            self.backend.delete(key)
+        self.invalidations += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики кэша текущего процесса"""
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total * 100, 2) if total > 0 else 0
+        }
+
+
+def create_cache_backend() -> CacheBackend:
+    """Создать хранилище кэша по настройкам"""
+    if settings.cache_backend == "sqlite":
+        return SQLiteCacheBackend(settings.cache_path)
+    return InMemoryCacheBackend()
+
+
+cache = Cache(create_cache_backend())
+
+
+# Ключи кэша аналитики
+DASHBOARD_OVERVIEW_KEY = "analytics:dashboard_overview"
+
+
+def invalidate_dashboard() -> None:
+    """Сбросить кэш обзора дашборда (вызывается при записи пациентов, врачей, назначений и показателей)"""
+    cache.invalidate(DASHBOARD_OVERVIEW_KEY)
@@ -41,14 +41,29 @@ class Settings(BaseSettings):
     # Логирование
     log_level: str = "INFO"
     
-    # Медицинские настройки
-    default_health_thresholds: dict = {
-        "heart_rate": {"min": 60, "max": 100, "critical_min": 50, "critical_max": 120},
-        "blood_pressure_systolic": {"min": 100, "max": 140, "critical_min": 90, "critical_max": 180},
-        "blood_pressure_diastolic": {"min": 70, "max": 90, "critical_min": 60, "critical_max": 110},
-        "temperature": {"min": 36.1, "max": 37.2, "critical_min": 35.0, "critical_max": 39.0},
-        "oxygen_saturation": {"min": 95, "max": 100, "critical_min": 90, "critical_max": 100}
-    }
+    # Кэш: "memory" (в процессе) или "sqlite" (общий файл для нескольких воркеров)
+    cache_backend: str = "memory"
+    cache_path: str = "cache/medit_cache.db"
+    dashboard_cache_ttl: int = 30  # секунды
+    
+    # Снимки справочников в памяти воркера: как часто сверять их с БД (записи других воркеров)
+    snapshot_check_interval_seconds: int = 5
+    
+    # Поток событий (SSE): размер очереди подписчика и интервал keep-alive
+    events_queue_size: int = 100
+    events_keepalive_seconds: int = 15
+    
+    # Напоминания о приеме: планировщик в процессе приложения.
+    # По умолчанию выключен: иначе рассылку запускает каждый воркер uvicorn
+    appointment_reminders_enabled: bool = False
+    appointment_reminder_hours_before: int = 24
+    appointment_reminder_interval_seconds: int = 60
+    
+    # Оценка рисков пациентов: пересчет материализованной таблицы в процессе приложения.
+    # По умолчанию выключен: иначе пересчет запускает каждый воркер uvicorn
+    population_risk_enabled: bool = False
+    population_risk_refresh_interval_seconds: int = 900
+    population_risk_lookback_days: int = 365
     
     class Config:
         env_file = ".env"
@@ -64,6 +79,20 @@ def get_database_url() -> str:
     return settings.database_url
 
 
+# Асинхронные драйверы для поддерживаемых СУБД
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+# Функция для получения URL базы данных с асинхронным драйвером
+def get_async_database_url() -> str:
+    scheme, _, rest = settings.database_url.partition("://")
+    dialect = scheme.split("+")[0]
+    return f"{ASYNC_DRIVERS.get(dialect, scheme)}://{rest}"
+
+
 # Функция для проверки настроек в продакшене
 def validate_production_settings():
     if not settings.debug:
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Set
+
+from app.core.config import settings
+
+
+class Subscription:
+    """Подписка на каналы с ограниченной очередью"""
+    
+    def __init__(self, channels: Iterable[str], max_size: int):
+        self.channels = set(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+    
+    def put(self, message: Dict[str, Any]) -> None:
+        """Положить сообщение; при переполнении вытесняется самое старое (медленный клиент не растит память)"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(message)
+    
+    async def get(self) -> Dict[str, Any]:
+        return await self.queue.get()
+    
+    def take_dropped(self) -> int:
+        """Количество вытесненных сообщений с прошлого вызова"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class EventBroker(ABC):
+    """Интерфейс брокера событий (публикация из сервисов, подписка из SSE)"""
+    
+    @abstractmethod
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Разослать сообщение подписчикам канала"""
+    
+    @abstractmethod
+    def subscribe(self, channels: Iterable[str]):
+        """Асинхронный контекстный менеджер, возвращающий Subscription"""
+    
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Состояние брокера: каналы, подписки, опубликованные сообщения"""
+
+
+class InProcessBroker(EventBroker):
+    """Брокер в памяти процесса (один воркер uvicorn)"""
+    
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+    
+    def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Разослать сообщение подписчикам канала (можно вызывать из любого потока)"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+            self.published += 1
+        
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт
+                pass
+    
+    @asynccontextmanager
+    async def subscribe(self, channels: Iterable[str]) -> AsyncIterator[Subscription]:
+        subscription = Subscription(channels, self.queue_size)
+        
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                for channel in subscription.channels:
+                    subscribers = self._subscribers.get(channel)
+                    if subscribers is not None:
+                        subscribers.discard(subscription)
+                        if not subscribers:
+                            del self._subscribers[channel]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "broker": type(self).__name__,
+                "channels": len(self._subscribers),
+                "subscriptions": len({s for subs in self._subscribers.values() for s in subs}),
+                "published": self.published
+            }
+
+
+_broker: EventBroker = InProcessBroker(settings.events_queue_size)
+
+
+def get_broker() -> EventBroker:
+    return _broker
+
+
+def set_broker(broker: EventBroker) -> None:
+    """Заменить брокер (например, на общий для нескольких воркеров)"""
+    global _broker
+    _broker = broker
@@ -0,0 +1,71 @@
+from typing import Dict, Iterable, Tuple
+import hashlib
+import numpy as np
+
+# Точность по умолчанию: 2^12 регистров (4 КБ), стандартная ошибка ~1.6%
+DEFAULT_PRECISION = 12
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Скетч HyperLogLog для приближенного подсчета различных значений.
+    
+    Регистры хранятся как массив uint8. Добавление значения - максимум ранга
+    в его регистре, поэтому скетч можно вести в БД по регистрам (см. ranks)
+    и собирать при чтении (см. from_ranks).
+    """
+    
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = np.zeros(self.size, dtype=np.uint8)
+    
+    def count(self) -> int:
+        """Оценка количества различных значений"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        
+        # Для малых множеств точнее линейный подсчет по пустым регистрам
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        
+        return int(round(estimate))
+    
+    @classmethod
+    def ranks(cls, values: Iterable[str], precision: int = DEFAULT_PRECISION) -> Dict[int, int]:
+        """
+        Наибольший ранг каждого регистра, задетого значениями. Добавление в скетч -
+        максимум с этими рангами, поэтому его можно выполнить в БД без чтения скетча.
+        """
+        indices, ranks = cls._hash_ranks(values, precision)
+        registers: Dict[int, int] = {}
+        for index, rank in zip(indices.tolist(), ranks.tolist()):
+            if rank > registers.get(index, 0):
+                registers[index] = rank
+        return registers
+    
+    @classmethod
+    def from_ranks(cls, ranks: Iterable[Tuple[int, int]], precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        """Скетч по парам (регистр, ранг); отсутствующие регистры нулевые"""
+        sketch = cls(precision=precision)
+        for index, rank in ranks:
+            sketch.registers[index] = max(sketch.registers[index], rank)
+        return sketch
+    
+    @staticmethod
+    def _hash_ranks(values: Iterable[str], precision: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Номера регистров и ранги значений"""
+        hashes = [_hash64(value) for value in values]
+        bits = 64 - precision
+        mask = (1 << bits) - 1
+        
+        # Старшие биты хэша - номер регистра, в регистре - позиция первой единицы остатка
+        indices = np.fromiter((h >> bits for h in hashes), dtype=np.intp, count=len(hashes))
+        ranks = np.fromiter((bits - (h & mask).bit_length() + 1 for h in hashes), dtype=np.uint8, count=len(hashes))
+        return indices, ranks
@@ -0,0 +1,116 @@
+from sqlalchemy import DateTime, String, tuple_, type_coerce
+from sqlalchemy.orm import Query
+from typing import List, Optional, Any, NamedTuple, Sequence
+from datetime import datetime
+import base64
+import json
+
+# Заголовок ответа с курсором следующей страницы (тело списка не меняется)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    """Страница списка и курсор следующей страницы (None - страниц больше нет)"""
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Непрозрачный курсор: значения ключа сортировки последней строки в base64url"""
+    payload = json.dumps(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in values],
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """Разобрать курсор; ValueError, если он поврежден или не подходит к ключу сортировки"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeError):
+        raise ValueError("Некорректный курсор")
+    
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Некорректный курсор")
+    
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise ValueError("Некорректный курсор")
+    
+    return values
+
+
+def _stored_key(columns: Sequence[Any], dialect: str) -> List[Any]:
+    """
+    Колонки ключа в том виде, в каком они хранятся в БД.
+    
+    SQLite хранит даты строками разного вида ('YYYY-MM-DD HH:MM:SS' из
+    server_default и с микросекундами из приложения) и сравнивает их как
+    строки. Поэтому на SQLite значение даты в курсоре берется из БД без
+    преобразования и сравнивается без типа DateTime, иначе строки одной секунды
+    не отсекаются. В остальных СУБД даты хранятся типом и сравниваются как даты.
+    """
+    if dialect != "sqlite":
+        return list(columns)
+    return [type_coerce(column, String) if isinstance(column.type, DateTime) else column for column in columns]
+
+
+def keyset_condition(columns: Sequence[Any], cursor: str, dialect: str, descending: bool = False) -> Any:
+    """Условие "строго после курсора" для ключа columns; ValueError при некорректном курсоре"""
+    values = decode_cursor(cursor, columns)
+    
+    if dialect != "sqlite":
+        try:
+            values = [
+                datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+                for column, value in zip(columns, values)
+            ]
+        except (TypeError, ValueError):
+            raise ValueError("Некорректный курсор")
+    
+    key = tuple_(*_stored_key(columns, dialect))
+    return key < tuple_(*values) if descending else key > tuple_(*values)
+
+
+def keyset_paginate(
+    query: Query,
+    columns: Sequence[Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = False
+) -> Page:
+    """
+    Keyset-пагинация по ключу (колонка сортировки, ..., id).
+    
+    С курсором страница начинается строго после ключа последней строки
+    предыдущей страницы: это диапазон по индексу, стоимость не зависит от
+    глубины и страницы не сдвигаются при вставке строк. Без курсора
+    используется skip (OFFSET) для совместимости. Запрашивается limit + 1
+    строка, чтобы понять, есть ли следующая страница.
+    
+    Запрос по одной сущности возвращает объекты, по нескольким колонкам - строки
+    (с дополнительными колонками ключа в конце).
+    """
+    dialect = query.session.get_bind().dialect.name
+    stored = _stored_key(columns, dialect)
+    selected = len(query.column_descriptions)
+    
+    if cursor:
+        query = query.filter(keyset_condition(columns, cursor, dialect, descending))
+    
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    
+    if skip and not cursor:
+        query = query.offset(skip)
+    
+    # Значения ключа выбираются дополнительными колонками, чтобы курсор совпадал с хранимыми
+    rows = query.add_columns(*stored).limit(limit + 1).all()
+    items = [row[0] if selected == 1 else row for row in rows[:limit]]
+    
+    if len(rows) <= limit:
+        return Page(items, None)
+    
+    return Page(items, encode_cursor(rows[limit - 1][selected:]))
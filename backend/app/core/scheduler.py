@@ -0,0 +1,39 @@
+from typing import Optional, Any, Callable
+import asyncio
+
+
+class PeriodicJob:
+    """Периодическое выполнение синхронной задачи внутри процесса приложения"""
+    
+    def __init__(self, func: Callable[[], Any], interval: float, description: str):
+        self.func = func
+        self.interval = interval
+        self.description = description
+        self.last_result: Optional[Any] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Запросы синхронные, поэтому выполняются в потоке, не блокируя цикл событий
+                self.last_result = await asyncio.to_thread(self.func)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Ошибка {self.description}: {e}")
+            
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Optional, Any, Tuple
+import threading
+import time
+
+from app.core.config import settings
+
+
+def table_signature(db: Session, model) -> Tuple[Any, ...]:
+    """Дешевая сигнатура таблицы: число строк и последние created_at / updated_at"""
+    return tuple(db.query(func.count(), func.max(model.created_at), func.max(model.updated_at)).one())
+
+
+class SnapshotHolder(ABC):
+    """
+    Текущий неизменяемый снимок данных из БД (справочник, поисковый индекс).
+    
+    Снимок строится при старте и перестраивается после каждой записи; читатели
+    берут текущий без блокировок. Перестройки могут идти параллельно, поэтому
+    номер версии выдается до запроса, а подменяется снимок только более новой
+    версией: запрос с большим номером начат позже и видит все записи, после
+    которых запрашивались меньшие номера. Блокировка держится лишь на выдаче
+    номера и подмене, без обращений к БД, - reload вызывается и из run_sync
+    в потоке цикла событий, где ожидание на блокировке остановило бы цикл.
+    
+    Записи в других воркерах uvicorn до этого процесса не доходят, поэтому get
+    не чаще раза в check_interval секунд сверяет сигнатуру таблицы (probe) с
+    сигнатурой, снятой перед построением текущего снимка, и перестраивает
+    снимок, если она изменилась.
+    """
+    
+    def __init__(self, check_interval: Optional[float] = None):
+        self._snapshot: Optional[Any] = None
+        self._signature: Optional[Any] = None
+        self._installed_version = 0
+        self._next_version = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.check_interval = settings.snapshot_check_interval_seconds if check_interval is None else check_interval
+    
+    @abstractmethod
+    def build(self, db: Session, version: int) -> Any:
+        """Загрузить данные и построить снимок с номером version"""
+    
+    def probe(self, db: Session) -> Optional[Any]:
+        """Сигнатура исходных данных; None - не сверять снимок с БД"""
+        return None
+    
+    def get(self, db: Session) -> Any:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload(db)
+        
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            signature = self.probe(db)
+            if signature is not None and signature != self._signature:
+                snapshot = self.reload(db)
+        return snapshot
+    
+    def reload(self, db: Session) -> Any:
+        """Построить снимок и подменить текущий, если тот не новее; возвращает текущий снимок"""
+        with self._lock:
+            self._next_version += 1
+            version = self._next_version
+        
+        # Сигнатура снимается до построения: запись между ними лишь вызовет лишнюю перестройку
+        signature = self.probe(db)
+        snapshot = self.build(db, version)
+        
+        with self._lock:
+            if version > self._installed_version:
+                self._installed_version = version
+                self._snapshot = snapshot
+                self._signature = signature
+                self._checked_at = time.monotonic()
+            return self._snapshot
@@ -1,9 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
+import os
 
-from app.core.config import settings
+from app.core.config import settings, get_async_database_url
 
 # Создаем движок базы данных
 engine = create_engine(
@@ -15,6 +17,21 @@ engine = create_engine(
 # Создаем фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для эндпоинтов: запросы не блокируют цикл событий uvicorn
+async_engine = create_async_engine(
+    get_async_database_url(),
+    echo=settings.debug
+)
+
+# Фабрика асинхронных сессий (без expire_on_commit, чтобы объекты
+# оставались доступными при сериализации ответа после коммита)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -28,6 +45,32 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+# Dependency для получения асинхронной сессии базы данных
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Путь к конфигурации Alembic (backend/alembic.ini)
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+
+
+# Функция для применения миграций при старте приложения
+def run_migrations():
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+    
+    # База, созданная ранее через create_all, помечается начальной ревизией
+    table_names = inspect(engine).get_table_names()
+    if "alembic_version" not in table_names and "patients" in table_names:
+        command.stamp(config, "0001")
+    
+    command.upgrade(config, "head")
+
+
 # Функция для создания всех таблиц
 def create_tables():
     Base.metadata.create_all(bind=engine)
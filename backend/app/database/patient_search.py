@@ -0,0 +1,59 @@
+"""
+Индекс поиска пациентов на SQLite: таблица FTS5 с триграммным токенизатором
+и триггеры, синхронизирующие ее с patients.
+
+Таблица хранит собственную копию полей и patients.id (UNINDEXED), а не rowid
+строк patients: у таблицы со строковым первичным ключом rowid не постоянен
+(VACUUM и перестройка таблицы его меняют). Триггеры живут на patients и
+удаляются при batch-перестройке таблицы в Alembic, поэтому такая миграция
+должна вызвать create_patient_search_triggers после перестройки.
+"""
+from typing import Callable
+
+PATIENT_SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE patients_fts USING fts5("
+    "patient_id UNINDEXED, first_name, last_name, email, tokenize='trigram')"
+)
+
+# Строка индекса находится по триграммам прежнего email (он уникален и не короче
+# трех символов), а не перебором столбца patient_id, который FTS5 не индексирует
+_DELETE_OLD = (
+    "DELETE FROM patients_fts WHERE patient_id = old.id AND rowid IN ("
+    "SELECT rowid FROM patients_fts WHERE patients_fts MATCH "
+    "'email : \"' || replace(old.email, '\"', '\"\"') || '\"'); "
+)
+
+_INSERT_NEW = (
+    "INSERT INTO patients_fts(patient_id, first_name, last_name, email) "
+    "VALUES (new.id, new.first_name, new.last_name, new.email); "
+)
+
+PATIENT_SEARCH_TRIGGERS = {
+    "patients_fts_insert": f"CREATE TRIGGER patients_fts_insert AFTER INSERT ON patients BEGIN {_INSERT_NEW}END",
+    "patients_fts_delete": f"CREATE TRIGGER patients_fts_delete AFTER DELETE ON patients BEGIN {_DELETE_OLD}END",
+    "patients_fts_update": (
+        "CREATE TRIGGER patients_fts_update AFTER UPDATE OF id, first_name, last_name, email ON patients "
+        f"BEGIN {_DELETE_OLD}{_INSERT_NEW}END"
+    )
+}
+
+
+def create_patient_search_triggers(execute: Callable[[str], None]) -> None:
+    """Создать триггеры синхронизации (execute - op.execute или connection.exec_driver_sql)"""
+    for name, statement in PATIENT_SEARCH_TRIGGERS.items():
+        execute(f"DROP TRIGGER IF EXISTS {name}")
+        execute(statement)
+
+
+def drop_patient_search_triggers(execute: Callable[[str], None]) -> None:
+    for name in PATIENT_SEARCH_TRIGGERS:
+        execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def rebuild_patient_search_index(execute: Callable[[str], None]) -> None:
+    """Заполнить индекс заново по текущим строкам patients"""
+    execute("DELETE FROM patients_fts")
+    execute(
+        "INSERT INTO patients_fts(patient_id, first_name, last_name, email) "
+        "SELECT id, first_name, last_name, email FROM patients"
+    )
@@ -5,19 +5,35 @@ from contextlib import asynccontextmanager
 import uvicorn
 
 from app.core.config import settings
-from app.database.database import engine, Base
+from app.database.database import run_migrations
 from app.api.v1.api import api_router
+from app.services.appointment_reminder_service import reminder_scheduler
+from app.services.doctor_search_index import load_doctor_search_index
+from app.services.organ_catalog import load_organ_catalog
+from app.services.population_risk_service import population_risk_scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting up...")
-    # Создаем таблицы в базе данных
-    Base.metadata.create_all(bind=engine)
+    # Применяем миграции базы данных
+    run_migrations()
+    # Снимок справочника органов
+    load_organ_catalog()
+    # Поисковый индекс справочника врачей
+    load_doctor_search_index()
+    # Планировщик напоминаний о приеме
+    if settings.appointment_reminders_enabled:
+        reminder_scheduler.start()
+    # Периодический пересчет оценок риска пациентов
+    if settings.population_risk_enabled:
+        population_risk_scheduler.start()
     yield
     # Shutdown
     print("Shutting down...")
+    await reminder_scheduler.stop()
+    await population_risk_scheduler.stop()
 
 
 app = FastAPI(
@@ -39,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Курсор следующей страницы списков
 )
 
 # Подключение роутеров
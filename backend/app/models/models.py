@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.database import Base
@@ -7,6 +7,10 @@ import uuid
 
 class Patient(Base):
     __tablename__ = "patients"
+    __table_args__ = (
+        # Список пациентов: keyset-пагинация по (фамилия, id)
+        Index("ix_patients_last_name_id", "last_name", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     first_name = Column(String(100), nullable=False)
@@ -39,6 +43,10 @@ class Patient(Base):
 
 class Doctor(Base):
     __tablename__ = "doctors"
+    __table_args__ = (
+        # Список врачей: keyset-пагинация по (фамилия, id)
+        Index("ix_doctors_last_name_id", "last_name", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     first_name = Column(String(100), nullable=False)
@@ -63,6 +71,9 @@ class Doctor(Base):
 
 class MedicalRecord(Base):
     __tablename__ = "medical_records"
+    __table_args__ = (
+        Index("ix_medical_records_patient_date", "patient_id", "date"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
@@ -79,13 +90,27 @@ class MedicalRecord(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Связи
-    patient = relationship("Patient", back_populates="medical_records")
-    doctor = relationship("Doctor", back_populates="medical_records")
+    # Связи (selectin: связанные объекты загружаются заранее и доступны
+    # при сериализации ответа вне асинхронной сессии)
+    patient = relationship("Patient", back_populates="medical_records", lazy="selectin")
+    doctor = relationship("Doctor", back_populates="medical_records", lazy="selectin")
 
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Расписание врача и проверка слотов: doctor_id + date (+ time, status)
+        Index(
+            "ix_appointments_doctor_date_time_status",
+            "doctor_id", "date", "time", "status",
+            postgresql_include=["duration"]
+        ),
+        Index("ix_appointments_patient_date", "patient_id", "date"),
+        # Выборка назначений, попадающих в окно напоминаний
+        Index("ix_appointments_date_time", "date", "time"),
+        # Список назначений: keyset-пагинация по (дата, id)
+        Index("ix_appointments_date_id", "date", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
@@ -104,13 +129,17 @@ class Appointment(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Связи
-    patient = relationship("Patient", back_populates="appointments")
-    doctor = relationship("Doctor", back_populates="appointments")
+    # Связи (selectin: связанные объекты загружаются заранее и доступны
+    # при сериализации ответа вне асинхронной сессии)
+    patient = relationship("Patient", back_populates="appointments", lazy="selectin")
+    doctor = relationship("Doctor", back_populates="appointments", lazy="selectin")
 
 
 class HealthData(Base):
     __tablename__ = "health_data"
+    __table_args__ = (
+        Index("ix_health_data_patient_recorded_at", "patient_id", "recorded_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     patient_id = Column(String, ForeignKey("patients.id"), nullable=False)
@@ -135,6 +164,58 @@ class HealthData(Base):
     patient = relationship("Patient", back_populates="health_data")
 
 
+class HealthDailyRollup(Base):
+    __tablename__ = "health_daily_rollup"
+    
+    # Дневной агрегат показателя пациента
+    patient_id = Column(String, ForeignKey("patients.id"), primary_key=True)
+    metric = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0.0)
+    sum_sq = Column(Float, nullable=False, default=0.0)  # Сумма квадратов (для дисперсии)
+    min_value = Column(Float)
+    max_value = Column(Float)
+
+
+class HealthMetricDailyCount(Base):
+    __tablename__ = "health_metric_daily_counts"
+    
+    # Количество показаний метрики за день по всем пациентам, разложенное по
+    # нескольким строкам (shard): запись меняет одну из них, чтение суммирует все
+    metric = Column(String(50), primary_key=True)
+    day = Column(Date, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class HealthMetricSketchRegister(Base):
+    __tablename__ = "health_metric_sketch_registers"
+    
+    # Ненулевой регистр скетча HyperLogLog пациентов, у которых есть показания метрики
+    metric = Column(String(50), primary_key=True)
+    register = Column(Integer, primary_key=True)
+    rank = Column(Integer, nullable=False)
+
+
+class PatientRiskScore(Base):
+    __tablename__ = "patient_risk_scores"
+    __table_args__ = (
+        # Список пациентов с наибольшим риском (в целом и по уровню риска)
+        Index("ix_patient_risk_scores_score", "risk_score"),
+        Index("ix_patient_risk_scores_level_score", "risk_level", "risk_score"),
+    )
+    
+    # Материализованная оценка риска пациента по последним показателям
+    patient_id = Column(String, ForeignKey("patients.id"), primary_key=True)
+    risk_score = Column(Integer, nullable=False)
+    risk_level = Column(String(20), nullable=False)  # high, medium, low, minimal
+    risk_factors = Column(JSON)  # Метрики вне нормы: metric, value, severity
+    last_recorded_at = Column(DateTime(timezone=True))
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class Organ(Base):
     __tablename__ = "organs"
     
@@ -185,11 +266,17 @@ class Medication(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_recipient_read_created", "recipient_id", "is_read", "created_at"),
+        # Список уведомлений: keyset-пагинация по (created_at, id)
+        Index("ix_notifications_created_id", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String(200), nullable=False)
     message = Column(Text, nullable=False)
     type = Column(String(20), nullable=False)  # info, warning, error, success
+    priority = Column(String(20), default="medium", server_default="medium")  # low, medium, high, urgent
     
     # Получатель (может быть пациент или врач)
     recipient_id = Column(String, nullable=False)
@@ -203,6 +290,25 @@ class Notification(Base):
     read_at = Column(DateTime(timezone=True))
 
 
+class NotificationUnreadCounter(Base):
+    __tablename__ = "notification_unread_counters"
+    
+    # Материализованный счетчик непрочитанных уведомлений получателя
+    recipient_id = Column(String, primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AppointmentReminder(Base):
+    __tablename__ = "appointment_reminders"
+    
+    # Отправленное напоминание: одно на назначение и окно (часов до приема)
+    appointment_id = Column(String, ForeignKey("appointments.id"), primary_key=True)
+    hours_before = Column(Integer, primary_key=True)
+    notification_id = Column(String, nullable=False)
+    sent_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class ResearchItem(Base):
     __tablename__ = "research_items"
     
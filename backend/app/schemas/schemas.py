@@ -173,6 +173,24 @@ class HealthData(HealthDataBase):
     created_at: datetime
 
 
+class HealthDataBatchItem(HealthDataCreate):
+    recorded_at: Optional[datetime] = None
+
+
+class HealthDataBatchError(BaseSchema):
+    index: int
+    patient_id: Optional[str] = None
+    error: str
+
+
+class HealthDataBatchResult(BaseSchema):
+    created: int
+    failed: int
+    ids: List[str]
+    notifications: int
+    errors: List[HealthDataBatchError]
+
+
 # Схемы для назначений
 class AppointmentBase(BaseSchema):
     patient_id: str
@@ -281,6 +299,7 @@ class NotificationBase(BaseSchema):
     title: str
     message: str
     type: NotificationTypeEnum
+    priority: NotificationPriorityEnum = NotificationPriorityEnum.medium
     recipient_id: str
     recipient_type: str  # patient, doctor
 
@@ -293,6 +312,7 @@ class NotificationUpdate(BaseSchema):
     title: Optional[str] = None
     message: Optional[str] = None
     type: Optional[NotificationTypeEnum] = None
+    priority: Optional[NotificationPriorityEnum] = None
     is_read: Optional[bool] = None
 
 
@@ -7,6 +7,15 @@ from .appointment_service import AppointmentService
 from .notification_service import NotificationService
 from .analytics_service import AnalyticsService
 from .organ_service import OrganService
+from .async_services import (
+    AsyncPatientService,
+    AsyncDoctorService,
+    AsyncHealthService,
+    AsyncAppointmentService,
+    AsyncNotificationService,
+    AsyncAnalyticsService,
+    AsyncOrganService
+)
 
 __all__ = [
     "PatientService",
@@ -15,5 +24,12 @@ __all__ = [
     "AppointmentService",
     "NotificationService",
     "AnalyticsService",
-    "OrganService"
+    "OrganService",
+    "AsyncPatientService",
+    "AsyncDoctorService",
+    "AsyncHealthService",
+    "AsyncAppointmentService",
+    "AsyncNotificationService",
+    "AsyncAnalyticsService",
+    "AsyncOrganService"
 ]
\ No newline at end of file
@@ -1,13 +1,23 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func, extract
+from sqlalchemy import and_, or_, desc, func, extract, cast, Date, Integer
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
 import statistics
+import numpy as np
 from collections import defaultdict
 
+from app.core.cache import cache, DASHBOARD_OVERVIEW_KEY
+from app.core.config import settings
 from app.models.models import Patient, Doctor, Appointment, HealthData, Organ
 from app.schemas.schemas import AppointmentStatusEnum, HealthMetric
-from app.services.health_service import HealthService
+from app.services.health_service import HealthService, METRIC_UNITS
+from app.services.health_thresholds import (
+    health_thresholds, STATUS_BORDERLINE, STATUS_WARNING, STATUS_CRITICAL
+)
+from app.services.population_risk_service import PopulationRiskService
+
+# Названия дней недели в порядке нумерации SQL (0 - воскресенье)
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
 
 
 class AnalyticsService:
@@ -156,20 +166,12 @@ class AnalyticsService:
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days)
         
-        query = self.db.query(HealthData).filter(
-            and_(
-                HealthData.metric == metric,
-                HealthData.recorded_at >= datetime.combine(start_date, datetime.min.time()),
-                HealthData.recorded_at <= datetime.combine(end_date, datetime.max.time())
-            )
+        # Читаем не более days строк дневных агрегатов вместо всех показаний
+        rollups = self.health_service.rollups.get_daily_rollups(
+            metric.value, start_date, end_date, patient_id
         )
         
-        if patient_id:
-            query = query.filter(HealthData.patient_id == patient_id)
-        
-        health_data = query.order_by(HealthData.recorded_at).all()
-        
-        if not health_data:
+        if not rollups:
             return {
                 "metric": metric.value,
                 "period_days": days,
@@ -178,90 +180,88 @@ class AnalyticsService:
                 "statistics": {}
             }
         
-        # Группируем данные по дням
-        daily_data = defaultdict(list)
-        for record in health_data:
-            day = record.recorded_at.date()
-            daily_data[day].append(record.value)
-        
         # Создаем тренд данные
         trend_data = []
-        for day in sorted(daily_data.keys()):
-            values = daily_data[day]
+        for day in rollups:
             trend_data.append({
-                "date": day.isoformat(),
-                "average_value": round(statistics.mean(values), 2),
-                "min_value": min(values),
-                "max_value": max(values),
-                "count": len(values)
+                "date": day["date"].isoformat(),
+                "average_value": round(day["sum"] / day["count"], 2),
+                "min_value": day["min"],
+                "max_value": day["max"],
+                "count": day["count"]
             })
         
         # Статистика
-        all_values = [record.value for record in health_data]
+        summary = self.health_service.rollups.summarize(rollups)
         statistics_data = {
-            "total_records": len(all_values),
-            "average": round(statistics.mean(all_values), 2),
-            "median": round(statistics.median(all_values), 2),
-            "min": min(all_values),
-            "max": max(all_values),
-            "std_deviation": round(statistics.stdev(all_values) if len(all_values) > 1 else 0, 2)
+            "total_records": summary["count"],
+            "average": round(summary["average"], 2),
+            "min": summary["min"],
+            "max": summary["max"],
+            "std_deviation": round(summary["std_deviation"], 2)
         }
         
         return {
             "metric": metric.value,
             "period_days": days,
-            "total_records": len(health_data),
+            "total_records": summary["count"],
             "trend_data": trend_data,
             "statistics": statistics_data,
             "generated_at": datetime.now().isoformat()
         }
     
     def get_dashboard_overview(self) -> Dict[str, Any]:
-        """Получить обзор для дашборда"""
+        """Получить обзор для дашборда (кэшируется, сбрасывается при записи данных)"""
+        return cache.get_or_set(
+            DASHBOARD_OVERVIEW_KEY,
+            self._build_dashboard_overview,
+            settings.dashboard_cache_ttl
+        )
+    
+    def _build_dashboard_overview(self) -> Dict[str, Any]:
+        """Посчитать обзор для дашборда"""
         today = datetime.now().date()
         
         # Общие счетчики
-        total_patients = self.db.query(Patient).filter(
-            Patient.is_deleted == False
-        ).count()
+        total_patients = self.db.query(func.count(Patient.id)).filter(
+            Patient.is_active == True
+        ).scalar()
         
-        total_doctors = self.db.query(Doctor).filter(
-            Doctor.is_deleted == False
-        ).count()
+        total_doctors = self.db.query(func.count(Doctor.id)).filter(
+            Doctor.is_active == True
+        ).scalar()
         
         # Назначения на сегодня
-        today_appointments = self.db.query(Appointment).filter(
+        today_appointments = self.db.query(func.count(Appointment.id)).filter(
             and_(
-                Appointment.appointment_date == today,
+                Appointment.date == today.isoformat(),
                 Appointment.status.in_([AppointmentStatusEnum.scheduled, AppointmentStatusEnum.confirmed])
             )
-        ).count()
+        ).scalar()
         
-        # Критические показатели здоровья за последние 24 часа
+        # Критические показатели здоровья за последние 24 часа (пороги проверяются в SQL)
         yesterday = datetime.now() - timedelta(days=1)
-        critical_health_records = self.db.query(HealthData).filter(
-            HealthData.recorded_at >= yesterday
-        ).all()
-        
-        critical_count = 0
-        for record in critical_health_records:
-            if self.health_service._is_critical_value(record.metric, record.value):
-                critical_count += 1
+        critical_count = self.db.query(func.count(HealthData.id)).filter(
+            and_(
+                HealthData.recorded_at >= yesterday,
+                self.health_service.get_critical_filter()
+            )
+        ).scalar()
         
         # Статистика назначений за неделю
         week_ago = today - timedelta(days=7)
-        week_appointments = self.db.query(Appointment).filter(
-            Appointment.appointment_date >= week_ago
-        ).count()
+        week_appointments = self.db.query(func.count(Appointment.id)).filter(
+            Appointment.date >= week_ago.isoformat()
+        ).scalar()
         
         # Новые пациенты за месяц
         month_ago = datetime.now() - timedelta(days=30)
-        new_patients = self.db.query(Patient).filter(
+        new_patients = self.db.query(func.count(Patient.id)).filter(
             and_(
                 Patient.created_at >= month_ago,
-                Patient.is_deleted == False
+                Patient.is_active == True
             )
-        ).count()
+        ).scalar()
         
         return {
             "overview": {
@@ -275,42 +275,52 @@ class AnalyticsService:
             "generated_at": datetime.now().isoformat()
         }
     
-    def get_critical_alerts(self, hours: int = 24) -> List[Dict[str, Any]]:
+    def get_critical_alerts(self, hours: int = 24, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Получить критические предупреждения"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
-        health_data = self.db.query(HealthData).filter(
-            HealthData.recorded_at >= cutoff_time
-        ).order_by(desc(HealthData.recorded_at)).all()
+        # Пороги проверяются в SQL, имя пациента подтягивается тем же запросом
+        query = self.db.query(
+            HealthData,
+            Patient.first_name,
+            Patient.last_name
+        ).outerjoin(
+            Patient, Patient.id == HealthData.patient_id
+        ).filter(
+            and_(
+                HealthData.recorded_at >= cutoff_time,
+                self.health_service.get_critical_filter()
+            )
+        ).order_by(desc(HealthData.recorded_at))
+        
+        if limit:
+            query = query.limit(limit)
         
         alerts = []
-        for record in health_data:
-            if self.health_service._is_critical_value(record.metric, record.value):
-                patient = self.db.query(Patient).filter(
-                    Patient.id == record.patient_id
-                ).first()
-                
-                normal_range = self.health_service.normal_ranges.get(record.metric, "Неизвестно")
+        for record, first_name, last_name in query.all():
+            for metric in self.health_service.critical_ranges:
+                value = getattr(record, metric, None)
+                if not self.health_service._is_critical_value(metric, value):
+                    continue
                 
                 alerts.append({
                     "patient_id": record.patient_id,
-                    "patient_name": f"{patient.first_name} {patient.last_name}" if patient else "Unknown",
-                    "metric": record.metric.value,
-                    "value": record.value,
-                    "unit": record.unit,
-                    "normal_range": normal_range,
+                    "patient_name": f"{first_name} {last_name}" if first_name else "Unknown",
+                    "metric": metric,
+                    "value": value,
+                    "unit": METRIC_UNITS.get(metric),
+                    "normal_range": self.health_service.normal_ranges.get(metric, "Неизвестно"),
                     "recorded_at": record.recorded_at.isoformat(),
                     "severity": "critical"
                 })
         
-        return alerts
+        return alerts[:limit] if limit else alerts
     
     def get_patient_risk_assessment(self, patient_id: str) -> Dict[str, Any]:
-        """Получить оценку рисков пациента"""
-        # Получаем последние данные о здоровье
-        latest_data = self.health_service.get_latest_health_data(patient_id)
+        """Получить оценку рисков пациента по последним значениям метрик"""
+        assessments = PopulationRiskService(self.db).assess([patient_id])
         
-        if not latest_data:
+        if not assessments:
             return {
                 "patient_id": patient_id,
                 "risk_level": "unknown",
@@ -318,92 +328,104 @@ class AnalyticsService:
                 "recommendations": ["Необходимо провести обследование"]
             }
         
-        risk_factors = []
-        risk_score = 0
-        
-        # Анализируем каждую метрику
-        for data in latest_data:
-            metric = data.metric
-            value = data.value
-            
-            # Проверяем критические значения
-            if self.health_service._is_critical_value(metric, value):
-                risk_factors.append({
-                    "metric": metric.value,
-                    "value": value,
-                    "severity": "high",
-                    "description": f"Критическое значение {metric.value}: {value}"
-                })
-                risk_score += 3
-            
-            # Проверяем пограничные значения
-            elif self._is_borderline_value(metric, value):
-                risk_factors.append({
-                    "metric": metric.value,
-                    "value": value,
-                    "severity": "medium",
-                    "description": f"Пограничное значение {metric.value}: {value}"
-                })
-                risk_score += 1
-        
-        # Определяем уровень риска
-        if risk_score >= 6:
-            risk_level = "high"
-        elif risk_score >= 3:
-            risk_level = "medium"
-        elif risk_score >= 1:
-            risk_level = "low"
-        else:
-            risk_level = "minimal"
-        
-        # Генерируем рекомендации
-        recommendations = self._generate_risk_recommendations(risk_level, risk_factors)
+        assessment = assessments[0]
         
         return {
             "patient_id": patient_id,
-            "risk_level": risk_level,
-            "risk_score": risk_score,
-            "risk_factors": risk_factors,
-            "recommendations": recommendations,
+            "risk_level": assessment["risk_level"],
+            "risk_score": assessment["risk_score"],
+            "risk_factors": assessment["risk_factors"],
+            "recommendations": self._generate_risk_recommendations(
+                assessment["risk_level"], assessment["risk_factors"]
+            ),
             "assessment_date": datetime.now().isoformat()
         }
     
-    def get_appointment_statistics(self, days: int = 30) -> Dict[str, Any]:
+    def get_patients_risk_assessment(self, risk_level: Optional[str] = None, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Пациенты с наибольшим риском из периодически пересчитываемой таблицы оценок
+        и время пересчета; None, если оценки еще не рассчитывались.
+        """
+        service = PopulationRiskService(self.db)
+        computed_at = service.get_computed_at()
+        if computed_at is None:
+            return None
+        
+        return {
+            "computed_at": computed_at.isoformat(),
+            "patients": service.get_top_risk(risk_level, limit)
+        }
+    
+    def get_appointment_statistics(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        doctor_id: Optional[str] = None,
+        days: int = 30
+    ) -> Dict[str, Any]:
         """Получить статистику назначений"""
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days)
+        date_to = date_to or datetime.now().date()
+        date_from = date_from or date_to - timedelta(days=days)
+        
+        # Корзины по дню недели и часу; подсчет одним GROUP BY без загрузки строк
+        weekday = self._weekday_expression(Appointment.date).label("weekday")
+        hour = func.substr(Appointment.time, 1, 2).label("hour")
+        
+        query = self.db.query(
+            Appointment.status,
+            weekday,
+            hour,
+            func.count(Appointment.id)
+        ).filter(
+            and_(
+                Appointment.date >= date_from.isoformat(),
+                Appointment.date <= date_to.isoformat()
+            )
+        )
         
-        appointments = self.db.query(Appointment).filter(
-            Appointment.appointment_date >= start_date
-        ).all()
+        if doctor_id:
+            query = query.filter(Appointment.doctor_id == doctor_id)
         
-        # Статистика по статусам
-        status_stats = {}
-        for status in AppointmentStatusEnum:
-            count = len([a for a in appointments if a.status == status])
-            status_stats[status.value] = count
+        rows = query.group_by(Appointment.status, weekday, hour).all()
         
-        # Статистика по дням недели
+        status_stats = {status.value: 0 for status in AppointmentStatusEnum}
         weekday_stats = defaultdict(int)
-        for appointment in appointments:
-            weekday = appointment.appointment_date.strftime('%A')
-            weekday_stats[weekday] += 1
-        
-        # Статистика по часам
         hour_stats = defaultdict(int)
-        for appointment in appointments:
-            hour = appointment.appointment_time.hour
-            hour_stats[f"{hour:02d}:00"] += 1
+        total = 0
+        
+        for status, weekday_number, hour_value, count in rows:
+            total += count
+            if status in status_stats:
+                status_stats[status] += count
+            if weekday_number is not None:
+                weekday_stats[WEEKDAY_NAMES[int(weekday_number)]] += count
+            if hour_value:
+                hour_stats[f"{hour_value}:00"] += count
         
         return {
-            "period_days": days,
-            "total_appointments": len(appointments),
+            "period_days": (date_to - date_from).days,
+            "total_appointments": total,
             "status_distribution": status_stats,
             "weekday_distribution": dict(weekday_stats),
-            "hour_distribution": dict(hour_stats),
+            "hour_distribution": dict(sorted(hour_stats.items())),
             "generated_at": datetime.now().isoformat()
         }
     
+    def patient_exists(self, patient_id: str) -> bool:
+        """Проверить существование пациента"""
+        return self.db.query(Patient.id).filter(
+            and_(
+                Patient.id == patient_id,
+                Patient.is_active == True
+            )
+        ).first() is not None
+    
+    def _weekday_expression(self, column):
+        """День недели (0 - воскресенье) для даты в формате YYYY-MM-DD"""
+        if self.db.get_bind().dialect.name == "sqlite":
+            return cast(func.strftime("%w", column), Integer)
+        return cast(extract("dow", cast(column, Date)), Integer)
+    
     def _calculate_trend(self, values: List[float]) -> Dict[str, Any]:
         """Рассчитать тренд для списка значений"""
         if len(values) < 2:
@@ -437,57 +459,33 @@ class AnalyticsService:
         if not metrics_data:
             return 0
         
-        total_score = 0
-        metric_count = 0
+        codes = self._classify_latest(metrics_data)
         
-        for metric, values in metrics_data.items():
-            latest_value = values[-1]["value"]
-            
-            # Получаем оценку для метрики (0-100)
-            metric_score = self._get_metric_score(metric, latest_value)
-            total_score += metric_score
-            metric_count += 1
+        # Оценка метрики: 30 - критическое, 70 - пограничное, 90 - нормальное значение
+        scores = np.where(
+            codes == STATUS_CRITICAL, 30,
+            np.where((codes == STATUS_BORDERLINE) | (codes == STATUS_WARNING), 70, 90)
+        )
         
-        return round(total_score / metric_count) if metric_count > 0 else 0
+        return int(round(scores.mean()))
     
-    def _get_metric_score(self, metric: HealthMetric, value: float) -> int:
-        """Получить оценку для конкретной метрики (0-100)"""
-        # Упрощенная логика оценки
-        if self.health_service._is_critical_value(metric, value):
-            return 30  # Критическое значение
-        elif self._is_borderline_value(metric, value):
-            return 70  # Пограничное значение
-        else:
-            return 90  # Нормальное значение
-    
-    def _is_borderline_value(self, metric: HealthMetric, value: float) -> bool:
-        """Проверить, является ли значение пограничным"""
-        # Упрощенная логика для пограничных значений
-        borderline_ranges = {
-            HealthMetric.blood_pressure_systolic: (130, 139),
-            HealthMetric.blood_pressure_diastolic: (80, 89),
-            HealthMetric.heart_rate: (100, 110),
-            HealthMetric.blood_sugar: (100, 125),
-            HealthMetric.cholesterol: (200, 239),
-            HealthMetric.bmi: (25, 29.9)
-        }
-        
-        if metric in borderline_ranges:
-            min_val, max_val = borderline_ranges[metric]
-            return min_val <= value <= max_val
-        
-        return False
+    def _classify_latest(self, metrics_data: Dict) -> np.ndarray:
+        """Коды статусов последних значений метрик одним вызовом"""
+        return health_thresholds.classify(
+            list(metrics_data.keys()),
+            [values[-1]["value"] for values in metrics_data.values()]
+        )
     
     def _generate_recommendations(self, metrics_data: Dict) -> List[str]:
         """Генерировать рекомендации на основе данных о здоровье"""
         recommendations = []
         
-        for metric, values in metrics_data.items():
-            latest_value = values[-1]["value"]
-            
-            if self.health_service._is_critical_value(metric, latest_value):
+        codes = self._classify_latest(metrics_data) if metrics_data else []
+        
+        for metric, code in zip(metrics_data.keys(), codes):
+            if code == STATUS_CRITICAL:
                 recommendations.append(f"Срочно обратитесь к врачу по поводу {metric.value}")
-            elif self._is_borderline_value(metric, latest_value):
+            elif code in (STATUS_BORDERLINE, STATUS_WARNING):
                 recommendations.append(f"Следите за показателем {metric.value}, рекомендуется консультация врача")
         
         if not recommendations:
@@ -0,0 +1,177 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from collections import defaultdict
+import uuid
+
+from app.core.config import settings
+from app.core.scheduler import PeriodicJob
+from app.database.database import SessionLocal
+from app.models.models import Appointment, AppointmentReminder, Doctor, Notification
+from app.schemas.schemas import AppointmentStatusEnum, NotificationTypeEnum, NotificationPriorityEnum
+from app.services.notification_counter_service import NotificationCounterService
+from app.services.notification_events import queue_notification_events
+
+# Количество напоминаний, создаваемых в одной транзакции
+REMINDER_BATCH_SIZE = 1000
+
+# Статусы назначений, о которых напоминаем
+REMINDER_STATUSES = [AppointmentStatusEnum.scheduled.value, AppointmentStatusEnum.confirmed.value]
+
+
+def reminder_message(appointment_date: str, appointment_time: str, first_name: Optional[str], last_name: Optional[str]) -> str:
+    """Текст напоминания о приеме"""
+    doctor_name = f"Dr. {first_name} {last_name}" if first_name else "врачом"
+    formatted_date = datetime.strptime(appointment_date, "%Y-%m-%d").strftime("%d.%m.%Y")
+    return f"У вас назначен прием с {doctor_name} на {formatted_date} в {appointment_time}"
+
+
+class AppointmentReminderService:
+    """Рассылка напоминаний о приемах, попадающих в окно перед началом"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.counters = NotificationCounterService(db)
+    
+    def get_due_appointments(self, now: datetime, hours_before: int, limit: int) -> List[Any]:
+        """
+        Назначения, начинающиеся в ближайшие hours_before часов, без отправленного напоминания.
+        
+        Один запрос: диапазон по индексу (date, time), врач - через JOIN,
+        уже отправленные напоминания исключаются через LEFT JOIN.
+        """
+        window_end = now + timedelta(hours=hours_before)
+        start = (now.strftime("%Y-%m-%d"), now.strftime("%H:%M"))
+        end = (window_end.strftime("%Y-%m-%d"), window_end.strftime("%H:%M"))
+        
+        return self.db.query(
+            Appointment.id,
+            Appointment.patient_id,
+            Appointment.date,
+            Appointment.time,
+            Doctor.first_name,
+            Doctor.last_name
+        ).outerjoin(
+            Doctor, Doctor.id == Appointment.doctor_id
+        ).outerjoin(
+            AppointmentReminder,
+            and_(
+                AppointmentReminder.appointment_id == Appointment.id,
+                AppointmentReminder.hours_before == hours_before
+            )
+        ).filter(
+            and_(
+                Appointment.date.between(start[0], end[0]),
+                tuple_(Appointment.date, Appointment.time) > start,
+                tuple_(Appointment.date, Appointment.time) <= end,
+                Appointment.status.in_(REMINDER_STATUSES),
+                AppointmentReminder.appointment_id.is_(None)
+            )
+        ).order_by(Appointment.date, Appointment.time, Appointment.id).limit(limit).all()
+    
+    def dispatch_due_reminders(
+        self,
+        now: Optional[datetime] = None,
+        hours_before: Optional[int] = None,
+        batch_size: int = REMINDER_BATCH_SIZE
+    ) -> Dict[str, Any]:
+        """
+        Создать напоминания по всем назначениям в окне.
+        
+        Каждая пачка - одна транзакция: вставка уведомлений, записей об отправке
+        и обновление счетчиков. Первичный ключ appointment_reminders не дает
+        отправить напоминание дважды, даже если рассылку запустили параллельно:
+        назначения, напоминание о которых уже записал другой процесс, пропускаются,
+        остальные из пачки отправляются.
+        """
+        now = now or datetime.now()
+        hours_before = hours_before or settings.appointment_reminder_hours_before
+        
+        sent = 0
+        batches = 0
+        
+        while True:
+            appointments = self.get_due_appointments(now, hours_before, batch_size)
+            if not appointments:
+                break
+            
+            sent += self._send_batch(appointments, hours_before)
+            self.db.commit()
+            batches += 1
+            
+            if len(appointments) < batch_size:
+                break
+        
+        return {"sent": sent, "batches": batches, "hours_before": hours_before, "checked_at": now.isoformat()}
+    
+    def _send_batch(self, appointments: List[Any], hours_before: int) -> int:
+        """
+        Вставить записи об отправке и уведомления пачкой; возвращает число отправленных.
+        
+        Записи вставляются с ON CONFLICT DO NOTHING, уведомления создаются только
+        для вставленных. Коммит выполняет вызывающий код.
+        """
+        now = datetime.utcnow()
+        notifications = []
+        reminders = []
+        
+        for appointment in appointments:
+            notification_id = str(uuid.uuid4())
+            notifications.append({
+                "id": notification_id,
+                "title": "Напоминание о приеме",
+                "message": reminder_message(appointment.date, appointment.time, appointment.first_name, appointment.last_name),
+                "type": NotificationTypeEnum.appointment_reminder.value,
+                "priority": NotificationPriorityEnum.medium.value,
+                "recipient_id": appointment.patient_id,
+                "recipient_type": "patient",
+                "is_read": False,
+                "created_at": now
+            })
+            reminders.append({
+                "appointment_id": appointment.id,
+                "hours_before": hours_before,
+                "notification_id": notification_id,
+                "sent_at": now
+            })
+        
+        if self.db.get_bind().dialect.name == "postgresql":
+            insert = postgresql.insert
+        else:
+            insert = sqlite.insert
+        
+        table = AppointmentReminder.__table__
+        inserted = set(self.db.execute(
+            insert(table).on_conflict_do_nothing().returning(table.c.notification_id),
+            reminders
+        ).scalars())
+        if not inserted:
+            return 0
+        
+        notifications = [notification for notification in notifications if notification["id"] in inserted]
+        unread_deltas = defaultdict(int)
+        for notification in notifications:
+            unread_deltas[notification["recipient_id"]] += 1
+        
+        self.db.execute(Notification.__table__.insert(), notifications)
+        self.counters.add(unread_deltas)
+        queue_notification_events(self.db, notifications)
+        return len(notifications)
+
+
+def run_reminder_dispatch() -> Dict[str, Any]:
+    """Одна рассылка в отдельной сессии (для планировщика и командной строки)"""
+    db = SessionLocal()
+    try:
+        return AppointmentReminderService(db).dispatch_due_reminders()
+    finally:
+        db.close()
+
+
+reminder_scheduler = PeriodicJob(
+    run_reminder_dispatch,
+    settings.appointment_reminder_interval_seconds,
+    "рассылки напоминаний о приеме"
+)
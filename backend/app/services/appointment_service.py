@@ -1,12 +1,20 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
-from typing import List, Optional, Dict, Any
+from sqlalchemy import and_, or_, func
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, time, timedelta
+from collections import defaultdict
 import uuid
 
+from app.core.cache import invalidate_dashboard
+from app.core.pagination import Page, keyset_paginate
 from app.models.models import Appointment, Patient, Doctor
 from app.schemas.schemas import AppointmentCreate, AppointmentUpdate, AppointmentStatusEnum
 
+# Рабочие часы (можно вынести в настройки врача)
+WORK_START = time(9, 0)  # 9:00
+WORK_END = time(17, 0)   # 17:00
+SLOT_DURATION = 30       # 30 минут
+
 
 class AppointmentService:
     def __init__(self, db: Session):
@@ -20,9 +28,10 @@ class AppointmentService:
         doctor_id: Optional[str] = None,
         status: Optional[AppointmentStatusEnum] = None,
         date_from: Optional[date] = None,
-        date_to: Optional[date] = None
-    ) -> List[Appointment]:
-        """Получить список назначений с фильтрацией"""
+        date_to: Optional[date] = None,
+        cursor: Optional[str] = None
+    ) -> Page:
+        """Получить список назначений с фильтрацией, новые даты первыми (keyset-пагинация по курсору)"""
         query = self.db.query(Appointment)
         
         if patient_id:
@@ -35,12 +44,12 @@ class AppointmentService:
             query = query.filter(Appointment.status == status)
         
         if date_from:
-            query = query.filter(Appointment.appointment_date >= date_from)
+            query = query.filter(Appointment.date >= date_from.isoformat())
         
         if date_to:
-            query = query.filter(Appointment.appointment_date <= date_to)
+            query = query.filter(Appointment.date <= date_to.isoformat())
         
-        return query.order_by(desc(Appointment.appointment_date)).offset(skip).limit(limit).all()
+        return keyset_paginate(query, [Appointment.date, Appointment.id], limit, cursor, skip, descending=True)
     
     def get_appointment(self, appointment_id: str) -> Optional[Appointment]:
         """Получить назначение по ID"""
@@ -65,6 +74,7 @@ class AppointmentService:
         
         self.db.add(appointment)
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(appointment)
         return appointment
     
@@ -82,6 +92,7 @@ class AppointmentService:
         appointment.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(appointment)
         return appointment
     
@@ -95,6 +106,7 @@ class AppointmentService:
         appointment.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
         return True
     
     def update_appointment_status(self, appointment_id: str, status: AppointmentStatusEnum, notes: Optional[str] = None) -> Optional[Appointment]:
@@ -109,6 +121,7 @@ class AppointmentService:
         appointment.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(appointment)
         return appointment
     
@@ -117,14 +130,37 @@ class AppointmentService:
         doctor_id: str,
         appointment_date: date,
         appointment_time: time,
-        exclude_appointment_id: Optional[str] = None
+        exclude_appointment_id: Optional[str] = None,
+        duration: Optional[int] = None
     ) -> bool:
-        """Проверить, занято ли время у врача"""
-        query = self.db.query(Appointment).filter(
+        """Проверить, пересекается ли прием с занятыми интервалами врача (с учетом длительности)"""
+        start = appointment_time.hour * 60 + appointment_time.minute
+        end = start + (duration or SLOT_DURATION)
+        
+        booked = self.get_booked_intervals([doctor_id], appointment_date, appointment_date, exclude_appointment_id)
+        return any(
+            booked_start < end and start < booked_end
+            for booked_start, booked_end in booked.get((doctor_id, appointment_date.isoformat()), [])
+        )
+    
+    def get_booked_intervals(
+        self,
+        doctor_ids: List[str],
+        date_from: date,
+        date_to: date,
+        exclude_appointment_id: Optional[str] = None
+    ) -> Dict[Tuple[str, str], List[Tuple[int, int]]]:
+        """Получить занятые интервалы врачей за период одним запросом"""
+        query = self.db.query(
+            Appointment.doctor_id,
+            Appointment.date,
+            Appointment.time,
+            Appointment.duration
+        ).filter(
             and_(
-                Appointment.doctor_id == doctor_id,
-                Appointment.appointment_date == appointment_date,
-                Appointment.appointment_time == appointment_time,
+                Appointment.doctor_id.in_(doctor_ids),
+                Appointment.date >= date_from.isoformat(),
+                Appointment.date <= date_to.isoformat(),
                 Appointment.status.in_([AppointmentStatusEnum.scheduled, AppointmentStatusEnum.confirmed])
             )
         )
@@ -132,38 +168,74 @@ class AppointmentService:
         if exclude_appointment_id:
             query = query.filter(Appointment.id != exclude_appointment_id)
         
-        return query.first() is not None
+        # Интервалы в минутах от начала дня: (начало, конец)
+        intervals = defaultdict(list)
+        for doctor_id, appointment_date, appointment_time, duration in query.all():
+            hours, minutes = map(int, appointment_time.split(":"))
+            start = hours * 60 + minutes
+            intervals[(doctor_id, appointment_date)].append((start, start + (duration or SLOT_DURATION)))
+        
+        return intervals
     
     def get_available_slots(self, doctor_id: str, appointment_date: date) -> List[Dict[str, Any]]:
         """Получить доступные временные слоты для врача"""
-        # Рабочие часы (можно вынести в настройки врача)
-        work_start = time(9, 0)  # 9:00
-        work_end = time(17, 0)   # 17:00
-        slot_duration = 30       # 30 минут
-        
-        # Генерируем все возможные слоты
-        available_slots = []
-        current_time = datetime.combine(appointment_date, work_start)
-        end_time = datetime.combine(appointment_date, work_end)
-        
-        while current_time < end_time:
-            slot_time = current_time.time()
-            
-            # Проверяем, не занят ли слот
-            if not self.is_time_slot_taken(doctor_id, appointment_date, slot_time):
-                available_slots.append({
-                    "time": slot_time.strftime("%H:%M"),
-                    "available": True
-                })
+        slots = self.get_available_slots_range([doctor_id], appointment_date, appointment_date)
+        return slots[doctor_id][appointment_date.isoformat()]
+    
+    def get_available_slots_range(
+        self,
+        doctor_ids: List[str],
+        date_from: date,
+        date_to: date
+    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Получить сетку слотов для нескольких врачей за период"""
+        booked = self.get_booked_intervals(doctor_ids, date_from, date_to)
+        
+        # Генерируем сетку слотов рабочего дня
+        work_start = WORK_START.hour * 60 + WORK_START.minute
+        work_end = WORK_END.hour * 60 + WORK_END.minute
+        grid = [
+            (start, start + SLOT_DURATION)
+            for start in range(work_start, work_end, SLOT_DURATION)
+        ]
+        
+        days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+        
+        result = {}
+        for doctor_id in doctor_ids:
+            result[doctor_id] = {}
+            for day in days:
+                busy = self._merge_intervals(booked.get((doctor_id, day.isoformat()), []))
+                result[doctor_id][day.isoformat()] = self._merge_slots(grid, busy)
+        
+        return result
+    
+    def _merge_intervals(self, intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Объединить пересекающиеся интервалы"""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
             else:
-                available_slots.append({
-                    "time": slot_time.strftime("%H:%M"),
-                    "available": False
-                })
+                merged.append((start, end))
+        return merged
+    
+    def _merge_slots(self, grid: List[Tuple[int, int]], busy: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Сопоставить сетку слотов с занятыми интервалами за один проход"""
+        slots = []
+        i = 0
+        for start, end in grid:
+            # Пропускаем интервалы, закончившиеся до начала слота
+            while i < len(busy) and busy[i][1] <= start:
+                i += 1
             
-            current_time += timedelta(minutes=slot_duration)
+            taken = i < len(busy) and busy[i][0] < end
+            slots.append({
+                "time": f"{start // 60:02d}:{start % 60:02d}",
+                "available": not taken
+            })
         
-        return available_slots
+        return slots
     
     def get_upcoming_appointments(self, patient_id: str, limit: int = 10) -> List[Appointment]:
         """Получить предстоящие назначения пациента"""
@@ -0,0 +1,66 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Type
+
+from app.services.patient_service import PatientService
+from app.services.doctor_service import DoctorService
+from app.services.health_service import HealthService
+from app.services.appointment_service import AppointmentService
+from app.services.notification_service import NotificationService
+from app.services.analytics_service import AnalyticsService
+from app.services.organ_service import OrganService
+
+
+class AsyncServiceAdapter:
+    """
+    Асинхронная версия сервиса поверх асинхронной сессии.
+    
+    Публичные методы синхронного сервиса вызываются через AsyncSession.run_sync:
+    весь ввод-вывод идет через асинхронный драйвер, поэтому ожидание базы данных
+    не блокирует цикл событий, а конкурентные запросы выполняются параллельно.
+    """
+    service_class: Type[Any]
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.service = self.service_class(db.sync_session)
+    
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.service, name)
+        
+        if name.startswith("_") or not callable(attr):
+            return attr
+        
+        async def method(*args, **kwargs):
+            return await self.db.run_sync(lambda session: attr(*args, **kwargs))
+        
+        method.__name__ = name
+        method.__doc__ = attr.__doc__
+        return method
+
+
+class AsyncPatientService(AsyncServiceAdapter):
+    service_class = PatientService
+
+
+class AsyncDoctorService(AsyncServiceAdapter):
+    service_class = DoctorService
+
+
+class AsyncHealthService(AsyncServiceAdapter):
+    service_class = HealthService
+
+
+class AsyncAppointmentService(AsyncServiceAdapter):
+    service_class = AppointmentService
+
+
+class AsyncNotificationService(AsyncServiceAdapter):
+    service_class = NotificationService
+
+
+class AsyncAnalyticsService(AsyncServiceAdapter):
+    service_class = AnalyticsService
+
+
+class AsyncOrganService(AsyncServiceAdapter):
+    service_class = OrganService
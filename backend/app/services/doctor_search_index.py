@@ -0,0 +1,188 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Any, Iterable
+import re
+
+from app.core.snapshot import SnapshotHolder, table_signature
+from app.database.database import SessionLocal
+from app.models.models import Doctor
+from app.schemas.schemas import Doctor as DoctorSchema
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Вес совпадения термина: слово целиком, префикс слова, префикс с опечатками
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+
+
+def normalize(text: Optional[str]) -> List[str]:
+    """Слова текста в нижнем регистре; "ё" приравнивается к "е" """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.casefold().replace("ё", "е"))
+
+
+def max_typos(term: str) -> int:
+    """Допустимое число опечаток: короткие термины ищутся только по точному префиксу"""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 6:
+        return 1
+    return 2
+
+
+class _TrieNode:
+    __slots__ = ("children", "exact", "below")
+    
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Врачи, у которых слово заканчивается в узле / проходит через узел
+        self.exact: set = set()
+        self.below: set = set()
+
+
+class _TokenTrie:
+    """Префиксное дерево слов с поиском по префиксу с опечатками (расстояние Левенштейна)"""
+    
+    def __init__(self):
+        self.root = _TrieNode()
+    
+    def add(self, token: str, doctor: int) -> None:
+        node = self.root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            node.below.add(doctor)
+        node.exact.add(doctor)
+    
+    def search(self, term: str, typos: int) -> Dict[int, float]:
+        """
+        Оценки врачей, у которых есть слово, начинающееся с term с точностью до typos правок.
+        
+        Первая буква должна совпадать точно. Обход поддерева ведет строку матрицы
+        расстояний term до текущего префикса и отсекает ветку, как только минимум
+        строки превышает typos или совпадение уже найдено, поэтому
+        просматривается лишь малая часть узлов.
+        """
+        scores: Dict[int, float] = {}
+        start = self.root.children.get(term[0])
+        if start is None:
+            return scores
+        
+        first_row = list(range(len(term) + 1))
+        stack = [(start, term[0], first_row)]
+        
+        while stack:
+            node, char, previous = stack.pop()
+            
+            row = [previous[0] + 1]
+            for i, term_char in enumerate(term, 1):
+                row.append(min(
+                    row[i - 1] + 1,
+                    previous[i] + 1,
+                    previous[i - 1] + (term_char != char)
+                ))
+            
+            distance = row[-1]
+            if distance <= typos:
+                if distance == 0:
+                    self._score(scores, node.below, PREFIX_SCORE)
+                    self._score(scores, node.exact, EXACT_SCORE)
+                else:
+                    self._score(scores, node.below, FUZZY_SCORE / distance)
+            
+            # Вглубь - только пока расстояние до слов поддерева еще может уменьшиться
+            closest = min(row)
+            if closest <= typos and closest < distance:
+                stack.extend((child, child_char, row) for child_char, child in node.children.items())
+        
+        return scores
+    
+    @staticmethod
+    def _score(scores: Dict[int, float], doctors: Iterable[int], score: float) -> None:
+        for doctor in doctors:
+            if scores.get(doctor, 0.0) < score:
+                scores[doctor] = score
+
+
+class DoctorSearchIndex:
+    """
+    Неизменяемый поисковый индекс справочника врачей.
+    
+    Слова имени, фамилии и специализации хранятся в префиксном дереве,
+    специализации - дополнительно в отдельном дереве. Каждое слово запроса
+    должно совпасть со словом врача (точно, по префиксу или с опечатками);
+    результат сортируется по сумме оценок, затем по фамилии и имени.
+    """
+    
+    def __init__(self, doctors: List[Dict[str, Any]], version: int):
+        self.version = version
+        self.doctors = doctors
+        self.names = _TokenTrie()
+        self.specializations = _TokenTrie()
+        
+        for position, doctor in enumerate(doctors):
+            for token in normalize(doctor["first_name"]) + normalize(doctor["last_name"]):
+                self.names.add(token, position)
+            for token in normalize(doctor["specialization"]):
+                self.names.add(token, position)
+                self.specializations.add(token, position)
+        
+        self._order = {
+            position: (doctor["last_name"].casefold(), doctor["first_name"].casefold())
+            for position, doctor in enumerate(doctors)
+        }
+    
+    def __len__(self) -> int:
+        return len(self.doctors)
+    
+    def search(self, query: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Поиск по имени, фамилии и специализации"""
+        return self._match(self.names, query, skip, limit)
+    
+    def by_specialization(self, specialization: str, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Поиск только по специализации"""
+        return self._match(self.specializations, specialization, skip, limit)
+    
+    def _match(self, trie: _TokenTrie, query: str, skip: int, limit: int) -> List[Dict[str, Any]]:
+        terms = normalize(query)
+        if not terms:
+            return []
+        
+        totals: Optional[Dict[int, float]] = None
+        for term in terms:
+            scores = trie.search(term, max_typos(term))
+            if totals is None:
+                totals = scores
+            else:
+                totals = {doctor: totals[doctor] + score for doctor, score in scores.items() if doctor in totals}
+            if not totals:
+                return []
+        
+        ranked = sorted(totals, key=lambda doctor: (-totals[doctor], self._order[doctor]))
+        return [self.doctors[doctor] for doctor in ranked[skip:skip + limit]]
+
+
+class DoctorSearchIndexHolder(SnapshotHolder):
+    """Текущий индекс: строится при старте и подменяется атомарно после записи врачей"""
+    
+    def build(self, db: Session, version: int) -> DoctorSearchIndex:
+        """Индекс по активным врачам (один запрос)"""
+        doctors = db.query(Doctor).filter(Doctor.is_active == True).order_by(Doctor.id).all()
+        payload = [DoctorSchema.model_validate(doctor).model_dump(mode="json") for doctor in doctors]
+        return DoctorSearchIndex(payload, version)
+    
+    def probe(self, db: Session) -> Any:
+        """Сигнатура таблицы врачей - для перестройки после записей других воркеров"""
+        return table_signature(db, Doctor)
+
+
+doctor_search_index = DoctorSearchIndexHolder()
+
+
+def load_doctor_search_index() -> DoctorSearchIndex:
+    """Построить индекс в отдельной сессии (при старте приложения)"""
+    db = SessionLocal()
+    try:
+        return doctor_search_index.reload(db)
+    finally:
+        db.close()
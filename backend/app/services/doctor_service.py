@@ -1,29 +1,31 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
 
+from app.core.cache import invalidate_dashboard
+from app.core.pagination import Page, keyset_paginate
 from app.models.models import Doctor, Appointment, Patient
 from app.schemas.schemas import DoctorCreate, DoctorUpdate
+from app.services.doctor_search_index import doctor_search_index
 
 
 class DoctorService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_doctors(self, skip: int = 0, limit: int = 100) -> List[Doctor]:
-        """Получить список всех врачей"""
-        return self.db.query(Doctor).filter(
-            Doctor.is_deleted == False
-        ).offset(skip).limit(limit).all()
+    def get_doctors(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+        """Получить список врачей по фамилии (keyset-пагинация по курсору)"""
+        query = self.db.query(Doctor).filter(Doctor.is_active == True)
+        return keyset_paginate(query, [Doctor.last_name, Doctor.id], limit, cursor, skip)
     
     def get_doctor(self, doctor_id: str) -> Optional[Doctor]:
         """Получить врача по ID"""
         return self.db.query(Doctor).filter(
             and_(
                 Doctor.id == doctor_id,
-                Doctor.is_deleted == False
+                Doctor.is_active == True
             )
         ).first()
     
@@ -32,7 +34,7 @@ class DoctorService:
         return self.db.query(Doctor).filter(
             and_(
                 Doctor.email == email,
-                Doctor.is_deleted == False
+                Doctor.is_active == True
             )
         ).first()
     
@@ -41,57 +43,34 @@ class DoctorService:
         return self.db.query(Doctor).filter(
             and_(
                 Doctor.license_number == license_number,
-                Doctor.is_deleted == False
+                Doctor.is_active == True
             )
         ).first()
     
-    def search_doctors(self, query: str, skip: int = 0, limit: int = 100) -> List[Doctor]:
-        """Поиск врачей по имени, фамилии или специализации"""
-        search_filter = or_(
-            Doctor.first_name.ilike(f"%{query}%"),
-            Doctor.last_name.ilike(f"%{query}%"),
-            Doctor.specialization.ilike(f"%{query}%")
-        )
-        
-        return self.db.query(Doctor).filter(
-            and_(
-                search_filter,
-                Doctor.is_deleted == False
-            )
-        ).offset(skip).limit(limit).all()
+    def search_doctors(self, query: str, skip: int = 0, limit: int = 100) -> List[dict]:
+        """Поиск врачей по имени, фамилии или специализации (префикс, опечатки) без запросов к БД"""
+        return doctor_search_index.get(self.db).search(query, skip, limit)
     
-    def get_doctors_by_specialization(self, specialization: str, skip: int = 0, limit: int = 100) -> List[Doctor]:
-        """Получить врачей по специализации"""
-        return self.db.query(Doctor).filter(
-            and_(
-                Doctor.specialization.ilike(f"%{specialization}%"),
-                Doctor.is_deleted == False
-            )
-        ).offset(skip).limit(limit).all()
+    def get_doctors_by_specialization(self, specialization: str, skip: int = 0, limit: int = 100) -> List[dict]:
+        """Получить врачей по специализации из поискового индекса"""
+        return doctor_search_index.get(self.db).by_specialization(specialization, skip, limit)
     
     def create_doctor(self, doctor_data: DoctorCreate) -> Doctor:
         """Создать нового врача"""
         doctor = Doctor(
+            **doctor_data.dict(),
             id=str(uuid.uuid4()),
-            first_name=doctor_data.first_name,
-            last_name=doctor_data.last_name,
-            email=doctor_data.email,
-            phone=doctor_data.phone,
-            specialization=doctor_data.specialization,
-            license_number=doctor_data.license_number,
-            years_of_experience=doctor_data.years_of_experience,
-            education=doctor_data.education,
-            certifications=doctor_data.certifications,
-            bio=doctor_data.bio,
-            consultation_fee=doctor_data.consultation_fee,
-            working_hours=doctor_data.working_hours,
+            is_active=True,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
         
         self.db.add(doctor)
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(doctor)
+        
+        doctor_search_index.reload(self.db)
         return doctor
     
     def update_doctor(self, doctor_id: str, doctor_data: DoctorUpdate) -> Optional[Doctor]:
@@ -108,7 +87,10 @@ class DoctorService:
         doctor.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(doctor)
+        
+        doctor_search_index.reload(self.db)
         return doctor
     
     def delete_doctor(self, doctor_id: str) -> bool:
@@ -117,10 +99,13 @@ class DoctorService:
         if not doctor:
             return False
         
-        doctor.is_deleted = True
+        doctor.is_active = False
         doctor.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
+        
+        doctor_search_index.reload(self.db)
         return True
     
     def get_specializations(self) -> List[str]:
@@ -165,50 +150,53 @@ class DoctorService:
         
         return result
     
-    def get_doctor_patients(self, doctor_id: str) -> List[dict]:
-        """Получить пациентов врача"""
-        # Получаем уникальных пациентов через назначения
-        patient_ids = self.db.query(Appointment.patient_id).filter(
-            Appointment.doctor_id == doctor_id
-        ).distinct().all()
-        
-        result = []
-        for patient_id_tuple in patient_ids:
-            patient_id = patient_id_tuple[0]
-            patient = self.db.query(Patient).filter(
-                and_(
-                    Patient.id == patient_id,
-                    Patient.is_deleted == False
-                )
-            ).first()
-            
-            if patient:
-                # Подсчитываем количество назначений
-                appointment_count = self.db.query(Appointment).filter(
-                    and_(
-                        Appointment.doctor_id == doctor_id,
-                        Appointment.patient_id == patient_id
-                    )
-                ).count()
-                
-                # Последнее назначение
-                last_appointment = self.db.query(Appointment).filter(
-                    and_(
-                        Appointment.doctor_id == doctor_id,
-                        Appointment.patient_id == patient_id
-                    )
-                ).order_by(Appointment.appointment_date.desc()).first()
-                
-                result.append({
-                    "id": patient.id,
-                    "name": f"{patient.first_name} {patient.last_name}",
-                    "email": patient.email,
-                    "phone": patient.phone,
-                    "appointment_count": appointment_count,
-                    "last_appointment": last_appointment.appointment_date.isoformat() if last_appointment else None
-                })
+    def get_doctor_patients(
+        self,
+        doctor_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Page:
+        """Получить пациентов врача по ID пациента (keyset-пагинация по курсору)"""
+        # Один агрегирующий запрос: пациент, число назначений и дата последнего
+        query = self.db.query(
+            Patient.id,
+            Patient.first_name,
+            Patient.last_name,
+            Patient.email,
+            Patient.phone,
+            func.count(Appointment.id).label("appointment_count"),
+            func.max(Appointment.date).label("last_appointment")
+        ).join(
+            Appointment, Appointment.patient_id == Patient.id
+        ).filter(
+            and_(
+                Appointment.doctor_id == doctor_id,
+                Patient.is_active == True
+            )
+        ).group_by(
+            Patient.id,
+            Patient.first_name,
+            Patient.last_name,
+            Patient.email,
+            Patient.phone
+        )
         
-        return result
+        page = keyset_paginate(query, [Patient.id], limit, cursor, skip)
+        return Page(
+            [
+                {
+                    "id": row.id,
+                    "name": f"{row.first_name} {row.last_name}",
+                    "email": row.email,
+                    "phone": row.phone,
+                    "appointment_count": row.appointment_count,
+                    "last_appointment": row.last_appointment
+                }
+                for row in page.items
+            ],
+            page.next_cursor
+        )
     
     def get_doctor_statistics(self, doctor_id: str) -> dict:
         """Получить статистику врача"""
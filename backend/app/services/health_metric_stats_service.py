@@ -0,0 +1,168 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, func
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Dict, Any, Iterable
+from datetime import datetime, timedelta
+from collections import defaultdict
+import random
+
+from app.core.hyperloglog import HyperLogLog
+from app.models.models import HealthDailyRollup, HealthMetricDailyCount, HealthMetricSketchRegister
+from app.services.health_rollup_service import HEALTH_METRICS
+
+# Строк на (метрика, день) в health_metric_daily_counts: параллельные записи
+# меняют разные строки и не ждут блокировки одной строки текущего дня
+COUNT_SHARDS = 16
+
+
+class HealthMetricStatsService:
+    """
+    Статистика по метрикам для всех пациентов: дневные счетчики показаний и
+    скетчи HyperLogLog пациентов с данными. Поддерживается при записи показаний,
+    поэтому чтение не зависит от размера health_data.
+    
+    Запись не читает и не блокирует общие строки: приращение счетчика уходит в
+    одну из COUNT_SHARDS строк дня, а скетч хранится по регистрам и обновляется
+    upsert с максимумом рангов, который коммутативен и не теряет параллельные записи.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def add_readings(self, records: Iterable[Any]) -> None:
+        """Учесть новые показания (коммит выполняет вызывающий код)"""
+        counts = defaultdict(int)
+        patients = defaultdict(set)
+        
+        for record in records:
+            day = (record.recorded_at or datetime.utcnow()).date()
+            for metric in HEALTH_METRICS:
+                if getattr(record, metric, None) is None:
+                    continue
+                counts[(metric, day)] += 1
+                patients[metric].add(record.patient_id)
+        
+        self._add_counts(counts)
+        self._add_patients(patients)
+    
+    def remove_readings(self, records: Iterable[Any]) -> None:
+        """
+        Исключить удаленные или измененные показания из дневных счетчиков.
+        Скетчи пациентов не уменьшаются: HyperLogLog не поддерживает удаление.
+        """
+        counts = defaultdict(int)
+        
+        for record in records:
+            if record.recorded_at is None:
+                continue
+            day = record.recorded_at.date()
+            for metric in HEALTH_METRICS:
+                if getattr(record, metric, None) is not None:
+                    counts[(metric, day)] -= 1
+        
+        self._add_counts(counts)
+    
+    def get_reading_count(self, metrics: List[str], days: int = 30) -> int:
+        """Количество показаний метрик за последние days дней (не более days строк на метрику)"""
+        if not metrics:
+            return 0
+        
+        date_from = datetime.utcnow().date() - timedelta(days=days)
+        
+        total = self.db.query(func.sum(HealthMetricDailyCount.count)).filter(
+            and_(
+                HealthMetricDailyCount.metric.in_(metrics),
+                HealthMetricDailyCount.day >= date_from
+            )
+        ).scalar()
+        
+        return max(int(total or 0), 0)
+    
+    def get_patient_count(self, metrics: List[str]) -> int:
+        """Приближенное количество пациентов с показаниями хотя бы одной из метрик"""
+        if not metrics:
+            return 0
+        
+        # Объединение скетчей метрик - максимум ранга по каждому регистру
+        ranks = self.db.query(
+            HealthMetricSketchRegister.register,
+            func.max(HealthMetricSketchRegister.rank)
+        ).filter(
+            HealthMetricSketchRegister.metric.in_(metrics)
+        ).group_by(HealthMetricSketchRegister.register).all()
+        
+        return HyperLogLog.from_ranks(ranks).count()
+    
+    def rebuild(self) -> Dict[str, int]:
+        """Пересчитать счетчики и скетчи по дневным агрегатам health_daily_rollup"""
+        self.db.query(HealthMetricDailyCount).delete(synchronize_session=False)
+        self.db.query(HealthMetricSketchRegister).delete(synchronize_session=False)
+        
+        counts = self.db.query(
+            HealthDailyRollup.metric,
+            HealthDailyRollup.day,
+            func.sum(HealthDailyRollup.count)
+        ).group_by(HealthDailyRollup.metric, HealthDailyRollup.day).all()
+        
+        self._add_counts({(metric, day): count for metric, day, count in counts})
+        
+        patients = defaultdict(set)
+        for metric, patient_id in self.db.query(HealthDailyRollup.metric, HealthDailyRollup.patient_id).distinct():
+            patients[metric].add(patient_id)
+        
+        self._add_patients(patients)
+        
+        return {"days": len(counts), "metrics": len(patients)}
+    
+    def _insert(self):
+        if self.db.get_bind().dialect.name == "postgresql":
+            return postgresql.insert
+        return sqlite.insert
+    
+    def _add_counts(self, counts: Dict[tuple, int]) -> None:
+        """Добавить приращения к одной случайной строке дневных счетчиков одним upsert"""
+        shard = random.randrange(COUNT_SHARDS)
+        
+        # Строки в порядке ключа: параллельные транзакции блокируют их в одном порядке
+        rows = [
+            {"key_metric": metric, "key_day": day, "key_shard": shard, "delta": delta}
+            for (metric, day), delta in sorted(counts.items())
+            if delta
+        ]
+        if not rows:
+            return
+        
+        # Строка может уйти в минус при удалении показаний: значение дня - сумма строк
+        table = HealthMetricDailyCount.__table__
+        stmt = self._insert()(table).values(
+            metric=bindparam("key_metric"),
+            day=bindparam("key_day"),
+            shard=bindparam("key_shard"),
+            count=bindparam("delta")
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.metric, table.c.day, table.c.shard],
+            set_={"count": table.c.count + bindparam("delta")}
+        )
+        
+        self.db.execute(stmt, rows)
+    
+    def _add_patients(self, patients: Dict[str, set]) -> None:
+        """Добавить пациентов в скетчи метрик: upsert регистров, ранг только растет"""
+        rows = [
+            {"metric": metric, "register": register, "rank": rank}
+            for metric in sorted(patients)
+            for register, rank in sorted(HyperLogLog.ranks(patients[metric]).items())
+        ]
+        if not rows:
+            return
+        
+        table = HealthMetricSketchRegister.__table__
+        stmt = self._insert()(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.metric, table.c.register],
+            set_={"rank": stmt.excluded.rank},
+            where=stmt.excluded.rank > table.c.rank
+        )
+        
+        self.db.execute(stmt, rows)
@@ -0,0 +1,207 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Optional, Dict, Any, Iterable
+from datetime import datetime, date, timedelta
+import math
+
+from app.models.models import HealthData, HealthDailyRollup
+
+# Числовые показатели HealthData, по которым ведутся дневные агрегаты
+HEALTH_METRICS = [
+    "heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic",
+    "temperature", "oxygen_saturation", "weight", "height", "bmi"
+]
+
+
+class HealthRollupService:
+    """Дневные агрегаты показателей (count, sum, sum_sq, min, max) по пациенту и метрике"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def add_readings(self, records: Iterable[HealthData]) -> None:
+        """Учесть новые показания в дневных агрегатах (коммит выполняет вызывающий код)"""
+        # Сначала сворачиваем показания в памяти, затем один upsert на ключ
+        deltas = {}
+        for record in records:
+            day = (record.recorded_at or datetime.utcnow()).date()
+            
+            for metric in HEALTH_METRICS:
+                value = getattr(record, metric)
+                if value is None:
+                    continue
+                
+                key = (record.patient_id, metric, day)
+                delta = deltas.get(key)
+                if delta is None:
+                    deltas[key] = [1, value, value * value, value, value]
+                else:
+                    delta[0] += 1
+                    delta[1] += value
+                    delta[2] += value * value
+                    delta[3] = min(delta[3], value)
+                    delta[4] = max(delta[4], value)
+        
+        if not deltas:
+            return
+        
+        rows = [
+            {
+                "patient_id": patient_id,
+                "metric": metric,
+                "day": day,
+                "count": count,
+                "sum": total,
+                "sum_sq": total_sq,
+                "min_value": min_value,
+                "max_value": max_value
+            }
+            for (patient_id, metric, day), (count, total, total_sq, min_value, max_value) in deltas.items()
+        ]
+        
+        self._upsert(rows)
+    
+    def refresh_day(self, patient_id: str, day: date) -> None:
+        """Пересчитать агрегаты пациента за день (после изменения или удаления показаний)"""
+        self.db.flush()
+        self.rebuild(patient_id=patient_id, date_from=day, date_to=day)
+    
+    def rebuild(
+        self,
+        patient_id: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ) -> int:
+        """Пересчитать агрегаты из исходных показаний (коммит выполняет вызывающий код)"""
+        rollup_filters = []
+        data_filters = []
+        
+        if patient_id:
+            rollup_filters.append(HealthDailyRollup.patient_id == patient_id)
+            data_filters.append(HealthData.patient_id == patient_id)
+        
+        if date_from:
+            rollup_filters.append(HealthDailyRollup.day >= date_from)
+            data_filters.append(HealthData.recorded_at >= datetime.combine(date_from, datetime.min.time()))
+        
+        if date_to:
+            rollup_filters.append(HealthDailyRollup.day <= date_to)
+            data_filters.append(HealthData.recorded_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        
+        self.db.query(HealthDailyRollup).filter(and_(*rollup_filters)).delete(synchronize_session=False)
+        
+        table = HealthDailyRollup.__table__
+        day = func.date(HealthData.recorded_at)
+        inserted = 0
+        
+        for metric in HEALTH_METRICS:
+            column = getattr(HealthData, metric)
+            
+            aggregated = select(
+                HealthData.patient_id,
+                literal(metric),
+                day,
+                func.count(column),
+                func.sum(column),
+                func.sum(column * column),
+                func.min(column),
+                func.max(column)
+            ).where(
+                and_(column.isnot(None), *data_filters)
+            ).group_by(HealthData.patient_id, day)
+            
+            result = self.db.execute(
+                table.insert().from_select(
+                    ["patient_id", "metric", "day", "count", "sum", "sum_sq", "min_value", "max_value"],
+                    aggregated
+                )
+            )
+            inserted += max(result.rowcount, 0)
+        
+        return inserted
+    
+    def get_daily_rollups(
+        self,
+        metric: str,
+        date_from: date,
+        date_to: date,
+        patient_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Получить дневные агрегаты метрики (по пациенту или по всем пациентам)"""
+        query = self.db.query(
+            HealthDailyRollup.day,
+            func.sum(HealthDailyRollup.count),
+            func.sum(HealthDailyRollup.sum),
+            func.sum(HealthDailyRollup.sum_sq),
+            func.min(HealthDailyRollup.min_value),
+            func.max(HealthDailyRollup.max_value)
+        ).filter(
+            and_(
+                HealthDailyRollup.metric == metric,
+                HealthDailyRollup.day >= date_from,
+                HealthDailyRollup.day <= date_to
+            )
+        )
+        
+        if patient_id:
+            query = query.filter(HealthDailyRollup.patient_id == patient_id)
+        
+        rows = query.group_by(HealthDailyRollup.day).order_by(HealthDailyRollup.day).all()
+        
+        return [
+            {
+                "date": day,
+                "count": count,
+                "sum": total,
+                "sum_sq": total_sq,
+                "min": min_value,
+                "max": max_value
+            }
+            for day, count, total, total_sq, min_value, max_value in rows
+        ]
+    
+    @staticmethod
+    def summarize(rollups: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Объединить агрегаты: количество, среднее, стандартное отклонение, min и max"""
+        count = sum(r["count"] for r in rollups)
+        if not count:
+            return {"count": 0}
+        
+        total = sum(r["sum"] for r in rollups)
+        total_sq = sum(r["sum_sq"] for r in rollups)
+        mean = total / count
+        
+        # Выборочная дисперсия из суммы и суммы квадратов
+        variance = (total_sq - total * total / count) / (count - 1) if count > 1 else 0
+        
+        return {
+            "count": count,
+            "average": mean,
+            "std_deviation": math.sqrt(max(variance, 0)),
+            "min": min(r["min"] for r in rollups),
+            "max": max(r["max"] for r in rollups)
+        }
+    
+    def _upsert(self, rows: List[Dict[str, Any]]) -> None:
+        """Добавить приращения к агрегатам (INSERT ... ON CONFLICT DO UPDATE)"""
+        if self.db.get_bind().dialect.name == "postgresql":
+            stmt = postgresql.insert(HealthDailyRollup.__table__)
+            least, greatest = func.least, func.greatest
+        else:
+            stmt = sqlite.insert(HealthDailyRollup.__table__)
+            least, greatest = func.min, func.max
+        
+        table = HealthDailyRollup.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.patient_id, table.c.metric, table.c.day],
+            set_={
+                "count": table.c.count + stmt.excluded.count,
+                "sum": table.c.sum + stmt.excluded.sum,
+                "sum_sq": table.c.sum_sq + stmt.excluded.sum_sq,
+                "min_value": least(table.c.min_value, stmt.excluded.min_value),
+                "max_value": greatest(table.c.max_value, stmt.excluded.max_value)
+            }
+        )
+        
+        self.db.execute(stmt, rows)
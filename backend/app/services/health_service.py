@@ -2,37 +2,58 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+from types import SimpleNamespace
+from collections import defaultdict
+from pydantic import ValidationError
 import uuid
 import statistics
+import numpy as np
 
+from app.core.cache import invalidate_dashboard
 from app.models.models import HealthData, Patient, Notification
-from app.schemas.schemas import HealthDataCreate, HealthDataUpdate, NotificationTypeEnum
+from app.schemas.schemas import (
+    HealthDataCreate, HealthDataUpdate, HealthDataBatchItem,
+    NotificationTypeEnum, NotificationPriorityEnum
+)
+from app.services.health_rollup_service import HealthRollupService, HEALTH_METRICS
+from app.services.health_metric_stats_service import HealthMetricStatsService
+from app.services.notification_counter_service import NotificationCounterService
+from app.services.notification_events import queue_notification_events
+from app.services.health_thresholds import (
+    health_thresholds, STATUS_NAMES, STATUS_BORDERLINE, STATUS_WARNING, STATUS_CRITICAL
+)
+
+# Единицы измерения показателей
+METRIC_UNITS = {
+    "heart_rate": "уд/мин",
+    "blood_pressure_systolic": "мм рт.ст.",
+    "blood_pressure_diastolic": "мм рт.ст.",
+    "temperature": "°C",
+    "oxygen_saturation": "%",
+    "weight": "кг",
+    "height": "см",
+    "bmi": "кг/м²"
+}
+
+# Размер чанка многострочного INSERT при пакетной записи
+BATCH_CHUNK_SIZE = 1000
+
+# Показатели, по которым определяется статус и создаются предупреждения
+STATUS_METRICS = [
+    "heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic",
+    "temperature", "blood_sugar", "oxygen_saturation"
+]
 
 
 class HealthService:
     def __init__(self, db: Session):
         self.db = db
+        self.rollups = HealthRollupService(db)
+        self.metric_stats = HealthMetricStatsService(db)
         
-        # Нормальные диапазоны для различных показателей
-        self.normal_ranges = {
-            "heart_rate": {"min": 60, "max": 100},
-            "blood_pressure_systolic": {"min": 90, "max": 140},
-            "blood_pressure_diastolic": {"min": 60, "max": 90},
-            "temperature": {"min": 36.1, "max": 37.2},
-            "weight": {"min": 40, "max": 200},
-            "blood_sugar": {"min": 70, "max": 140},
-            "oxygen_saturation": {"min": 95, "max": 100}
-        }
-        
-        # Критические значения
-        self.critical_ranges = {
-            "heart_rate": {"min": 40, "max": 150},
-            "blood_pressure_systolic": {"min": 70, "max": 180},
-            "blood_pressure_diastolic": {"min": 40, "max": 110},
-            "temperature": {"min": 35.0, "max": 39.0},
-            "blood_sugar": {"min": 50, "max": 250},
-            "oxygen_saturation": {"min": 90, "max": 100}
-        }
+        # Диапазоны показателей (общие для всех сервисов, см. health_thresholds)
+        self.normal_ranges = health_thresholds.normal_ranges
+        self.critical_ranges = health_thresholds.critical_ranges
     
     def get_latest_health_data(self, patient_id: str) -> Optional[HealthData]:
         """Получить последние данные о здоровье пациента"""
@@ -53,23 +74,19 @@ class HealthService:
     
     def create_health_data(self, health_data: HealthDataCreate) -> HealthData:
         """Создать новую запись о здоровье"""
-        health_record = HealthData(
-            id=str(uuid.uuid4()),
-            patient_id=health_data.patient_id,
-            heart_rate=health_data.heart_rate,
-            blood_pressure_systolic=health_data.blood_pressure_systolic,
-            blood_pressure_diastolic=health_data.blood_pressure_diastolic,
-            temperature=health_data.temperature,
-            weight=health_data.weight,
-            height=health_data.height,
-            blood_sugar=health_data.blood_sugar,
-            oxygen_saturation=health_data.oxygen_saturation,
-            notes=health_data.notes,
-            recorded_at=health_data.recorded_at or datetime.utcnow()
-        )
+        # Колонки записи - поля схемы; время измерения передается только в HealthDataBatchItem
+        values = health_data.dict()
+        values["recorded_at"] = values.get("recorded_at") or datetime.utcnow()
+        health_record = HealthData(id=str(uuid.uuid4()), **values)
         
         self.db.add(health_record)
+        
+        # Обновляем дневные агрегаты в той же транзакции
+        self.rollups.add_readings([health_record])
+        self.metric_stats.add_readings([health_record])
+        
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(health_record)
         
         # Проверяем критические значения и создаем уведомления
@@ -77,6 +94,122 @@ class HealthService:
         
         return health_record
     
+    def create_health_data_batch(self, items: List[Any]) -> Dict[str, Any]:
+        """
+        Пакетная запись показателей с мониторов.
+        
+        Строки вставляются многострочным INSERT чанками по BATCH_CHUNK_SIZE записей,
+        предупреждения проверяются для всей пачки сразу, коммит один.
+        Некорректные элементы пропускаются и возвращаются в errors с индексом.
+        """
+        errors = []
+        readings = []
+        
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "error": "Ожидается объект с показателями"})
+                continue
+            
+            try:
+                reading = HealthDataBatchItem(**item)
+            except ValidationError as e:
+                errors.append({
+                    "index": index,
+                    "patient_id": item.get("patient_id") if isinstance(item.get("patient_id"), str) else None,
+                    "error": "; ".join(
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                    )
+                })
+                continue
+            
+            if all(getattr(reading, metric) is None for metric in HEALTH_METRICS):
+                errors.append({"index": index, "patient_id": reading.patient_id, "error": "Нет ни одного показателя"})
+                continue
+            
+            readings.append((index, reading))
+        
+        # Существование пациентов проверяется одним запросом на всю пачку
+        patient_ids = {reading.patient_id for _, reading in readings}
+        existing_ids = set()
+        if patient_ids:
+            existing_ids = {
+                patient_id for (patient_id,) in self.db.query(Patient.id).filter(
+                    and_(
+                        Patient.id.in_(patient_ids),
+                        Patient.is_active == True
+                    )
+                )
+            }
+        
+        now = datetime.utcnow()
+        rows = []
+        for index, reading in readings:
+            if reading.patient_id not in existing_ids:
+                errors.append({"index": index, "patient_id": reading.patient_id, "error": "Пациент не найден"})
+                continue
+            
+            row = reading.dict()
+            row["id"] = str(uuid.uuid4())
+            row["recorded_at"] = row["recorded_at"] or now
+            rows.append(row)
+        
+        # Один скомпилированный INSERT на все чанки; SQLAlchemy разворачивает пачку
+        # параметров в многострочный VALUES (insertmanyvalues) либо executemany драйвера
+        table = HealthData.__table__
+        for start in range(0, len(rows), BATCH_CHUNK_SIZE):
+            self.db.execute(table.insert(), rows[start:start + BATCH_CHUNK_SIZE])
+        
+        # Агрегаты и предупреждения считаются по всей пачке в той же транзакции
+        records = [SimpleNamespace(**row) for row in rows]
+        self.rollups.add_readings(records)
+        self.metric_stats.add_readings(records)
+        notifications = self._create_alert_notifications(self._collect_alerts(records))
+        
+        self.db.commit()
+        if rows:
+            invalidate_dashboard()
+        
+        errors.sort(key=lambda error: error["index"])
+        
+        return {
+            "created": len(rows),
+            "failed": len(errors),
+            "ids": [row["id"] for row in rows],
+            "notifications": notifications,
+            "errors": errors
+        }
+    
+    def _create_alert_notifications(self, alerts: List[Dict[str, Any]]) -> int:
+        """Одно уведомление на пациента по критическим значениям пачки (коммит выполняет вызывающий код)"""
+        messages = defaultdict(list)
+        for alert in alerts:
+            if alert["severity"] == "critical":
+                messages[alert["patient_id"]].append(alert["message"])
+        
+        if not messages:
+            return 0
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "title": "Критическое значение показателя здоровья",
+                "message": "\n".join(patient_messages),
+                "type": NotificationTypeEnum.health_alert.value,
+                "priority": NotificationPriorityEnum.high.value,
+                "recipient_id": patient_id,
+                "recipient_type": "patient",
+                "is_read": False,
+                "created_at": now
+            }
+            for patient_id, patient_messages in messages.items()
+        ]
+        
+        self.db.execute(Notification.__table__.insert(), rows)
+        NotificationCounterService(self.db).add({patient_id: 1 for patient_id in messages})
+        queue_notification_events(self.db, rows)
+        return len(rows)
+    
     def update_health_data(self, health_id: str, health_data: HealthDataUpdate) -> Optional[HealthData]:
         """Обновить данные о здоровье"""
         health_record = self.db.query(HealthData).filter(
@@ -88,10 +221,23 @@ class HealthService:
         
         update_data = health_data.dict(exclude_unset=True)
         
+        # Прежние значения исключаются из счетчиков метрик, новые учитываются заново
+        previous = SimpleNamespace(
+            patient_id=health_record.patient_id,
+            recorded_at=health_record.recorded_at,
+            **{metric: getattr(health_record, metric) for metric in HEALTH_METRICS}
+        )
+        
         for field, value in update_data.items():
             setattr(health_record, field, value)
         
+        # Пересчитываем дневные агрегаты за день записи
+        self.rollups.refresh_day(health_record.patient_id, health_record.recorded_at.date())
+        self.metric_stats.remove_readings([previous])
+        self.metric_stats.add_readings([health_record])
+        
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(health_record)
         
         # Проверяем критические значения после обновления
@@ -109,7 +255,13 @@ class HealthService:
             return False
         
         self.db.delete(health_record)
+        
+        # Пересчитываем дневные агрегаты за день удаленной записи
+        self.rollups.refresh_day(health_record.patient_id, health_record.recorded_at.date())
+        self.metric_stats.remove_readings([health_record])
+        
         self.db.commit()
+        invalidate_dashboard()
         return True
     
     def get_health_analytics(self, patient_id: str, days: int = 30) -> Dict[str, Any]:
@@ -162,25 +314,23 @@ class HealthService:
         return analytics
     
     def get_health_trends(self, patient_id: str, metric: str, days: int = 30) -> List[Dict[str, Any]]:
-        """Получить тренды конкретной метрики"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        """Получить тренды конкретной метрики (по дневным агрегатам)"""
+        end_date = datetime.utcnow().date()
+        start_date = end_date - timedelta(days=days)
         
-        health_records = self.db.query(HealthData).filter(
-            and_(
-                HealthData.patient_id == patient_id,
-                HealthData.recorded_at >= cutoff_date
-            )
-        ).order_by(HealthData.recorded_at).all()
+        rollups = self.rollups.get_daily_rollups(metric, start_date, end_date, patient_id)
         
         trends = []
-        for record in health_records:
-            value = getattr(record, metric)
-            if value is not None:
-                trends.append({
-                    "date": record.recorded_at.isoformat(),
-                    "value": value,
-                    "status": self._get_metric_status(value, metric)
-                })
+        for day in rollups:
+            value = round(day["sum"] / day["count"], 2)
+            trends.append({
+                "date": day["date"].isoformat(),
+                "value": value,
+                "min": day["min"],
+                "max": day["max"],
+                "count": day["count"],
+                "status": self._get_metric_status(value, metric)
+            })
         
         return trends
     
@@ -195,12 +345,7 @@ class HealthService:
             )
         ).order_by(desc(HealthData.recorded_at)).all()
         
-        alerts = []
-        for record in health_records:
-            record_alerts = self._check_values_for_alerts(record)
-            alerts.extend(record_alerts)
-        
-        return alerts
+        return self._collect_alerts(health_records)
     
     def simulate_health_data(self, patient_id: str, days: int = 30) -> List[HealthData]:
         """Симулировать данные о здоровье для тестирования"""
@@ -213,14 +358,13 @@ class HealthService:
             record_date = base_date + timedelta(days=i)
             
             # Генерируем случайные, но реалистичные значения
-            health_data = HealthDataCreate(
+            health_data = HealthDataBatchItem(
                 patient_id=patient_id,
                 heart_rate=random.randint(60, 100),
                 blood_pressure_systolic=random.randint(110, 140),
                 blood_pressure_diastolic=random.randint(70, 90),
                 temperature=round(random.uniform(36.2, 37.0), 1),
                 weight=round(random.uniform(60, 80), 1),
-                blood_sugar=random.randint(80, 120),
                 oxygen_saturation=random.randint(96, 100),
                 recorded_at=record_date
             )
@@ -241,23 +385,19 @@ class HealthService:
                 "last_update": None
             }
         
-        # Проверяем все показатели
+        # Проверяем все показатели одним вызовом
         status_scores = []
         alerts = []
         
-        metrics = [
-            "heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic",
-            "temperature", "blood_sugar", "oxygen_saturation"
-        ]
+        codes = self._classify_records([latest_data], STATUS_METRICS)[0]
         
-        for metric in metrics:
-            value = getattr(latest_data, metric)
+        for metric, code in zip(STATUS_METRICS, codes):
+            value = getattr(latest_data, metric, None)
             if value is not None:
-                status = self._get_metric_status(value, metric)
-                if status == "critical":
+                if code == STATUS_CRITICAL:
                     status_scores.append(0)
                     alerts.append(f"{metric}: критическое значение {value}")
-                elif status == "warning":
+                elif code == STATUS_WARNING:
                     status_scores.append(1)
                     alerts.append(f"{metric}: значение вне нормы {value}")
                 else:
@@ -283,67 +423,106 @@ class HealthService:
     def _check_critical_values(self, health_record: HealthData):
         """Проверить критические значения и создать уведомления"""
         alerts = self._check_values_for_alerts(health_record)
+        critical_alerts = [alert for alert in alerts if alert["severity"] == "critical"]
+        
+        if not critical_alerts:
+            return
+        
+        for alert in critical_alerts:
+            # Создаем критическое уведомление (после коммита оно уходит подписчикам SSE)
+            notification = Notification(
+                id=str(uuid.uuid4()),
+                recipient_id=health_record.patient_id,
+                recipient_type="patient",
+                title="Критическое значение показателя здоровья",
+                message=alert["message"],
+                type=NotificationTypeEnum.health_alert,
+                priority=NotificationPriorityEnum.high,
+                is_read=False,
+                created_at=datetime.utcnow()
+            )
+            
+            self.db.add(notification)
         
-        for alert in alerts:
-            if alert["severity"] == "critical":
-                # Создаем критическое уведомление
-                notification = Notification(
-                    id=str(uuid.uuid4()),
-                    patient_id=health_record.patient_id,
-                    title="Критическое значение показателя здоровья",
-                    message=alert["message"],
-                    notification_type=NotificationTypeEnum.health_alert,
-                    priority="high",
-                    is_read=False,
-                    created_at=datetime.utcnow()
-                )
-                
-                self.db.add(notification)
-        
+        NotificationCounterService(self.db).increment(health_record.patient_id, len(critical_alerts))
         self.db.commit()
     
     def _check_values_for_alerts(self, health_record: HealthData) -> List[Dict[str, Any]]:
         """Проверить значения на предмет создания уведомлений"""
-        alerts = []
-        
-        metrics = [
-            "heart_rate", "blood_pressure_systolic", "blood_pressure_diastolic",
-            "temperature", "blood_sugar", "oxygen_saturation"
-        ]
+        return self._collect_alerts([health_record])
+    
+    def _collect_alerts(self, records: List[HealthData]) -> List[Dict[str, Any]]:
+        """Предупреждения по пачке записей (классификация одним проходом по каждой метрике)"""
+        codes = self._classify_records(records, STATUS_METRICS)
         
-        for metric in metrics:
-            value = getattr(health_record, metric)
-            if value is not None:
-                status = self._get_metric_status(value, metric)
-                
-                if status in ["warning", "critical"]:
-                    alerts.append({
-                        "metric": metric,
-                        "value": value,
-                        "severity": status,
-                        "message": f"{metric.replace('_', ' ').title()}: {value} - {status}",
-                        "recorded_at": health_record.recorded_at.isoformat()
-                    })
+        alerts = []
+        # nonzero возвращает индексы построчно: порядок записей и метрик сохраняется
+        for i, j in zip(*np.nonzero(codes >= STATUS_WARNING)):
+            record = records[i]
+            metric = STATUS_METRICS[j]
+            value = getattr(record, metric)
+            status = STATUS_NAMES[codes[i, j]]
+            
+            alerts.append({
+                "patient_id": record.patient_id,
+                "metric": metric,
+                "value": value,
+                "severity": status,
+                "message": f"{metric.replace('_', ' ').title()}: {value} - {status}",
+                "recorded_at": record.recorded_at.isoformat()
+            })
         
         return alerts
     
+    def _classify_records(self, records: List[HealthData], metrics: List[str]) -> np.ndarray:
+        """Коды статусов STATUS_* для записей: матрица (запись x метрика)"""
+        codes = np.empty((len(records), len(metrics)), dtype=np.int8)
+        for j, metric in enumerate(metrics):
+            values = [getattr(record, metric, None) for record in records]
+            codes[:, j] = self._classify_metric(metric, values)
+        return codes
+    
+    def _classify_metric(self, metric: str, values: List[Optional[float]]) -> np.ndarray:
+        """
+        Коды статусов для шкалы сервиса "норма / предупреждение / критическое".
+        
+        Пограничное значение вне нормы (пульс 100-110) - предупреждение: по нему
+        создаются уведомления, как и по любому значению вне нормы. Пограничное
+        значение внутри нормы (систолическое 130-139) остается нормой.
+        """
+        codes = health_thresholds.classify(metric, values)
+        outside = health_thresholds.direction(metric, values) != 0
+        codes[(codes == STATUS_BORDERLINE) & outside] = STATUS_WARNING
+        return codes
+    
+    def get_critical_filter(self):
+        """SQL-условие: хотя бы один показатель записи вне критического диапазона"""
+        conditions = []
+        for metric, critical_range in self.critical_ranges.items():
+            column = getattr(HealthData, metric, None)
+            if column is None:
+                continue
+            conditions.append(or_(column < critical_range["min"], column > critical_range["max"]))
+        
+        return or_(*conditions)
+    
+    def _is_critical_value(self, metric: str, value: float) -> bool:
+        """Проверить, находится ли значение вне критического диапазона"""
+        return health_thresholds.is_critical(metric, value)
+    
     def _get_metric_status(self, value: float, metric: str) -> str:
         """Определить статус метрики"""
-        if metric not in self.normal_ranges:
+        if not health_thresholds.is_known(metric):
             return "unknown"
         
-        normal_range = self.normal_ranges[metric]
-        critical_range = self.critical_ranges.get(metric, {})
-        
-        # Проверяем критические значения
-        if critical_range:
-            if value < critical_range["min"] or value > critical_range["max"]:
-                return "critical"
+        if value is None:
+            return "unknown"
         
-        # Проверяем нормальные значения
-        if value < normal_range["min"] or value > normal_range["max"]:
+        code = self._classify_metric(metric, [value])[0]
+        if code == STATUS_CRITICAL:
+            return "critical"
+        if code == STATUS_WARNING:
             return "warning"
-        
         return "normal"
     
     def _calculate_trend(self, values: List[float]) -> str:
@@ -0,0 +1,197 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+
+# Нормальные диапазоны показателей
+NORMAL_RANGES = {
+    "heart_rate": {"min": 60, "max": 100},
+    "blood_pressure_systolic": {"min": 90, "max": 140},
+    "blood_pressure_diastolic": {"min": 60, "max": 90},
+    "temperature": {"min": 36.1, "max": 37.2},
+    "weight": {"min": 40, "max": 200},
+    "blood_sugar": {"min": 70, "max": 140},
+    "oxygen_saturation": {"min": 95, "max": 100},
+    "cholesterol": {"min": 0, "max": 200},
+    "bmi": {"min": 18.5, "max": 24.9}
+}
+
+# Критические значения
+CRITICAL_RANGES = {
+    "heart_rate": {"min": 40, "max": 150},
+    "blood_pressure_systolic": {"min": 70, "max": 180},
+    "blood_pressure_diastolic": {"min": 40, "max": 110},
+    "temperature": {"min": 35.0, "max": 39.0},
+    "blood_sugar": {"min": 50, "max": 250},
+    "oxygen_saturation": {"min": 90, "max": 100}
+}
+
+# Пограничные значения (включительно)
+BORDERLINE_RANGES = {
+    "blood_pressure_systolic": {"min": 130, "max": 139},
+    "blood_pressure_diastolic": {"min": 80, "max": 89},
+    "heart_rate": {"min": 100, "max": 110},
+    "blood_sugar": {"min": 100, "max": 125},
+    "cholesterol": {"min": 200, "max": 239},
+    "bmi": {"min": 25, "max": 29.9}
+}
+
+# Синонимы названий метрик (HealthMetric -> колонка HealthData)
+METRIC_ALIASES = {
+    "body_temperature": "temperature"
+}
+
+# Коды статусов в порядке возрастания серьезности
+STATUS_UNKNOWN = -1
+STATUS_NORMAL = 0
+STATUS_BORDERLINE = 1
+STATUS_WARNING = 2
+STATUS_CRITICAL = 3
+
+STATUS_NAMES = {
+    STATUS_UNKNOWN: "unknown",
+    STATUS_NORMAL: "normal",
+    STATUS_BORDERLINE: "borderline",
+    STATUS_WARNING: "warning",
+    STATUS_CRITICAL: "critical"
+}
+
+# Положение значения относительно нормы
+DIRECTION_NAMES = {-1: "low", 0: "normal", 1: "high"}
+
+
+def metric_key(metric: Any) -> str:
+    """Привести метрику (строку или HealthMetric) к названию колонки"""
+    name = getattr(metric, "value", metric)
+    return METRIC_ALIASES.get(name, name)
+
+
+class ThresholdEngine:
+    """
+    Пороги показателей, собранные в массивы NumPy.
+    
+    Строка таблицы - метрика, столбцы - границы нормы, критических и
+    пограничных значений (NaN, если граница не задана). Классификация
+    пачки показаний выполняется одним векторизованным вызовом.
+    """
+    
+    def __init__(
+        self,
+        normal_ranges: Dict[str, Dict[str, float]],
+        critical_ranges: Dict[str, Dict[str, float]],
+        borderline_ranges: Dict[str, Dict[str, float]]
+    ):
+        self.normal_ranges = {k: dict(v) for k, v in normal_ranges.items()}
+        self.critical_ranges = {k: dict(v) for k, v in critical_ranges.items()}
+        self.borderline_ranges = {k: dict(v) for k, v in borderline_ranges.items()}
+        
+        self.metrics = sorted(
+            set(self.normal_ranges) | set(self.critical_ranges) | set(self.borderline_ranges)
+        )
+        self.index = {metric: i for i, metric in enumerate(self.metrics)}
+        
+        self.normal_min, self.normal_max = self._compile(self.normal_ranges)
+        self.critical_min, self.critical_max = self._compile(self.critical_ranges)
+        self.borderline_min, self.borderline_max = self._compile(self.borderline_ranges)
+        self.has_normal = ~np.isnan(self.normal_min)
+    
+    def _compile(self, ranges: Dict[str, Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Собрать границы диапазонов в массивы по индексу метрики"""
+        lower = np.full(len(self.metrics), np.nan)
+        upper = np.full(len(self.metrics), np.nan)
+        for metric, bounds in ranges.items():
+            lower[self.index[metric]] = bounds["min"]
+            upper[self.index[metric]] = bounds["max"]
+        return lower, upper
+    
+    def metric_indices(self, metrics: Iterable[Any]) -> np.ndarray:
+        """Индексы метрик в таблице порогов (-1 для неизвестных)"""
+        if isinstance(metrics, np.ndarray) and metrics.dtype.kind in "iu":
+            return metrics.astype(np.intp, copy=False)
+        
+        # Строковый массив NumPy используется как есть, остальное приводится поэлементно
+        if isinstance(metrics, np.ndarray) and metrics.dtype.kind == "U":
+            names = metrics
+        else:
+            names = np.asarray([metric_key(metric) for metric in metrics], dtype=str)
+        
+        # Метрик немного: одно сравнение массива на метрику дешевле сортировки строк
+        indices = np.full(names.shape, -1, dtype=np.intp)
+        for name, index in self.index.items():
+            indices[names == name] = index
+        for alias, name in METRIC_ALIASES.items():
+            if name in self.index:
+                indices[names == alias] = self.index[name]
+        return indices
+    
+    def _resolve(self, metrics: Any, shape: Tuple[int, ...]) -> np.ndarray:
+        """Индексы для одной метрики на весь массив или для последовательности метрик"""
+        if isinstance(metrics, str) or not hasattr(metrics, "__iter__"):
+            return np.full(shape, self.index.get(metric_key(metrics), -1), dtype=np.intp)
+        return self.metric_indices(metrics)
+    
+    def classify(self, metrics: Any, values: Any) -> np.ndarray:
+        """
+        Классифицировать показания: коды STATUS_* для каждой пары (метрика, значение).
+        
+        metrics - название одной метрики для всего массива values либо
+        последовательность названий (или индексов из metric_indices) той же длины.
+        None в values дает STATUS_UNKNOWN.
+        """
+        values = np.asarray(values, dtype=float)
+        
+        idx = self._resolve(metrics, values.shape)
+        
+        known = (idx >= 0) & ~np.isnan(values)
+        safe = np.where(known, idx, 0)
+        
+        codes = np.full(values.shape, STATUS_UNKNOWN, dtype=np.int8)
+        
+        # Сравнение с NaN-границей дает False, поэтому отсутствующие диапазоны не срабатывают
+        with np.errstate(invalid="ignore"):
+            borderline = (values >= self.borderline_min[safe]) & (values <= self.borderline_max[safe])
+            warning = (values < self.normal_min[safe]) | (values > self.normal_max[safe])
+            critical = (values < self.critical_min[safe]) | (values > self.critical_max[safe])
+        
+        # Полосы не пересекаются: пограничный диапазон (например, пульс 100-110)
+        # выделяется из "вне нормы", критический перекрывает оба
+        codes[known & self.has_normal[safe]] = STATUS_NORMAL
+        codes[known & warning & ~borderline] = STATUS_WARNING
+        codes[known & borderline] = STATUS_BORDERLINE
+        codes[known & critical] = STATUS_CRITICAL
+        return codes
+    
+    def direction(self, metrics: Any, values: Any) -> np.ndarray:
+        """Положение относительно нормы: -1 ниже, 0 в норме, 1 выше (0 при отсутствии нормы)"""
+        values = np.asarray(values, dtype=float)
+        
+        idx = self._resolve(metrics, values.shape)
+        
+        safe = np.where(idx >= 0, idx, 0)
+        
+        with np.errstate(invalid="ignore"):
+            low = (idx >= 0) & (values < self.normal_min[safe])
+            high = (idx >= 0) & (values > self.normal_max[safe])
+        
+        return high.astype(np.int8) - low.astype(np.int8)
+    
+    def status(self, metric: Any, value: Optional[float]) -> int:
+        """Код статуса одного показания"""
+        if value is None:
+            return STATUS_UNKNOWN
+        return int(self.classify(metric, [value])[0])
+    
+    def is_critical(self, metric: Any, value: Optional[float]) -> bool:
+        """Проверить, находится ли значение вне критического диапазона"""
+        return self.status(metric, value) == STATUS_CRITICAL
+    
+    def is_known(self, metric: Any) -> bool:
+        """Есть ли для метрики нормальный диапазон"""
+        index = self.index.get(metric_key(metric))
+        return index is not None and bool(self.has_normal[index])
+
+
+# Общий экземпляр с порогами по умолчанию
+health_thresholds = ThresholdEngine(
+    NORMAL_RANGES,
+    CRITICAL_RANGES,
+    BORDERLINE_RANGES
+)
@@ -0,0 +1,189 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import List, Optional, Dict, Any, Callable
+from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+
+from app.database.database import SessionLocal
+from app.models.models import Notification
+
+# Размер пачки удаления (одна короткая транзакция на пачку)
+CLEANUP_BATCH_SIZE = 1000
+
+# Сколько секунд завершенная задача остается доступной для запроса прогресса
+CLEANUP_JOB_RETENTION_SECONDS = 3600
+
+# Колонки, сохраняемые в архив
+ARCHIVE_COLUMNS = [column.name for column in Notification.__table__.columns]
+
+
+class CleanupJob:
+    """Состояние задачи очистки: прогресс и курсор для продолжения"""
+    
+    def __init__(
+        self,
+        days_old: int = 30,
+        recipient_id: Optional[str] = None,
+        batch_size: int = CLEANUP_BATCH_SIZE,
+        archive_path: Optional[str] = None,
+        pause: float = 0.0,
+        after_id: Optional[str] = None
+    ):
+        self.id = str(uuid.uuid4())
+        self.days_old = days_old
+        self.recipient_id = recipient_id
+        self.batch_size = batch_size
+        self.archive_path = archive_path
+        self.pause = pause
+        
+        # Курсор по первичному ключу: задачу можно продолжить с last_id
+        self.last_id = after_id
+        
+        self.status = "pending"
+        self.deleted = 0
+        self.archived = 0
+        self.batches = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "days_old": self.days_old,
+            "recipient_id": self.recipient_id,
+            "deleted": self.deleted,
+            "archived": self.archived,
+            "batches": self.batches,
+            "last_id": self.last_id,
+            "archive_path": self.archive_path,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class NotificationCleanupService:
+    """Очистка старых прочитанных уведомлений пачками по первичному ключу"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def run(self, job: CleanupJob, progress: Optional[Callable[[CleanupJob], None]] = None) -> CleanupJob:
+        """
+        Выполнить задачу: выбрать пачку id, (опционально) заархивировать строки,
+        удалить пачку и закоммитить. Между пачками блокировка записи отпускается,
+        поэтому вставка новых уведомлений не ждет окончания очистки.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=job.days_old)
+        
+        job.status = "running"
+        job.started_at = job.started_at or datetime.utcnow()
+        
+        try:
+            while True:
+                ids = self._next_batch(job, cutoff_date)
+                if not ids:
+                    break
+                
+                if job.archive_path:
+                    job.archived += self._archive(job.archive_path, ids)
+                
+                # Удаляются только прочитанные уведомления, счетчики непрочитанных не меняются
+                deleted = self.db.query(Notification).filter(
+                    Notification.id.in_(ids)
+                ).delete(synchronize_session=False)
+                self.db.commit()
+                
+                job.deleted += deleted
+                job.batches += 1
+                job.last_id = ids[-1]
+                
+                if progress:
+                    progress(job)
+                
+                if len(ids) < job.batch_size:
+                    break
+                
+                if job.pause:
+                    time.sleep(job.pause)
+        except Exception as e:
+            self.db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            raise
+        
+        job.status = "completed"
+        job.finished_at = datetime.utcnow()
+        return job
+    
+    def _next_batch(self, job: CleanupJob, cutoff_date: datetime) -> List[str]:
+        """Следующая пачка id после курсора"""
+        query = self.db.query(Notification.id).filter(
+            and_(
+                Notification.created_at < cutoff_date,
+                Notification.is_read == True
+            )
+        )
+        
+        if job.recipient_id:
+            query = query.filter(Notification.recipient_id == job.recipient_id)
+        
+        if job.last_id:
+            query = query.filter(Notification.id > job.last_id)
+        
+        return [notification_id for (notification_id,) in query.order_by(Notification.id).limit(job.batch_size)]
+    
+    def _archive(self, archive_path: str, ids: List[str]) -> int:
+        """Дописать строки пачки в сжатый архив (JSON Lines, gzip)"""
+        rows = self.db.query(*Notification.__table__.columns).filter(
+            Notification.id.in_(ids)
+        ).all()
+        
+        directory = os.path.dirname(archive_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        # Каждая пачка - отдельный gzip-фрагмент; gzip читает такой файл целиком
+        with gzip.open(archive_path, "at", encoding="utf-8") as archive:
+            for row in rows:
+                archive.write(json.dumps(dict(zip(ARCHIVE_COLUMNS, row)), default=str, ensure_ascii=False) + "\n")
+        
+        return len(rows)
+
+
+# Фоновые задачи очистки текущего процесса
+cleanup_jobs: Dict[str, CleanupJob] = {}
+_cleanup_lock = threading.Lock()
+
+
+def register_cleanup_job(job: CleanupJob) -> CleanupJob:
+    """Зарегистрировать задачу; завершенные раньше CLEANUP_JOB_RETENTION_SECONDS назад удаляются"""
+    expired_before = datetime.utcnow() - timedelta(seconds=CLEANUP_JOB_RETENTION_SECONDS)
+    with _cleanup_lock:
+        for job_id in [
+            job_id for job_id, registered in cleanup_jobs.items()
+            if registered.finished_at and registered.finished_at < expired_before
+        ]:
+            del cleanup_jobs[job_id]
+        cleanup_jobs[job.id] = job
+    return job
+
+
+def run_cleanup_job(job: CleanupJob) -> None:
+    """Выполнить задачу в отдельной сессии (для BackgroundTasks)"""
+    db = SessionLocal()
+    try:
+        NotificationCleanupService(db).run(job)
+    except Exception:
+        # Ошибка сохранена в job.error
+        pass
+    finally:
+        db.close()
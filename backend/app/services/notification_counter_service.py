@@ -0,0 +1,149 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, bindparam, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import List, Optional, Dict, Any
+
+from app.models.models import Notification, NotificationUnreadCounter
+
+
+class NotificationCounterService:
+    """Материализованные счетчики непрочитанных уведомлений по получателю"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_unread_count(self, recipient_id: str) -> int:
+        """Количество непрочитанных уведомлений (чтение по первичному ключу)"""
+        count = self.db.query(NotificationUnreadCounter.unread_count).filter(
+            NotificationUnreadCounter.recipient_id == recipient_id
+        ).scalar()
+        return max(count or 0, 0)
+    
+    def add(self, deltas: Dict[str, int]) -> None:
+        """Изменить счетчики на указанные приращения (коммит выполняет вызывающий код)"""
+        rows = [
+            {"key": recipient_id, "initial": max(delta, 0), "delta": delta}
+            for recipient_id, delta in deltas.items()
+            if delta
+        ]
+        if not rows:
+            return
+        
+        if self.db.get_bind().dialect.name == "postgresql":
+            insert = postgresql.insert
+        else:
+            insert = sqlite.insert
+        
+        # Один upsert на все строки: новая строка получает неотрицательное значение,
+        # существующая - приращение
+        table = NotificationUnreadCounter.__table__
+        stmt = insert(table).values(
+            recipient_id=bindparam("key"),
+            unread_count=bindparam("initial")
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.recipient_id],
+            set_={
+                "unread_count": table.c.unread_count + bindparam("delta"),
+                "updated_at": func.now()
+            }
+        )
+        
+        self.db.execute(stmt, rows)
+    
+    def increment(self, recipient_id: str, count: int = 1) -> None:
+        """Учесть новые непрочитанные уведомления"""
+        self.add({recipient_id: count})
+    
+    def decrement(self, recipient_id: str, count: int = 1) -> None:
+        """Учесть прочитанные или удаленные непрочитанные уведомления"""
+        self.add({recipient_id: -count})
+    
+    def reset(self, recipient_id: str) -> None:
+        """Обнулить счетчик получателя"""
+        self.db.query(NotificationUnreadCounter).filter(
+            NotificationUnreadCounter.recipient_id == recipient_id
+        ).update({"unread_count": 0, "updated_at": func.now()}, synchronize_session=False)
+    
+    def reconcile(self, recipient_id: Optional[str] = None, repair: bool = True) -> List[Dict[str, Any]]:
+        """
+        Сверить счетчики с таблицей notifications и исправить расхождения.
+        
+        Возвращает список расхождений на момент чтения: получатель, значение
+        счетчика и фактическое количество непрочитанных. Исправление пересчитывает
+        счетчики в БД (см. _repair), а не записывает прочитанные значения, поэтому не
+        затирает изменения, сделанные после чтения. Коммит выполняет вызывающий код.
+        """
+        actual_query = self.db.query(
+            Notification.recipient_id,
+            func.count(Notification.id)
+        ).filter(Notification.is_read == False)
+        
+        counter_query = self.db.query(
+            NotificationUnreadCounter.recipient_id,
+            NotificationUnreadCounter.unread_count
+        )
+        
+        if recipient_id:
+            actual_query = actual_query.filter(Notification.recipient_id == recipient_id)
+            counter_query = counter_query.filter(NotificationUnreadCounter.recipient_id == recipient_id)
+        
+        actual = dict(actual_query.group_by(Notification.recipient_id).all())
+        counters = dict(counter_query.all())
+        
+        drift = []
+        for current_id in set(actual) | set(counters):
+            expected = actual.get(current_id, 0)
+            stored = counters.get(current_id)
+            if stored == expected or (stored is None and expected == 0):
+                continue
+            
+            drift.append({
+                "recipient_id": current_id,
+                "stored": stored,
+                "actual": expected
+            })
+        
+        if repair and drift:
+            self._repair(recipient_id)
+        
+        return sorted(drift, key=lambda item: item["recipient_id"])
+    
+    def _repair(self, recipient_id: Optional[str] = None) -> None:
+        """
+        Пересчитать счетчики по таблице notifications атомарными запросами:
+        недостающие строки - INSERT ... SELECT, остальные - UPDATE с подзапросом.
+        """
+        table = NotificationUnreadCounter.__table__
+        
+        unread = self.db.query(
+            Notification.recipient_id,
+            func.count(Notification.id)
+        ).filter(Notification.is_read == False)
+        if recipient_id:
+            unread = unread.filter(Notification.recipient_id == recipient_id)
+        
+        if self.db.get_bind().dialect.name == "postgresql":
+            insert = postgresql.insert
+        else:
+            insert = sqlite.insert
+        
+        self.db.execute(
+            insert(table).from_select(
+                ["recipient_id", "unread_count"],
+                unread.group_by(Notification.recipient_id).statement
+            ).on_conflict_do_nothing(index_elements=[table.c.recipient_id])
+        )
+        
+        actual = select(func.count(Notification.id)).where(
+            and_(
+                Notification.recipient_id == table.c.recipient_id,
+                Notification.is_read == False
+            )
+        ).correlate(table).scalar_subquery()
+        
+        stmt = update(table).where(table.c.unread_count != actual)
+        if recipient_id:
+            stmt = stmt.where(table.c.recipient_id == recipient_id)
+        
+        self.db.execute(stmt.values(unread_count=actual, updated_at=func.now()))
@@ -0,0 +1,70 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+from datetime import datetime
+
+from app.core.events import get_broker
+from app.models.models import Notification
+from app.schemas.schemas import NotificationTypeEnum, NotificationPriorityEnum
+
+# Канал для всех критических предупреждений (панель дежурного врача)
+CRITICAL_ALERTS_CHANNEL = "critical_alerts"
+
+# Ключ session.info со списком уведомлений, ожидающих коммита
+PENDING_KEY = "pending_notification_events"
+
+CRITICAL_PRIORITIES = {NotificationPriorityEnum.high.value, NotificationPriorityEnum.urgent.value}
+
+
+def notification_channel(recipient_id: str) -> str:
+    """Канал уведомлений получателя"""
+    return f"recipient:{recipient_id}"
+
+
+def serialize_notification(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Сообщение для подписчиков по полям уведомления"""
+    created_at = values.get("created_at") or datetime.utcnow()
+    return {
+        "id": values.get("id"),
+        "title": values.get("title"),
+        "message": values.get("message"),
+        "type": getattr(values.get("type"), "value", values.get("type")),
+        "priority": getattr(values.get("priority"), "value", values.get("priority")),
+        "recipient_id": values.get("recipient_id"),
+        "recipient_type": values.get("recipient_type"),
+        "is_read": bool(values.get("is_read")),
+        "created_at": created_at.isoformat()
+    }
+
+
+def queue_notification_events(session: Session, rows: List[Dict[str, Any]]) -> None:
+    """Отложить публикацию уведомлений до коммита (для вставок в обход ORM)"""
+    session.info.setdefault(PENDING_KEY, []).extend(serialize_notification(row) for row in rows)
+
+
+def publish_notification(message: Dict[str, Any]) -> None:
+    """Опубликовать уведомление в канал получателя и, для критических, в общий канал"""
+    broker = get_broker()
+    broker.publish(notification_channel(message["recipient_id"]), message)
+    
+    if message["type"] == NotificationTypeEnum.health_alert.value and message["priority"] in CRITICAL_PRIORITIES:
+        broker.publish(CRITICAL_ALERTS_CHANNEL, message)
+
+
+@event.listens_for(Notification, "after_insert")
+def _queue_inserted_notification(mapper, connection, target: Notification) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        # Берем значения из __dict__, чтобы не вызывать догрузку атрибутов во время flush
+        queue_notification_events(session, [target.__dict__])
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_notifications(session: Session) -> None:
+    for message in session.info.pop(PENDING_KEY, []):
+        publish_notification(message)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_notifications(session: Session, previous_transaction) -> None:
+    session.info.pop(PENDING_KEY, None)
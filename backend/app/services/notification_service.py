@@ -1,37 +1,48 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc, func, case
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import uuid
+from collections import defaultdict
 
-from app.models.models import Notification, Patient, Doctor, Appointment
+from app.core.config import settings
+from app.core.pagination import Page, keyset_paginate
+from app.models.models import Notification, Patient, Doctor, Appointment, AppointmentReminder
 from app.schemas.schemas import NotificationCreate, NotificationUpdate, NotificationTypeEnum, NotificationPriorityEnum
+from app.services.appointment_reminder_service import reminder_message
+from app.services.notification_cleanup_service import NotificationCleanupService, CleanupJob
+from app.services.notification_counter_service import NotificationCounterService
+from app.services.notification_events import queue_notification_events
 
 
 class NotificationService:
     def __init__(self, db: Session):
         self.db = db
+        self.counters = NotificationCounterService(db)
     
     def get_notifications(
         self,
-        patient_id: str,
         skip: int = 0,
         limit: int = 50,
-        unread_only: bool = False,
-        notification_type: Optional[NotificationTypeEnum] = None
-    ) -> List[Notification]:
-        """Получить уведомления пациента"""
-        query = self.db.query(Notification).filter(
-            Notification.patient_id == patient_id
-        )
+        patient_id: Optional[str] = None,
+        notification_type: Optional[NotificationTypeEnum] = None,
+        is_read: Optional[bool] = None,
+        cursor: Optional[str] = None
+    ) -> Page:
+        """Получить уведомления, новые первыми (keyset-пагинация по курсору)"""
+        query = self.db.query(Notification)
+        
+        if patient_id:
+            query = query.filter(Notification.recipient_id == patient_id)
         
-        if unread_only:
-            query = query.filter(Notification.is_read == False)
+        if is_read is not None:
+            query = query.filter(Notification.is_read == is_read)
         
         if notification_type:
-            query = query.filter(Notification.type == notification_type)
+            query = query.filter(Notification.type == notification_type.value)
         
-        return query.order_by(desc(Notification.created_at)).offset(skip).limit(limit).all()
+        return keyset_paginate(query, [Notification.created_at, Notification.id], limit, cursor, skip, descending=True)
     
     def get_notification(self, notification_id: str) -> Optional[Notification]:
         """Получить уведомление по ID"""
@@ -43,58 +54,119 @@ class NotificationService:
         """Создать новое уведомление"""
         notification = Notification(
             id=str(uuid.uuid4()),
-            patient_id=notification_data.patient_id,
+            recipient_id=notification_data.recipient_id,
+            recipient_type=notification_data.recipient_type,
             title=notification_data.title,
             message=notification_data.message,
             type=notification_data.type,
             priority=notification_data.priority,
             is_read=False,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
+            created_at=datetime.utcnow()
         )
         
         self.db.add(notification)
+        
+        # Счетчик непрочитанных обновляется в той же транзакции
+        self.counters.increment(notification.recipient_id)
+        
         self.db.commit()
         self.db.refresh(notification)
         return notification
     
     def update_notification(self, notification_id: str, notification_data: NotificationUpdate) -> Optional[Notification]:
-        """Обновить уведомление"""
+        """
+        Обновить уведомление.
+        
+        Статус прочтения меняется условным UPDATE ... WHERE is_read <> новое значение:
+        как и в mark_as_read, счетчик непрочитанных меняет только тот из
+        параллельных запросов, который действительно изменил строку.
+        """
         notification = self.get_notification(notification_id)
         if not notification:
             return None
         
         update_data = notification_data.dict(exclude_unset=True)
+        is_read = update_data.pop("is_read", None)
         
         for field, value in update_data.items():
             setattr(notification, field, value)
         
-        notification.updated_at = datetime.utcnow()
+        if is_read is not None:
+            changed = self.db.query(Notification).filter(
+                and_(
+                    Notification.id == notification_id,
+                    Notification.is_read != is_read
+                )
+            ).update({
+                "is_read": is_read,
+                "read_at": datetime.utcnow() if is_read else None
+            }, synchronize_session=False)
+            
+            if changed == 1:
+                self.counters.add({notification.recipient_id: -1 if is_read else 1})
         
         self.db.commit()
         self.db.refresh(notification)
         return notification
     
     def delete_notification(self, notification_id: str) -> bool:
-        """Удалить уведомление"""
-        notification = self.get_notification(notification_id)
-        if not notification:
+        """
+        Удалить уведомление.
+        
+        Непрочитанное удаляется условным DELETE ... WHERE is_read = false, и счетчик
+        уменьшается, только если удалил именно этот запрос; иначе строка удаляется
+        без учета в счетчике.
+        """
+        recipient_id = self.db.query(Notification.recipient_id).filter(
+            Notification.id == notification_id
+        ).scalar()
+        if recipient_id is None:
             return False
         
-        self.db.delete(notification)
+        deleted_unread = self.db.query(Notification).filter(
+            and_(
+                Notification.id == notification_id,
+                Notification.is_read == False
+            )
+        ).delete(synchronize_session=False)
+        
+        if deleted_unread == 1:
+            self.counters.decrement(recipient_id)
+        else:
+            deleted = self.db.query(Notification).filter(
+                Notification.id == notification_id
+            ).delete(synchronize_session=False)
+            if not deleted:
+                self.db.rollback()
+                return False
+        
         self.db.commit()
         return True
     
     def mark_as_read(self, notification_id: str) -> bool:
-        """Отметить уведомление как прочитанное"""
-        notification = self.get_notification(notification_id)
-        if not notification:
-            return False
+        """
+        Отметить уведомление как прочитанное.
+        
+        Условный UPDATE ... WHERE is_read = false меняет строку только у одного
+        из параллельных запросов, и только он уменьшает счетчик непрочитанных.
+        """
+        updated = self.db.query(Notification).filter(
+            and_(
+                Notification.id == notification_id,
+                Notification.is_read == False
+            )
+        ).update({
+            "is_read": True,
+            "read_at": datetime.utcnow()
+        }, synchronize_session=False)
         
-        notification.is_read = True
-        notification.read_at = datetime.utcnow()
-        notification.updated_at = datetime.utcnow()
+        if updated != 1:
+            return self.get_notification(notification_id) is not None
         
+        recipient_id = self.db.query(Notification.recipient_id).filter(
+            Notification.id == notification_id
+        ).scalar()
+        self.counters.decrement(recipient_id)
         self.db.commit()
         return True
     
@@ -102,114 +174,151 @@ class NotificationService:
         """Отметить все уведомления пациента как прочитанные"""
         updated_count = self.db.query(Notification).filter(
             and_(
-                Notification.patient_id == patient_id,
+                Notification.recipient_id == patient_id,
                 Notification.is_read == False
             )
         ).update({
             "is_read": True,
-            "read_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
+            "read_at": datetime.utcnow()
+        }, synchronize_session=False)
+        
+        self.counters.decrement(patient_id, updated_count)
         
         self.db.commit()
         return updated_count
     
-    def get_unread_notifications(self, patient_id: str) -> List[Notification]:
+    def get_unread_notifications(self, patient_id: str, limit: Optional[int] = None) -> List[Notification]:
         """Получить непрочитанные уведомления"""
-        return self.db.query(Notification).filter(
+        # Пустой счетчик - самый частый ответ при опросе, таблицу не читаем
+        if self.counters.get_unread_count(patient_id) == 0:
+            return []
+        
+        query = self.db.query(Notification).filter(
             and_(
-                Notification.patient_id == patient_id,
+                Notification.recipient_id == patient_id,
                 Notification.is_read == False
             )
-        ).order_by(desc(Notification.created_at)).all()
+        ).order_by(desc(Notification.created_at))
+        
+        if limit:
+            query = query.limit(limit)
+        
+        return query.all()
     
     def get_unread_count(self, patient_id: str) -> int:
-        """Получить количество непрочитанных уведомлений"""
-        return self.db.query(Notification).filter(
-            and_(
-                Notification.patient_id == patient_id,
-                Notification.is_read == False
-            )
-        ).count()
+        """Получить количество непрочитанных уведомлений (из материализованного счетчика)"""
+        return self.counters.get_unread_count(patient_id)
     
     def get_notification_count(self, patient_id: str) -> Dict[str, int]:
         """Получить статистику уведомлений пациента"""
-        total = self.db.query(Notification).filter(
-            Notification.patient_id == patient_id
-        ).count()
-        
-        unread = self.get_unread_count(patient_id)
-        read = total - unread
-        
-        # Статистика по типам
-        type_stats = {}
-        for notification_type in NotificationTypeEnum:
-            count = self.db.query(Notification).filter(
-                and_(
-                    Notification.patient_id == patient_id,
-                    Notification.type == notification_type
-                )
-            ).count()
-            type_stats[notification_type.value] = count
-        
-        # Статистика по приоритетам
-        priority_stats = {}
-        for priority in NotificationPriorityEnum:
-            count = self.db.query(Notification).filter(
-                and_(
-                    Notification.patient_id == patient_id,
-                    Notification.priority == priority
-                )
-            ).count()
-            priority_stats[priority.value] = count
+        # Все разбивки одним GROUP BY по типу и приоритету
+        rows = self.db.query(
+            Notification.type,
+            Notification.priority,
+            func.count(Notification.id),
+            func.sum(case((Notification.is_read == False, 1), else_=0))
+        ).filter(
+            Notification.recipient_id == patient_id
+        ).group_by(Notification.type, Notification.priority).all()
+        
+        total = 0
+        unread = 0
+        type_stats = {notification_type.value: 0 for notification_type in NotificationTypeEnum}
+        priority_stats = {priority.value: 0 for priority in NotificationPriorityEnum}
+        
+        for notification_type, priority, count, unread_count in rows:
+            total += count
+            unread += unread_count or 0
+            if notification_type in type_stats:
+                type_stats[notification_type] += count
+            if priority in priority_stats:
+                priority_stats[priority] += count
         
         return {
             "total": total,
             "unread": unread,
-            "read": read,
+            "read": total - unread,
             "by_type": type_stats,
             "by_priority": priority_stats
         }
     
-    def send_appointment_reminder(self, appointment_id: str, hours_before: int = 24) -> Optional[Notification]:
-        """Отправить напоминание о назначении"""
-        appointment = self.db.query(Appointment).filter(
+    def send_appointment_reminder(self, appointment_id: str, hours_before: Optional[int] = None) -> Optional[Notification]:
+        """
+        Отправить напоминание о назначении.
+        
+        Вместе с уведомлением записывается строка appointment_reminders с тем же
+        ключом, что у планировщика рассылки: напоминание не уходит дважды, а при
+        параллельной отправке IntegrityError откатывает второе (возвращается None).
+        """
+        hours_before = hours_before or settings.appointment_reminder_hours_before
+        
+        # Назначение и врач одним запросом
+        row = self.db.query(
+            Appointment.patient_id,
+            Appointment.date,
+            Appointment.time,
+            Doctor.first_name,
+            Doctor.last_name
+        ).outerjoin(
+            Doctor, Doctor.id == Appointment.doctor_id
+        ).filter(
             Appointment.id == appointment_id
         ).first()
         
-        if not appointment:
+        if not row:
             return None
         
         # Проверяем, что назначение в будущем
-        appointment_datetime = datetime.combine(
-            appointment.appointment_date,
-            appointment.appointment_time
-        )
+        appointment_datetime = datetime.strptime(f"{row.date} {row.time}", "%Y-%m-%d %H:%M")
         
         if appointment_datetime <= datetime.now():
             return None
         
-        # Получаем информацию о враче
-        doctor = self.db.query(Doctor).filter(
-            Doctor.id == appointment.doctor_id
-        ).first()
-        
-        doctor_name = f"Dr. {doctor.first_name} {doctor.last_name}" if doctor else "врачом"
-        
-        notification_data = NotificationCreate(
-            patient_id=appointment.patient_id,
+        notification = Notification(
+            id=str(uuid.uuid4()),
+            recipient_id=row.patient_id,
+            recipient_type="patient",
             title="Напоминание о приеме",
-            message=f"У вас назначен прием с {doctor_name} на {appointment.appointment_date.strftime('%d.%m.%Y')} в {appointment.appointment_time.strftime('%H:%M')}",
+            message=reminder_message(row.date, row.time, row.first_name, row.last_name),
             type=NotificationTypeEnum.appointment_reminder,
-            priority=NotificationPriorityEnum.medium
+            priority=NotificationPriorityEnum.medium,
+            is_read=False,
+            created_at=datetime.utcnow()
         )
         
-        return self.create_notification(notification_data)
+        self.db.add(notification)
+        self.db.add(AppointmentReminder(
+            appointment_id=appointment_id,
+            hours_before=hours_before,
+            notification_id=notification.id,
+            sent_at=notification.created_at
+        ))
+        self.counters.increment(notification.recipient_id)
+        
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return None
+        
+        self.db.refresh(notification)
+        return notification
+    
+    def reminder_sent(self, appointment_id: str, hours_before: Optional[int] = None) -> bool:
+        """Отправлено ли напоминание о назначении (вручную или планировщиком)"""
+        hours_before = hours_before or settings.appointment_reminder_hours_before
+        return self.db.query(AppointmentReminder.appointment_id).filter(
+            and_(
+                AppointmentReminder.appointment_id == appointment_id,
+                AppointmentReminder.hours_before == hours_before
+            )
+        ).first() is not None
     
     def send_health_alert(self, patient_id: str, metric_name: str, value: float, critical_range: str) -> Notification:
         """Отправить предупреждение о критических показателях здоровья"""
         notification_data = NotificationCreate(
-            patient_id=patient_id,
+            recipient_id=patient_id,
+            recipient_type="patient",
             title="Критические показатели здоровья",
             message=f"Внимание! Показатель '{metric_name}' имеет критическое значение: {value}. Нормальный диапазон: {critical_range}. Рекомендуется обратиться к врачу.",
             type=NotificationTypeEnum.health_alert,
@@ -221,7 +330,8 @@ class NotificationService:
     def send_medication_reminder(self, patient_id: str, medication_name: str, dosage: str, time: str) -> Notification:
         """Отправить напоминание о приеме лекарств"""
         notification_data = NotificationCreate(
-            patient_id=patient_id,
+            recipient_id=patient_id,
+            recipient_type="patient",
             title="Напоминание о приеме лекарств",
             message=f"Время принять лекарство: {medication_name}, дозировка: {dosage}. Время приема: {time}",
             type=NotificationTypeEnum.medication_reminder,
@@ -233,7 +343,8 @@ class NotificationService:
     def send_test_result_notification(self, patient_id: str, test_name: str, result_summary: str) -> Notification:
         """Отправить уведомление о результатах анализов"""
         notification_data = NotificationCreate(
-            patient_id=patient_id,
+            recipient_id=patient_id,
+            recipient_type="patient",
             title="Результаты анализов готовы",
             message=f"Готовы результаты анализа: {test_name}. {result_summary}",
             type=NotificationTypeEnum.test_results,
@@ -245,7 +356,8 @@ class NotificationService:
     def send_system_notification(self, patient_id: str, title: str, message: str, priority: NotificationPriorityEnum = NotificationPriorityEnum.low) -> Notification:
         """Отправить системное уведомление"""
         notification_data = NotificationCreate(
-            patient_id=patient_id,
+            recipient_id=patient_id,
+            recipient_type="patient",
             title=title,
             message=message,
             type=NotificationTypeEnum.system,
@@ -254,20 +366,16 @@ class NotificationService:
         
         return self.create_notification(notification_data)
     
-    def cleanup_old_notifications(self, days_old: int = 30) -> int:
-        """Очистить старые уведомления"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
-        
-        # Удаляем только прочитанные уведомления старше указанного срока
-        deleted_count = self.db.query(Notification).filter(
-            and_(
-                Notification.created_at < cutoff_date,
-                Notification.is_read == True
-            )
-        ).delete()
-        
-        self.db.commit()
-        return deleted_count
+    def cleanup_old_notifications(
+        self,
+        days_old: int = 30,
+        recipient_id: Optional[str] = None,
+        archive_path: Optional[str] = None
+    ) -> int:
+        """Очистить старые прочитанные уведомления (пачками, см. NotificationCleanupService)"""
+        job = CleanupJob(days_old=days_old, recipient_id=recipient_id, archive_path=archive_path)
+        NotificationCleanupService(self.db).run(job)
+        return job.deleted
     
     def get_notifications_by_priority(self, patient_id: str, priority: NotificationPriorityEnum) -> List[Notification]:
         """Получить уведомления по приоритету"""
@@ -298,71 +406,75 @@ class NotificationService:
             )
         ).order_by(desc(Notification.created_at)).all()
     
-    def bulk_create_notifications(self, notifications_data: List[NotificationCreate]) -> List[Notification]:
-        """Массовое создание уведомлений"""
-        notifications = []
+    def bulk_create_notifications(self, notifications_data: List[NotificationCreate]) -> List[Dict[str, Any]]:
+        """
+        Массовое создание уведомлений одной вставкой (executemany).
         
-        for notification_data in notifications_data:
-            notification = Notification(
-                id=str(uuid.uuid4()),
-                patient_id=notification_data.patient_id,
-                title=notification_data.title,
-                message=notification_data.message,
-                type=notification_data.type,
-                priority=notification_data.priority,
-                is_read=False,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            notifications.append(notification)
+        Все значения, включая id и created_at, формируются здесь, поэтому
+        вставленные строки возвращаются без повторного чтения из базы.
+        """
+        now = datetime.utcnow()
+        rows = []
+        unread_deltas = defaultdict(int)
         
-        self.db.add_all(notifications)
+        for notification_data in notifications_data:
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "recipient_id": notification_data.recipient_id,
+                "recipient_type": notification_data.recipient_type,
+                "title": notification_data.title,
+                "message": notification_data.message,
+                "type": getattr(notification_data.type, "value", notification_data.type),
+                "priority": getattr(notification_data.priority, "value", notification_data.priority),
+                "is_read": False,
+                "read_at": None,
+                "created_at": now
+            })
+            unread_deltas[notification_data.recipient_id] += 1
+        
+        if not rows:
+            return []
+        
+        # Вставка через Core не вызывает ORM-событий, поэтому события SSE ставятся в очередь явно
+        self.db.execute(Notification.__table__.insert(), rows)
+        self.counters.add(unread_deltas)
+        queue_notification_events(self.db, rows)
         self.db.commit()
         
-        for notification in notifications:
-            self.db.refresh(notification)
-        
-        return notifications
+        return rows
     
     def get_notification_statistics(self) -> Dict[str, Any]:
         """Получить общую статистику уведомлений"""
         today = datetime.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Общее количество уведомлений
-        total_notifications = self.db.query(Notification).count()
-        
-        # Уведомления за неделю
-        week_notifications = self.db.query(Notification).filter(
-            Notification.created_at >= datetime.combine(week_ago, datetime.min.time())
-        ).count()
-        
-        # Уведомления за месяц
-        month_notifications = self.db.query(Notification).filter(
-            Notification.created_at >= datetime.combine(month_ago, datetime.min.time())
-        ).count()
-        
-        # Непрочитанные уведомления
-        unread_notifications = self.db.query(Notification).filter(
-            Notification.is_read == False
-        ).count()
-        
-        # Статистика по типам
-        type_stats = {}
-        for notification_type in NotificationTypeEnum:
-            count = self.db.query(Notification).filter(
-                Notification.type == notification_type
-            ).count()
-            type_stats[notification_type.value] = count
-        
-        # Статистика по приоритетам
-        priority_stats = {}
-        for priority in NotificationPriorityEnum:
-            count = self.db.query(Notification).filter(
-                Notification.priority == priority
-            ).count()
-            priority_stats[priority.value] = count
+        week_ago = datetime.combine(today - timedelta(days=7), datetime.min.time())
+        month_ago = datetime.combine(today - timedelta(days=30), datetime.min.time())
+        
+        # Все счетчики одним GROUP BY с условными агрегатами
+        rows = self.db.query(
+            Notification.type,
+            Notification.priority,
+            func.count(Notification.id),
+            func.sum(case((Notification.created_at >= week_ago, 1), else_=0)),
+            func.sum(case((Notification.created_at >= month_ago, 1), else_=0)),
+            func.sum(case((Notification.is_read == False, 1), else_=0))
+        ).group_by(Notification.type, Notification.priority).all()
+        
+        total_notifications = 0
+        week_notifications = 0
+        month_notifications = 0
+        unread_notifications = 0
+        type_stats = {notification_type.value: 0 for notification_type in NotificationTypeEnum}
+        priority_stats = {priority.value: 0 for priority in NotificationPriorityEnum}
+        
+        for notification_type, priority, count, week_count, month_count, unread_count in rows:
+            total_notifications += count
+            week_notifications += week_count or 0
+            month_notifications += month_count or 0
+            unread_notifications += unread_count or 0
+            if notification_type in type_stats:
+                type_stats[notification_type] += count
+            if priority in priority_stats:
+                priority_stats[priority] += count
         
         return {
             "total_notifications": total_notifications,
@@ -380,6 +492,12 @@ class NotificationService:
         return self.db.query(Patient).filter(
             and_(
                 Patient.id == patient_id,
-                Patient.is_deleted == False
+                Patient.is_active == True
             )
+        ).first() is not None
+    
+    def appointment_exists(self, appointment_id: str) -> bool:
+        """Проверить существование назначения"""
+        return self.db.query(Appointment.id).filter(
+            Appointment.id == appointment_id
         ).first() is not None
\ No newline at end of file
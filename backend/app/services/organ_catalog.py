@@ -0,0 +1,282 @@
+from sqlalchemy.orm import Session
+from types import MappingProxyType
+from typing import List, Optional, Dict, Any, Mapping, NamedTuple
+import hashlib
+import json
+
+from app.core.snapshot import SnapshotHolder, table_signature
+from app.database.database import SessionLocal
+from app.models.models import Organ
+from app.schemas.schemas import Organ as OrganSchema
+from app.services.organ_spatial_index import OrganSpatialIndex, OrganRegion
+
+# Предопределенные заболевания для каждого органа
+ORGAN_DISEASES = {
+    "Сердце": [
+        {
+            "name": "Ишемическая болезнь сердца",
+            "description": "Заболевание, вызванное недостаточным кровоснабжением сердечной мышцы",
+            "symptoms": ["Боль в груди", "Одышка", "Усталость"],
+            "risk_factors": ["Высокое давление", "Высокий холестерин", "Курение"]
+        },
+        {
+            "name": "Аритмия",
+            "description": "Нарушение ритма сердечных сокращений",
+            "symptoms": ["Неровное сердцебиение", "Головокружение", "Обмороки"],
+            "risk_factors": ["Стресс", "Кофеин", "Заболевания сердца"]
+        },
+        {
+            "name": "Гипертония",
+            "description": "Повышенное артериальное давление",
+            "symptoms": ["Головная боль", "Головокружение", "Шум в ушах"],
+            "risk_factors": ["Избыточный вес", "Соль", "Стресс"]
+        }
+    ],
+    "Легкие": [
+        {
+            "name": "Астма",
+            "description": "Хроническое воспалительное заболевание дыхательных путей",
+            "symptoms": ["Затрудненное дыхание", "Кашель", "Свистящее дыхание"],
+            "risk_factors": ["Аллергены", "Загрязнение воздуха", "Инфекции"]
+        },
+        {
+            "name": "ХОБЛ",
+            "description": "Хроническая обструктивная болезнь легких",
+            "symptoms": ["Хронический кашель", "Одышка", "Мокрота"],
+            "risk_factors": ["Курение", "Загрязнение воздуха", "Профессиональные вредности"]
+        }
+    ],
+    "Печень": [
+        {
+            "name": "Гепатит",
+            "description": "Воспаление печени",
+            "symptoms": ["Желтуха", "Усталость", "Боль в правом подреберье"],
+            "risk_factors": ["Вирусы", "Алкоголь", "Токсины"]
+        },
+        {
+            "name": "Цирроз",
+            "description": "Рубцевание печени",
+            "symptoms": ["Желтуха", "Отеки", "Кровотечения"],
+            "risk_factors": ["Алкоголь", "Гепатит", "Жировая болезнь печени"]
+        }
+    ],
+    "Почки": [
+        {
+            "name": "Хроническая болезнь почек",
+            "description": "Постепенная потеря функции почек",
+            "symptoms": ["Отеки", "Усталость", "Изменения в моче"],
+            "risk_factors": ["Диабет", "Гипертония", "Семейная история"]
+        },
+        {
+            "name": "Почечные камни",
+            "description": "Твердые отложения в почках",
+            "symptoms": ["Острая боль", "Кровь в моче", "Тошнота"],
+            "risk_factors": ["Обезвоживание", "Диета", "Генетика"]
+        }
+    ]
+}
+
+# Предопределенные советы для каждого органа
+ORGAN_HEALTH_TIPS = {
+    "Сердце": [
+        {
+            "category": "Питание",
+            "tip": "Ограничьте потребление насыщенных жиров и трансжиров"
+        },
+        {
+            "category": "Физическая активность",
+            "tip": "Занимайтесь аэробными упражнениями минимум 150 минут в неделю"
+        },
+        {
+            "category": "Образ жизни",
+            "tip": "Избегайте курения и ограничьте употребление алкоголя"
+        },
+        {
+            "category": "Стресс",
+            "tip": "Практикуйте техники управления стрессом"
+        }
+    ],
+    "Легкие": [
+        {
+            "category": "Воздух",
+            "tip": "Избегайте загрязненного воздуха и курения"
+        },
+        {
+            "category": "Дыхание",
+            "tip": "Практикуйте глубокое дыхание и дыхательные упражнения"
+        },
+        {
+            "category": "Инфекции",
+            "tip": "Делайте прививки от гриппа и пневмонии"
+        }
+    ],
+    "Печень": [
+        {
+            "category": "Алкоголь",
+            "tip": "Ограничьте или исключите употребление алкоголя"
+        },
+        {
+            "category": "Питание",
+            "tip": "Поддерживайте здоровый вес и сбалансированную диету"
+        },
+        {
+            "category": "Лекарства",
+            "tip": "Будьте осторожны с лекарствами и добавками"
+        }
+    ],
+    "Почки": [
+        {
+            "category": "Гидратация",
+            "tip": "Пейте достаточно воды (8-10 стаканов в день)"
+        },
+        {
+            "category": "Соль",
+            "tip": "Ограничьте потребление натрия"
+        },
+        {
+            "category": "Давление",
+            "tip": "Контролируйте артериальное давление и уровень сахара"
+        }
+    ]
+}
+
+# Предопределенные взаимодействия
+ORGAN_INTERACTIONS = {
+    "Сердце": [
+        {
+            "organ": "Легкие",
+            "interaction": "Сердце перекачивает кровь через легкие для оксигенации",
+            "type": "circulatory"
+        },
+        {
+            "organ": "Почки",
+            "interaction": "Сердце обеспечивает кровоснабжение почек для фильтрации",
+            "type": "circulatory"
+        },
+        {
+            "organ": "Мозг",
+            "interaction": "Мозг регулирует сердечный ритм через нервную систему",
+            "type": "nervous"
+        }
+    ],
+    "Легкие": [
+        {
+            "organ": "Сердце",
+            "interaction": "Легкие насыщают кровь кислородом для сердца",
+            "type": "respiratory"
+        },
+        {
+            "organ": "Мозг",
+            "interaction": "Мозг контролирует дыхание через дыхательный центр",
+            "type": "nervous"
+        }
+    ],
+    "Печень": [
+        {
+            "organ": "Поджелудочная железа",
+            "interaction": "Печень и поджелудочная железа работают вместе в пищеварении",
+            "type": "digestive"
+        },
+        {
+            "organ": "Почки",
+            "interaction": "Печень и почки совместно очищают кровь от токсинов",
+            "type": "detoxification"
+        }
+    ]
+}
+
+# Совет для органов без собственных рекомендаций
+DEFAULT_HEALTH_TIPS = [
+    {
+        "category": "Общее",
+        "tip": "Поддерживайте здоровый образ жизни"
+    }
+]
+
+
+class CatalogDocument(NamedTuple):
+    """Готовый ответ: сериализованное тело и строгий ETag по его содержимому"""
+    body: bytes
+    etag: str
+
+
+def make_document(payload: Any) -> CatalogDocument:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CatalogDocument(body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+class OrganCatalog:
+    """
+    Неизменяемый снимок справочника органов.
+    
+    Все ответы (список, орган, заболевания, советы, взаимодействия) сериализуются
+    один раз при построении снимка, вместе с ETag. Снимок не меняется: при записи
+    строится новый и подменяется целиком, поэтому читатели не видят промежуточных
+    состояний и не обращаются к базе.
+    """
+    
+    def __init__(self, organs: List[Dict[str, Any]], version: int):
+        self.version = version
+        self.organs = tuple(organs)
+        self.by_id: Mapping[str, Dict[str, Any]] = MappingProxyType({organ["id"]: organ for organ in self.organs})
+        
+        self.index = OrganSpatialIndex(
+            OrganRegion(
+                organ["id"], organ["name"], organ["label"],
+                organ["position_x"], organ["position_y"], organ["width"], organ["height"]
+            )
+            for organ in self.organs
+        )
+        
+        documents = {"organs": make_document(list(self.organs))}
+        for organ in self.organs:
+            organ_id = organ["id"]
+            documents[f"organ:{organ_id}"] = make_document(organ)
+            documents[f"diseases:{organ_id}"] = make_document(self.get_diseases(organ_id))
+            documents[f"tips:{organ_id}"] = make_document(self.get_health_tips(organ_id))
+            documents[f"interactions:{organ_id}"] = make_document(self.get_interactions(organ_id))
+        self.documents: Mapping[str, CatalogDocument] = MappingProxyType(documents)
+    
+    def get(self, organ_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(organ_id)
+    
+    def document(self, key: str) -> Optional[CatalogDocument]:
+        return self.documents.get(key)
+    
+    def get_diseases(self, organ_id: str) -> List[Dict[str, Any]]:
+        organ = self.by_id.get(organ_id)
+        return ORGAN_DISEASES.get(organ["name"], []) if organ else []
+    
+    def get_health_tips(self, organ_id: str) -> List[Dict[str, str]]:
+        organ = self.by_id.get(organ_id)
+        return ORGAN_HEALTH_TIPS.get(organ["name"], DEFAULT_HEALTH_TIPS) if organ else []
+    
+    def get_interactions(self, organ_id: str) -> List[Dict[str, Any]]:
+        organ = self.by_id.get(organ_id)
+        return ORGAN_INTERACTIONS.get(organ["name"], []) if organ else []
+
+
+class OrganCatalogHolder(SnapshotHolder):
+    """Текущий снимок справочника: загружается при старте и подменяется атомарно после записи"""
+    
+    def build(self, db: Session, version: int) -> OrganCatalog:
+        """Снимок по активным органам (один запрос)"""
+        organs = db.query(Organ).filter(Organ.is_active == True).order_by(Organ.id).all()
+        payload = [OrganSchema.model_validate(organ).model_dump(mode="json") for organ in organs]
+        return OrganCatalog(payload, version)
+    
+    def probe(self, db: Session) -> Any:
+        """Сигнатура таблицы органов - для перестройки после записей других воркеров"""
+        return table_signature(db, Organ)
+
+
+organ_catalog = OrganCatalogHolder()
+
+
+def load_organ_catalog() -> OrganCatalog:
+    """Загрузить снимок в отдельной сессии (при старте приложения)"""
+    db = SessionLocal()
+    try:
+        return organ_catalog.reload(db)
+    finally:
+        db.close()
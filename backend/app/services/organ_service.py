@@ -1,11 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy import and_, or_, desc, func, select, union_all, literal, cast, Float
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import uuid
 
 from app.models.models import Organ, HealthData, Patient
 from app.schemas.schemas import OrganCreate, OrganUpdate, HealthMetric
+from app.services.health_rollup_service import HEALTH_METRICS
+from app.services.health_metric_stats_service import HealthMetricStatsService
+from app.services.health_service import METRIC_UNITS
+from app.services.health_thresholds import health_thresholds, metric_key, DIRECTION_NAMES
+from app.services.organ_catalog import organ_catalog, OrganCatalog
 
 
 class OrganService:
@@ -67,14 +72,14 @@ class OrganService:
     def get_organs(self, skip: int = 0, limit: int = 100) -> List[Organ]:
         """Получить список органов"""
         organs = self.db.query(Organ).filter(
-            Organ.is_deleted == False
+            Organ.is_active == True
         ).offset(skip).limit(limit).all()
         
         # Если органов нет, создаем набор по умолчанию
         if not organs and skip == 0:
             self.create_default_organs()
             organs = self.db.query(Organ).filter(
-                Organ.is_deleted == False
+                Organ.is_active == True
             ).offset(skip).limit(limit).all()
         
         return organs
@@ -84,7 +89,7 @@ class OrganService:
         return self.db.query(Organ).filter(
             and_(
                 Organ.id == organ_id,
-                Organ.is_deleted == False
+                Organ.is_active == True
             )
         ).first()
     
@@ -93,19 +98,24 @@ class OrganService:
         return self.db.query(Organ).filter(
             and_(
                 Organ.name.ilike(f"%{name}%"),
-                Organ.is_deleted == False
+                Organ.is_active == True
             )
         ).first()
     
+    def get_catalog(self) -> OrganCatalog:
+        """Текущий снимок справочника органов (запрос к базе только при первой загрузке)"""
+        return organ_catalog.get(self.db)
+    
+    def get_organs_at(self, x: float, y: float) -> List[Dict[str, Any]]:
+        """Органы, содержащие точку изображения (по индексу в памяти, без запроса к базе)"""
+        regions = self.get_catalog().index.query_point(x, y)
+        return [region.to_dict() for region in regions]
+    
     def create_organ(self, organ_data: OrganCreate) -> Organ:
         """Создать новый орган"""
         organ = Organ(
-            id=str(uuid.uuid4()),
-            name=organ_data.name,
-            description=organ_data.description,
-            function=organ_data.function,
-            related_metrics=organ_data.related_metrics,
-            is_deleted=False,
+            **organ_data.dict(),
+            is_active=True,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
@@ -113,6 +123,8 @@ class OrganService:
         self.db.add(organ)
         self.db.commit()
         self.db.refresh(organ)
+        
+        organ_catalog.reload(self.db)
         return organ
     
     def update_organ(self, organ_id: str, organ_data: OrganUpdate) -> Optional[Organ]:
@@ -130,6 +142,8 @@ class OrganService:
         
         self.db.commit()
         self.db.refresh(organ)
+        
+        organ_catalog.reload(self.db)
         return organ
     
     def delete_organ(self, organ_id: str) -> bool:
@@ -138,10 +152,12 @@ class OrganService:
         if not organ:
             return False
         
-        organ.is_deleted = True
+        organ.is_active = False
         organ.updated_at = datetime.utcnow()
         
         self.db.commit()
+        
+        organ_catalog.reload(self.db)
         return True
     
     def create_default_organs(self) -> List[Organ]:
@@ -173,6 +189,8 @@ class OrganService:
             
             for organ in organs:
                 self.db.refresh(organ)
+            
+            organ_catalog.reload(self.db)
         
         return organs
     
@@ -183,7 +201,7 @@ class OrganService:
             return None
         
         # Получаем связанные метрики
-        related_metrics = organ.related_metrics or []
+        related_metrics = self._get_related_metrics(organ.name)
         
         if not related_metrics:
             return {
@@ -194,31 +212,8 @@ class OrganService:
                 "metrics_data": []
             }
         
-        # Получаем данные о здоровье за указанный период
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        
-        health_data = self.db.query(HealthData).filter(
-            and_(
-                HealthData.patient_id == patient_id,
-                HealthData.metric.in_(related_metrics),
-                HealthData.recorded_at >= start_date,
-                HealthData.recorded_at <= end_date
-            )
-        ).order_by(desc(HealthData.recorded_at)).all()
-        
-        # Группируем данные по метрикам
-        metrics_data = {}
-        for metric in related_metrics:
-            metric_records = [r for r in health_data if r.metric == metric]
-            if metric_records:
-                latest_record = metric_records[0]
-                metrics_data[metric.value] = {
-                    "latest_value": latest_record.value,
-                    "unit": latest_record.unit,
-                    "recorded_at": latest_record.recorded_at.isoformat(),
-                    "status": self._get_metric_status(metric, latest_record.value)
-                }
+        latest = self._get_latest_metrics(patient_id, related_metrics, days)
+        metrics_data = {metric: latest[metric] for metric in related_metrics if metric in latest}
         
         # Определяем общий статус здоровья органа
         health_status = self._determine_organ_health_status(metrics_data)
@@ -232,272 +227,155 @@ class OrganService:
             "last_updated": datetime.now().isoformat()
         }
     
-    def get_organ_diseases(self, organ_id: str) -> List[Dict[str, Any]]:
-        """Получить список заболеваний, связанных с органом"""
-        organ = self.get_organ(organ_id)
-        if not organ:
-            return []
-        
-        # Предопределенные заболевания для каждого органа
-        organ_diseases = {
-            "Сердце": [
-                {
-                    "name": "Ишемическая болезнь сердца",
-                    "description": "Заболевание, вызванное недостаточным кровоснабжением сердечной мышцы",
-                    "symptoms": ["Боль в груди", "Одышка", "Усталость"],
-                    "risk_factors": ["Высокое давление", "Высокий холестерин", "Курение"]
-                },
-                {
-                    "name": "Аритмия",
-                    "description": "Нарушение ритма сердечных сокращений",
-                    "symptoms": ["Неровное сердцебиение", "Головокружение", "Обмороки"],
-                    "risk_factors": ["Стресс", "Кофеин", "Заболевания сердца"]
-                },
-                {
-                    "name": "Гипертония",
-                    "description": "Повышенное артериальное давление",
-                    "symptoms": ["Головная боль", "Головокружение", "Шум в ушах"],
-                    "risk_factors": ["Избыточный вес", "Соль", "Стресс"]
-                }
-            ],
-            "Легкие": [
-                {
-                    "name": "Астма",
-                    "description": "Хроническое воспалительное заболевание дыхательных путей",
-                    "symptoms": ["Затрудненное дыхание", "Кашель", "Свистящее дыхание"],
-                    "risk_factors": ["Аллергены", "Загрязнение воздуха", "Инфекции"]
-                },
-                {
-                    "name": "ХОБЛ",
-                    "description": "Хроническая обструктивная болезнь легких",
-                    "symptoms": ["Хронический кашель", "Одышка", "Мокрота"],
-                    "risk_factors": ["Курение", "Загрязнение воздуха", "Профессиональные вредности"]
-                }
-            ],
-            "Печень": [
-                {
-                    "name": "Гепатит",
-                    "description": "Воспаление печени",
-                    "symptoms": ["Желтуха", "Усталость", "Боль в правом подреберье"],
-                    "risk_factors": ["Вирусы", "Алкоголь", "Токсины"]
-                },
-                {
-                    "name": "Цирроз",
-                    "description": "Рубцевание печени",
-                    "symptoms": ["Желтуха", "Отеки", "Кровотечения"],
-                    "risk_factors": ["Алкоголь", "Гепатит", "Жировая болезнь печени"]
-                }
-            ],
-            "Почки": [
-                {
-                    "name": "Хроническая болезнь почек",
-                    "description": "Постепенная потеря функции почек",
-                    "symptoms": ["Отеки", "Усталость", "Изменения в моче"],
-                    "risk_factors": ["Диабет", "Гипертония", "Семейная история"]
-                },
-                {
-                    "name": "Почечные камни",
-                    "description": "Твердые отложения в почках",
-                    "symptoms": ["Острая боль", "Кровь в моче", "Тошнота"],
-                    "risk_factors": ["Обезвоживание", "Диета", "Генетика"]
-                }
-            ]
+    def get_health_map(self, patient_id: str, days: int = 30) -> Dict[str, Any]:
+        """
+        Карта здоровья всех органов пациента.
+        
+        Последние значения всех метрик читаются одним запросом, затем
+        распределяются по органам согласно связанным метрикам.
+        """
+        organs = self.get_catalog().organs
+        related = {organ["id"]: self._get_related_metrics(organ["name"]) for organ in organs}
+        
+        all_metrics = sorted({metric for metrics in related.values() for metric in metrics})
+        latest = self._get_latest_metrics(patient_id, all_metrics, days)
+        
+        organs_data = []
+        for organ in organs:
+            metrics_data = {metric: latest[metric] for metric in related[organ["id"]] if metric in latest}
+            organs_data.append({
+                "organ_id": organ["id"],
+                "organ_name": organ["name"],
+                "label": organ["label"],
+                "health_status": self._determine_organ_health_status(metrics_data),
+                "metrics_data": metrics_data
+            })
+        
+        return {
+            "patient_id": patient_id,
+            "organs": organs_data,
+            "metrics": latest,
+            "analysis_period_days": days,
+            "last_updated": datetime.now().isoformat()
         }
+    
+    def _get_related_metrics(self, organ_name: str) -> List[str]:
+        """Метрики, связанные с органом (названия HealthMetric)"""
+        return [metric.value for metric in ORGAN_RELATED_METRICS.get(organ_name, [])]
+    
+    def _get_latest_metrics(self, patient_id: str, metrics: List[str], days: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Последнее значение каждой метрики за период одним запросом.
+        
+        Колонки показателей разворачиваются в строки (metric, value, recorded_at)
+        через UNION ALL, а ROW_NUMBER() по метрике оставляет самую свежую строку.
+        Метрики, для которых в health_data нет колонки, пропускаются.
+        """
+        columns = {metric: metric_key(metric) for metric in metrics if metric_key(metric) in HEALTH_METRICS}
+        if not columns:
+            return {}
+        
+        start_date = datetime.now() - timedelta(days=days)
+        
+        readings = union_all(*[
+            select(
+                literal(metric).label("metric"),
+                cast(getattr(HealthData, column), Float).label("value"),
+                HealthData.recorded_at.label("recorded_at")
+            ).where(
+                and_(
+                    HealthData.patient_id == patient_id,
+                    HealthData.recorded_at >= start_date,
+                    getattr(HealthData, column).isnot(None)
+                )
+            )
+            for metric, column in columns.items()
+        ]).subquery()
+        
+        ranked = select(
+            readings.c.metric,
+            readings.c.value,
+            readings.c.recorded_at,
+            func.row_number().over(
+                partition_by=readings.c.metric,
+                order_by=readings.c.recorded_at.desc()
+            ).label("position")
+        ).subquery()
+        
+        rows = self.db.execute(
+            select(ranked.c.metric, ranked.c.value, ranked.c.recorded_at).where(ranked.c.position == 1)
+        ).all()
+        
+        if not rows:
+            return {}
+        
+        # Статусы всех метрик одним векторизованным вызовом
+        names = [row.metric for row in rows]
+        directions = health_thresholds.direction(names, [row.value for row in rows])
+        
+        latest = {}
+        for row, direction in zip(rows, directions):
+            known = health_thresholds.is_known(row.metric)
+            latest[row.metric] = {
+                "latest_value": row.value,
+                "unit": METRIC_UNITS.get(columns[row.metric]),
+                "recorded_at": row.recorded_at.isoformat() if row.recorded_at else None,
+                "status": DIRECTION_NAMES[int(direction)] if known else "unknown"
+            }
         
-        return organ_diseases.get(organ.name, [])
+        return latest
+    
+    def get_organ_diseases(self, organ_id: str) -> List[Dict[str, Any]]:
+        """Получить список заболеваний, связанных с органом"""
+        return self.get_catalog().get_diseases(organ_id)
     
     def get_organ_health_tips(self, organ_id: str) -> List[Dict[str, str]]:
         """Получить советы по здоровью для органа"""
-        organ = self.get_organ(organ_id)
-        if not organ:
-            return []
-        
-        # Предопределенные советы для каждого органа
-        organ_tips = {
-            "Сердце": [
-                {
-                    "category": "Питание",
-                    "tip": "Ограничьте потребление насыщенных жиров и трансжиров"
-                },
-                {
-                    "category": "Физическая активность",
-                    "tip": "Занимайтесь аэробными упражнениями минимум 150 минут в неделю"
-                },
-                {
-                    "category": "Образ жизни",
-                    "tip": "Избегайте курения и ограничьте употребление алкоголя"
-                },
-                {
-                    "category": "Стресс",
-                    "tip": "Практикуйте техники управления стрессом"
-                }
-            ],
-            "Легкие": [
-                {
-                    "category": "Воздух",
-                    "tip": "Избегайте загрязненного воздуха и курения"
-                },
-                {
-                    "category": "Дыхание",
-                    "tip": "Практикуйте глубокое дыхание и дыхательные упражнения"
-                },
-                {
-                    "category": "Инфекции",
-                    "tip": "Делайте прививки от гриппа и пневмонии"
-                }
-            ],
-            "Печень": [
-                {
-                    "category": "Алкоголь",
-                    "tip": "Ограничьте или исключите употребление алкоголя"
-                },
-                {
-                    "category": "Питание",
-                    "tip": "Поддерживайте здоровый вес и сбалансированную диету"
-                },
-                {
-                    "category": "Лекарства",
-                    "tip": "Будьте осторожны с лекарствами и добавками"
-                }
-            ],
-            "Почки": [
-                {
-                    "category": "Гидратация",
-                    "tip": "Пейте достаточно воды (8-10 стаканов в день)"
-                },
-                {
-                    "category": "Соль",
-                    "tip": "Ограничьте потребление натрия"
-                },
-                {
-                    "category": "Давление",
-                    "tip": "Контролируйте артериальное давление и уровень сахара"
-                }
-            ]
-        }
-        
-        return organ_tips.get(organ.name, [
-            {
-                "category": "Общее",
-                "tip": "Поддерживайте здоровый образ жизни"
-            }
-        ])
+        return self.get_catalog().get_health_tips(organ_id)
     
     def get_organ_statistics(self, organ_id: str) -> Dict[str, Any]:
-        """Получить статистику по органу"""
-        organ = self.get_organ(organ_id)
+        """
+        Получить статистику по органу.
+        
+        Счетчики показаний за 30 дней и скетчи пациентов ведутся по метрикам
+        при записи показаний и объединяются здесь, поэтому время ответа не
+        зависит от объема health_data. Количество пациентов - оценка HyperLogLog.
+        
+        metric_readings_last_month - число показаний связанных метрик (запись
+        health_data с пульсом и давлением дает два показания), а не число записей,
+        как в прежнем поле health_records_last_month.
+        """
+        organ = self.get_catalog().get(organ_id)
         if not organ:
             return None
         
-        # Количество связанных метрик
-        related_metrics_count = len(organ.related_metrics or [])
+        related_metrics = self._get_related_metrics(organ["name"])
+        columns = sorted({metric_key(metric) for metric in related_metrics} & set(HEALTH_METRICS))
         
-        # Количество записей о здоровье за последний месяц
-        month_ago = datetime.now() - timedelta(days=30)
-        health_records_count = 0
-        
-        if organ.related_metrics:
-            health_records_count = self.db.query(HealthData).filter(
-                and_(
-                    HealthData.metric.in_(organ.related_metrics),
-                    HealthData.recorded_at >= month_ago
-                )
-            ).count()
-        
-        # Количество пациентов с данными по этому органу
-        patients_with_data = 0
-        if organ.related_metrics:
-            patients_with_data = self.db.query(HealthData.patient_id).filter(
-                HealthData.metric.in_(organ.related_metrics)
-            ).distinct().count()
+        stats = HealthMetricStatsService(self.db)
         
         return {
             "organ_id": organ_id,
-            "organ_name": organ.name,
-            "related_metrics_count": related_metrics_count,
-            "health_records_last_month": health_records_count,
-            "patients_with_data": patients_with_data,
-            "created_at": organ.created_at.isoformat(),
-            "last_updated": organ.updated_at.isoformat()
+            "organ_name": organ["name"],
+            "related_metrics_count": len(related_metrics),
+            "metric_readings_last_month": stats.get_reading_count(columns, days=30),
+            "patients_with_data": stats.get_patient_count(columns),
+            "created_at": organ["created_at"],
+            "last_updated": organ["updated_at"]
         }
     
     def get_organ_interactions(self, organ_id: str) -> List[Dict[str, Any]]:
         """Получить информацию о взаимодействии органа с другими органами"""
-        organ = self.get_organ(organ_id)
-        if not organ:
-            return []
-        
-        # Предопределенные взаимодействия
-        organ_interactions = {
-            "Сердце": [
-                {
-                    "organ": "Легкие",
-                    "interaction": "Сердце перекачивает кровь через легкие для оксигенации",
-                    "type": "circulatory"
-                },
-                {
-                    "organ": "Почки",
-                    "interaction": "Сердце обеспечивает кровоснабжение почек для фильтрации",
-                    "type": "circulatory"
-                },
-                {
-                    "organ": "Мозг",
-                    "interaction": "Мозг регулирует сердечный ритм через нервную систему",
-                    "type": "nervous"
-                }
-            ],
-            "Легкие": [
-                {
-                    "organ": "Сердце",
-                    "interaction": "Легкие насыщают кровь кислородом для сердца",
-                    "type": "respiratory"
-                },
-                {
-                    "organ": "Мозг",
-                    "interaction": "Мозг контролирует дыхание через дыхательный центр",
-                    "type": "nervous"
-                }
-            ],
-            "Печень": [
-                {
-                    "organ": "Поджелудочная железа",
-                    "interaction": "Печень и поджелудочная железа работают вместе в пищеварении",
-                    "type": "digestive"
-                },
-                {
-                    "organ": "Почки",
-                    "interaction": "Печень и почки совместно очищают кровь от токсинов",
-                    "type": "detoxification"
-                }
-            ]
-        }
-        
-        return organ_interactions.get(organ.name, [])
+        return self.get_catalog().get_interactions(organ_id)
     
-    def _get_metric_status(self, metric: HealthMetric, value: float) -> str:
-        """Определить статус метрики"""
-        # Упрощенная логика определения статуса
-        normal_ranges = {
-            HealthMetric.heart_rate: (60, 100),
-            HealthMetric.blood_pressure_systolic: (90, 120),
-            HealthMetric.blood_pressure_diastolic: (60, 80),
-            HealthMetric.blood_sugar: (70, 100),
-            HealthMetric.cholesterol: (0, 200),
-            HealthMetric.bmi: (18.5, 24.9),
-            HealthMetric.oxygen_saturation: (95, 100),
-            HealthMetric.body_temperature: (36.1, 37.2)
-        }
-        
-        if metric in normal_ranges:
-            min_val, max_val = normal_ranges[metric]
-            if min_val <= value <= max_val:
-                return "normal"
-            elif value < min_val:
-                return "low"
-            else:
-                return "high"
-        
-        return "unknown"
+    def patient_exists(self, patient_id: str) -> bool:
+        """Проверить существование пациента"""
+        return self.db.query(Patient.id).filter(
+            and_(
+                Patient.id == patient_id,
+                Patient.is_active == True
+            )
+        ).first() is not None
     
     def _determine_organ_health_status(self, metrics_data: Dict[str, Any]) -> str:
         """Определить общий статус здоровья органа"""
@@ -514,4 +392,8 @@ class OrganService:
         if all(status == "normal" for status in statuses):
             return "healthy"
         
-        return "unknown"
\ No newline at end of file
+        return "unknown"
+
+
+# Связанные метрики по названию органа
+ORGAN_RELATED_METRICS = {organ["name"]: organ["related_metrics"] for organ in OrganService.DEFAULT_ORGANS}
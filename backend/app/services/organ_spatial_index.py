@@ -0,0 +1,105 @@
+from typing import List, Dict, Any, Iterable
+import math
+
+# Максимальное число дочерних элементов в узле R-дерева
+NODE_CAPACITY = 16
+
+
+class OrganRegion:
+    """Прямоугольная область органа на изображении (x, y - левый верхний угол)"""
+    
+    __slots__ = ("id", "name", "label", "min_x", "min_y", "max_x", "max_y")
+    
+    def __init__(self, id: str, name: str, label: str, x: float, y: float, width: float, height: float):
+        self.id = id
+        self.name = name
+        self.label = label
+        self.min_x = x
+        self.min_y = y
+        self.max_x = x + width
+        self.max_y = y + height
+    
+    @property
+    def area(self) -> float:
+        return (self.max_x - self.min_x) * (self.max_y - self.min_y)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "label": self.label,
+            "position_x": self.min_x,
+            "position_y": self.min_y,
+            "width": self.max_x - self.min_x,
+            "height": self.max_y - self.min_y
+        }
+
+
+class _Node:
+    __slots__ = ("min_x", "min_y", "max_x", "max_y", "children", "leaf")
+    
+    def __init__(self, children: List[Any], leaf: bool):
+        self.children = children
+        self.leaf = leaf
+        self.min_x = min(child.min_x for child in children)
+        self.min_y = min(child.min_y for child in children)
+        self.max_x = max(child.max_x for child in children)
+        self.max_y = max(child.max_y for child in children)
+
+
+class OrganSpatialIndex:
+    """
+    Неизменяемое R-дерево по прямоугольникам органов.
+    
+    Строится целиком методом Sort-Tile-Recursive: области сортируются по
+    центру X, режутся на вертикальные полосы, внутри полосы сортируются по
+    центру Y и упаковываются в узлы по NODE_CAPACITY. Поиск точки спускается
+    только в узлы, чей ограничивающий прямоугольник содержит точку, то есть
+    для непересекающихся областей стоит O(log n).
+    """
+    
+    def __init__(self, regions: Iterable[OrganRegion]):
+        self.regions = list(regions)
+        self.root = self._build(self.regions, leaf=True) if self.regions else None
+    
+    def __len__(self) -> int:
+        return len(self.regions)
+    
+    def _build(self, items: List[Any], leaf: bool) -> _Node:
+        """Упаковать уровень в узлы и рекурсивно построить уровни выше"""
+        if len(items) <= NODE_CAPACITY:
+            return _Node(items, leaf)
+        
+        node_count = math.ceil(len(items) / NODE_CAPACITY)
+        slice_count = math.ceil(math.sqrt(node_count))
+        slice_size = slice_count * NODE_CAPACITY
+        
+        items = sorted(items, key=lambda item: item.min_x + item.max_x)
+        
+        nodes = []
+        for start in range(0, len(items), slice_size):
+            vertical_slice = sorted(items[start:start + slice_size], key=lambda item: item.min_y + item.max_y)
+            for offset in range(0, len(vertical_slice), NODE_CAPACITY):
+                nodes.append(_Node(vertical_slice[offset:offset + NODE_CAPACITY], leaf))
+        
+        return self._build(nodes, leaf=False)
+    
+    def query_point(self, x: float, y: float) -> List[OrganRegion]:
+        """Области, содержащие точку; сначала самая мелкая (наиболее точная)"""
+        if self.root is None:
+            return []
+        
+        hits = []
+        stack = [self.root]
+        
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                if child.min_x <= x <= child.max_x and child.min_y <= y <= child.max_y:
+                    if node.leaf:
+                        hits.append(child)
+                    else:
+                        stack.append(child)
+        
+        hits.sort(key=lambda region: region.area)
+        return hits
@@ -0,0 +1,193 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple
+from datetime import datetime, date, timedelta
+import csv
+import io
+import json
+import zlib
+
+from app.database.database import SessionLocal
+from app.models.models import Patient, HealthData, Appointment, MedicalRecord
+
+# Строк в одной пачке курсора и в одном отправляемом фрагменте ответа
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = ("json", "ndjson", "csv")
+
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+# Разделы экспорта в порядке вывода
+EXPORT_SECTIONS = ("health_data", "appointments", "medical_records")
+
+# Колонки CSV: тип записи и объединение колонок всех таблиц (лишние остаются пустыми)
+CSV_COLUMNS = ["record_type"] + list(dict.fromkeys(
+    column.name
+    for model in (Patient, HealthData, Appointment, MedicalRecord)
+    for column in model.__table__.columns
+))
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return _serialize(value)
+
+
+class PatientExportService:
+    """
+    Потоковый экспорт данных пациента.
+    
+    Строки читаются курсором пачками по EXPORT_BATCH_SIZE (yield_per; на
+    PostgreSQL - серверный курсор) и сразу сериализуются во фрагменты ответа,
+    поэтому память не зависит от объема экспорта.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def iter_records(self, patient_id: str, date_from: date, date_to: date) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Записи экспорта (тип, значения колонок): пациент, затем разделы по времени"""
+        patient = self.db.query(*Patient.__table__.columns).filter(Patient.id == patient_id).first()
+        if patient is None:
+            return
+        yield "patient", dict(patient._mapping)
+        
+        start = datetime.combine(date_from, datetime.min.time())
+        end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        
+        sections = {
+            "health_data": self.db.query(*HealthData.__table__.columns).filter(
+                HealthData.patient_id == patient_id,
+                HealthData.recorded_at >= start,
+                HealthData.recorded_at < end
+            ).order_by(HealthData.recorded_at),
+            "appointments": self.db.query(*Appointment.__table__.columns).filter(
+                Appointment.patient_id == patient_id,
+                Appointment.date.between(date_from.isoformat(), date_to.isoformat())
+            ).order_by(Appointment.date, Appointment.time),
+            "medical_records": self.db.query(*MedicalRecord.__table__.columns).filter(
+                MedicalRecord.patient_id == patient_id,
+                MedicalRecord.date >= start,
+                MedicalRecord.date < end
+            ).order_by(MedicalRecord.date)
+        }
+        
+        for section in EXPORT_SECTIONS:
+            for row in sections[section].yield_per(EXPORT_BATCH_SIZE):
+                yield section, dict(row._mapping)
+    
+    def iter_ndjson(self, patient_id: str, date_from: date, date_to: date) -> Iterator[str]:
+        """NDJSON: одна запись на строку, тип записи - в поле record_type"""
+        lines = []
+        for record_type, values in self.iter_records(patient_id, date_from, date_to):
+            lines.append(json.dumps({"record_type": record_type, **values}, default=_serialize, ensure_ascii=False))
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        
+        if lines:
+            yield "\n".join(lines) + "\n"
+    
+    def iter_csv(self, patient_id: str, date_from: date, date_to: date) -> Iterator[str]:
+        """CSV с общим заголовком CSV_COLUMNS; тип записи - в колонке record_type"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        
+        rows = 0
+        for record_type, values in self.iter_records(patient_id, date_from, date_to):
+            values["record_type"] = record_type
+            writer.writerow([_csv_value(values.get(column)) for column in CSV_COLUMNS])
+            rows += 1
+            
+            if rows % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    def iter_json(self, patient_id: str, date_from: date, date_to: date) -> Iterator[str]:
+        """Один JSON-документ {"patient": ..., "period": ..., "health_data": [...], ...}, собираемый по частям"""
+        records = self.iter_records(patient_id, date_from, date_to)
+        patient = next(records, (None, None))[1]
+        period = {"from": date_from.isoformat(), "to": date_to.isoformat()}
+        
+        parts = [
+            '{"patient":', json.dumps(patient, default=_serialize, ensure_ascii=False),
+            ',"period":', json.dumps(period)
+        ]
+        
+        section = None
+        for record_type, values in records:
+            if record_type != section:
+                parts.append(self._open_sections(section, record_type))
+                section = record_type
+            else:
+                parts.append(",")
+            parts.append(json.dumps(values, default=_serialize, ensure_ascii=False))
+            
+            if len(parts) >= 2 * EXPORT_BATCH_SIZE:
+                yield "".join(parts)
+                parts = []
+        
+        parts.append(self._open_sections(section, None))
+        parts.append("}")
+        yield "".join(parts)
+    
+    def _open_sections(self, current: Optional[str], following: Optional[str]) -> str:
+        """Закрыть текущий раздел и открыть разделы до following (пустые разделы - пустыми списками)"""
+        start = EXPORT_SECTIONS.index(current) + 1 if current else 0
+        end = EXPORT_SECTIONS.index(following) if following else len(EXPORT_SECTIONS)
+        
+        text = "]" if current else ""
+        for name in EXPORT_SECTIONS[start:end]:
+            text += f',"{name}":[]'
+        if following:
+            text += f',"{following}":['
+        return text
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Сжимать фрагменты в gzip по мере генерации"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_patient_export(
+    patient_id: str,
+    format: str,
+    date_from: date,
+    date_to: date,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Поток экспорта для StreamingResponse. Сессия живет, пока читается ответ,
+    поэтому открывается здесь, а не берется из зависимости запроса.
+    """
+    db = SessionLocal()
+    try:
+        service = PatientExportService(db)
+        chunks = getattr(service, f"iter_{format}")(patient_id, date_from, date_to)
+        
+        if compress:
+            yield from gzip_chunks(chunks)
+        else:
+            for chunk in chunks:
+                yield chunk.encode("utf-8")
+    finally:
+        db.close()
@@ -1,22 +1,32 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, func, literal_column, select, table, column
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
 
+from app.core.cache import invalidate_dashboard
+from app.core.pagination import Page, keyset_paginate
 from app.models.models import Patient, MedicalRecord, Appointment, HealthData
 from app.schemas.schemas import PatientCreate, PatientUpdate
 
+# Таблица FTS5 поиска пациентов (SQLite, см. app/database/patient_search.py)
+PATIENTS_FTS = table("patients_fts", column("patient_id"), column("rank"))
+
+# Минимальная длина запроса для триграммного индекса
+SEARCH_MIN_LENGTH = 3
+
+# Сколько совпадений FTS5 ранжируется по релевантности
+SEARCH_RANK_CANDIDATES = 1000
+
 
 class PatientService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_patients(self, skip: int = 0, limit: int = 100) -> List[Patient]:
-        """Получить список всех пациентов"""
-        return self.db.query(Patient).filter(
-            Patient.is_deleted == False
-        ).offset(skip).limit(limit).all()
+    def get_patients(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> Page:
+        """Получить список пациентов по фамилии (keyset-пагинация по курсору)"""
+        query = self.db.query(Patient).filter(Patient.is_active == True)
+        return keyset_paginate(query, [Patient.last_name, Patient.id], limit, cursor, skip)
     
     def get_patient(self, patient_id: str) -> Optional[Patient]:
         """Получить пациента по ID"""
@@ -37,17 +47,61 @@ class PatientService:
         ).first()
     
     def search_patients(self, query: str, skip: int = 0, limit: int = 100) -> List[Patient]:
-        """Поиск пациентов по имени, фамилии или email"""
+        """
+        Поиск пациентов по имени, фамилии или email (по подстроке), по убыванию релевантности.
+        
+        Используется триграммный индекс: FTS5 на SQLite, pg_trgm на PostgreSQL.
+        Запросы короче трех символов индекс не обслуживает - для них поиск по префиксу.
+        """
+        query = query.strip()
+        dialect = self.db.get_bind().dialect.name
+        
+        if len(query) < SEARCH_MIN_LENGTH or dialect not in ("sqlite", "postgresql"):
+            return self._search_patients_by_prefix(query, skip, limit)
+        
+        patients = self.db.query(Patient).filter(Patient.is_active == True)
+        
+        if dialect == "sqlite":
+            # Запрос FTS5 - слова в кавычках (подстроки, все должны встретиться).
+            # Кандидаты - не более SEARCH_RANK_CANDIDATES лучших по bm25 активных
+            # пациентов: сортировка и фильтр выполняются до LIMIT, поэтому срез
+            # не зависит от порядка строк индекса
+            terms = [word for word in query.split() if len(word) >= SEARCH_MIN_LENGTH]
+            match = " ".join('"' + word.replace('"', '""') + '"' for word in terms or [query])
+            candidates = select(PATIENTS_FTS.c.patient_id, PATIENTS_FTS.c.rank).join(
+                Patient, Patient.id == PATIENTS_FTS.c.patient_id
+            ).where(
+                and_(
+                    literal_column("patients_fts").op("MATCH")(match),
+                    Patient.is_active == True
+                )
+            ).order_by(PATIENTS_FTS.c.rank).limit(max(SEARCH_RANK_CANDIDATES, skip + limit)).subquery()
+            
+            patients = patients.join(
+                candidates, candidates.c.patient_id == Patient.id
+            ).order_by(candidates.c.rank)
+        else:
+            # Выражение совпадает с индексом ix_patients_search_trgm
+            document = Patient.first_name.op("||")(literal_column("' '")).op("||")(Patient.last_name) \
+                .op("||")(literal_column("' '")).op("||")(Patient.email)
+            patients = patients.filter(
+                document.ilike(f"%{query}%")
+            ).order_by(func.word_similarity(query, document).desc())
+        
+        return patients.offset(skip).limit(limit).all()
+    
+    def _search_patients_by_prefix(self, query: str, skip: int, limit: int) -> List[Patient]:
+        """Поиск по началу имени, фамилии или email"""
         search_filter = or_(
-            Patient.first_name.ilike(f"%{query}%"),
-            Patient.last_name.ilike(f"%{query}%"),
-            Patient.email.ilike(f"%{query}%")
+            Patient.first_name.ilike(f"{query}%"),
+            Patient.last_name.ilike(f"{query}%"),
+            Patient.email.ilike(f"{query}%")
         )
         
         return self.db.query(Patient).filter(
             and_(
                 search_filter,
-                Patient.is_deleted == False
+                Patient.is_active == True
             )
         ).offset(skip).limit(limit).all()
     
@@ -72,6 +126,7 @@ class PatientService:
         
         self.db.add(patient)
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(patient)
         return patient
     
@@ -89,6 +144,7 @@ class PatientService:
         patient.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
         self.db.refresh(patient)
         return patient
     
@@ -102,6 +158,7 @@ class PatientService:
         patient.updated_at = datetime.utcnow()
         
         self.db.commit()
+        invalidate_dashboard()
         return True
     
     def get_patient_medical_history(self, patient_id: str) -> List[MedicalRecord]:
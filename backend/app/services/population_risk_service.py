@@ -0,0 +1,242 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, select, union_all, literal, cast, func, Float, text
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+import numpy as np
+
+from app.core.config import settings
+from app.core.scheduler import PeriodicJob
+from app.database.database import SessionLocal
+from app.models.models import HealthData, Patient, PatientRiskScore
+from app.services.health_rollup_service import HEALTH_METRICS
+from app.services.health_thresholds import (
+    health_thresholds, STATUS_BORDERLINE, STATUS_WARNING, STATUS_CRITICAL
+)
+
+# Уровни риска от высокого к минимальному и минимальный балл каждого уровня
+RISK_LEVELS = ["high", "medium", "low", "minimal"]
+RISK_LEVEL_MIN_SCORES = [6, 3, 1, 0]
+
+# Баллы за критическое значение и за пограничное или вне нормы
+CRITICAL_POINTS = 3
+WARNING_POINTS = 1
+
+# Метрики health_data, для которых заданы пороги
+SCORED_METRICS = [metric for metric in HEALTH_METRICS if metric in health_thresholds.index]
+
+# Строк в одной пачке вставки материализованной таблицы
+REFRESH_BATCH_SIZE = 5000
+
+# Ключ advisory-блокировки PostgreSQL: пересчет выполняет один процесс за раз
+REFRESH_LOCK_KEY = 7310025
+
+
+class PopulationRiskService:
+    """
+    Оценка рисков пациентов пачкой.
+    
+    Последние значения каждой метрики всех пациентов загружаются одним
+    оконным запросом, статусы и баллы считаются векторно по массивам NumPy.
+    Результат хранится в patient_risk_scores и периодически пересчитывается,
+    поэтому список пациентов с высоким риском - один запрос по индексу.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def assess(self, patient_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Оценки риска активных пациентов (или только patient_ids) по последним показателям"""
+        rows = self._load_latest_readings(patient_ids)
+        if not rows:
+            return []
+        
+        patients = np.array([row.patient_id for row in rows], dtype=object)
+        metrics = np.array([row.metric for row in rows], dtype=str)
+        values = np.array([row.value for row in rows], dtype=float)
+        
+        codes = health_thresholds.classify(metrics, values)
+        points = np.where(
+            codes == STATUS_CRITICAL,
+            CRITICAL_POINTS,
+            np.where((codes == STATUS_BORDERLINE) | (codes == STATUS_WARNING), WARNING_POINTS, 0)
+        )
+        
+        # Баллы пациента - сумма баллов его строк
+        patient_index, first_rows, inverse = np.unique(patients, return_index=True, return_inverse=True)
+        scores = np.bincount(inverse, weights=points, minlength=len(patient_index)).astype(int)
+        levels = np.select(
+            [scores >= min_score for min_score in RISK_LEVEL_MIN_SCORES[:-1]],
+            RISK_LEVELS[:-1],
+            RISK_LEVELS[-1]
+        )
+        
+        # Факторы риска строятся только для строк вне нормы
+        factors: List[List[Dict[str, Any]]] = [[] for _ in patient_index]
+        for position in np.flatnonzero(points):
+            critical = codes[position] == STATUS_CRITICAL
+            metric = str(metrics[position])
+            value = float(values[position])
+            factors[inverse[position]].append({
+                "metric": metric,
+                "value": value,
+                "severity": "high" if critical else "medium",
+                "description": f"{'Критическое' if critical else 'Пограничное'} значение {metric}: {value}"
+            })
+        
+        return [
+            {
+                "patient_id": patient_id,
+                "risk_score": int(score),
+                "risk_level": str(level),
+                "risk_factors": sorted(patient_factors, key=lambda factor: factor["severity"] != "high"),
+                "last_recorded_at": rows[first_row].last_recorded_at
+            }
+            for patient_id, score, level, patient_factors, first_row in zip(
+                patient_index, scores, levels, factors, first_rows
+            )
+        ]
+    
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Пересчитать patient_risk_scores целиком в одной транзакции.
+        
+        На PostgreSQL транзакция сначала берет advisory-блокировку: если пересчет
+        уже идет в другом воркере или процессе, этот запуск пропускается.
+        """
+        if not self._try_refresh_lock():
+            return {"patients": 0, "distribution": {}, "computed_at": None, "skipped": True}
+        
+        assessments = self.assess()
+        computed_at = datetime.utcnow()
+        
+        self.db.query(PatientRiskScore).delete(synchronize_session=False)
+        
+        for start in range(0, len(assessments), REFRESH_BATCH_SIZE):
+            batch = assessments[start:start + REFRESH_BATCH_SIZE]
+            self.db.execute(
+                PatientRiskScore.__table__.insert(),
+                [{**assessment, "computed_at": computed_at} for assessment in batch]
+            )
+        
+        self.db.commit()
+        
+        distribution = {level: 0 for level in RISK_LEVELS}
+        for assessment in assessments:
+            distribution[assessment["risk_level"]] += 1
+        
+        return {"patients": len(assessments), "distribution": distribution, "computed_at": computed_at.isoformat()}
+    
+    def get_computed_at(self) -> Optional[datetime]:
+        """Время последнего пересчета; None - таблица еще не рассчитана"""
+        return self.db.query(func.max(PatientRiskScore.computed_at)).scalar()
+    
+    def get_top_risk(self, risk_level: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Активные пациенты с наибольшим баллом риска из материализованной таблицы"""
+        # Пациент мог быть деактивирован после последнего пересчета
+        query = self.db.query(
+            PatientRiskScore,
+            Patient.first_name,
+            Patient.last_name
+        ).join(
+            Patient, Patient.id == PatientRiskScore.patient_id
+        ).filter(
+            Patient.is_active == True
+        )
+        
+        if risk_level:
+            query = query.filter(PatientRiskScore.risk_level == risk_level)
+        
+        rows = query.order_by(
+            PatientRiskScore.risk_score.desc(),
+            PatientRiskScore.patient_id
+        ).limit(limit).all()
+        
+        return [
+            {
+                "patient_id": score.patient_id,
+                "patient_name": f"{first_name} {last_name}",
+                "risk_level": score.risk_level,
+                "risk_score": score.risk_score,
+                "risk_factors": score.risk_factors or [],
+                "last_recorded_at": score.last_recorded_at.isoformat() if score.last_recorded_at else None,
+                "assessment_date": score.computed_at.isoformat()
+            }
+            for score, first_name, last_name in rows
+        ]
+    
+    def _try_refresh_lock(self) -> bool:
+        """Advisory-блокировка пересчета до конца транзакции (только PostgreSQL)"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return True
+        return bool(self.db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY}
+        ).scalar())
+    
+    def _load_latest_readings(self, patient_ids: Optional[List[str]]) -> List[Any]:
+        """
+        Последнее значение каждой (пациент, метрика) за период population_risk_lookback_days.
+        
+        Колонки показателей разворачиваются в строки через UNION ALL,
+        ROW_NUMBER() по (пациент, метрика) оставляет самую свежую строку,
+        а MAX() по пациенту дает время последнего показания.
+        """
+        since = datetime.utcnow() - timedelta(days=settings.population_risk_lookback_days)
+        
+        def readings_of(metric: str):
+            column = getattr(HealthData, metric)
+            conditions = [HealthData.recorded_at >= since, column.isnot(None)]
+            if patient_ids is not None:
+                conditions.append(HealthData.patient_id.in_(patient_ids))
+            return select(
+                HealthData.patient_id.label("patient_id"),
+                literal(metric).label("metric"),
+                cast(column, Float).label("value"),
+                HealthData.recorded_at.label("recorded_at")
+            ).where(and_(*conditions))
+        
+        readings = union_all(*[readings_of(metric) for metric in SCORED_METRICS]).subquery()
+        
+        ranked = select(
+            readings.c.patient_id,
+            readings.c.metric,
+            readings.c.value,
+            func.row_number().over(
+                partition_by=[readings.c.patient_id, readings.c.metric],
+                order_by=readings.c.recorded_at.desc()
+            ).label("position"),
+            func.max(readings.c.recorded_at).over(
+                partition_by=readings.c.patient_id
+            ).label("last_recorded_at")
+        ).subquery()
+        
+        return self.db.execute(
+            select(
+                ranked.c.patient_id,
+                ranked.c.metric,
+                ranked.c.value,
+                ranked.c.last_recorded_at
+            ).join(
+                Patient, Patient.id == ranked.c.patient_id
+            ).where(
+                and_(
+                    ranked.c.position == 1,
+                    Patient.is_active == True
+                )
+            )
+        ).all()
+
+
+def run_population_risk_refresh() -> Dict[str, Any]:
+    """Один пересчет в отдельной сессии (для планировщика и командной строки)"""
+    db = SessionLocal()
+    try:
+        return PopulationRiskService(db).refresh()
+    finally:
+        db.close()
+
+
+population_risk_scheduler = PeriodicJob(
+    run_population_risk_refresh,
+    settings.population_risk_refresh_interval_seconds,
+    "пересчета оценок риска пациентов"
+)
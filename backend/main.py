@@ -1,14 +1,37 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 import uvicorn
 
 from app.api.v1.api import api_router
 from app.core.config import settings
-from app.database.database import engine, Base
+from app.database.database import run_migrations
+from app.services.appointment_reminder_service import reminder_scheduler
+from app.services.doctor_search_index import load_doctor_search_index
+from app.services.organ_catalog import load_organ_catalog
+from app.services.population_risk_service import population_risk_scheduler
+
+# Применение миграций базы данных
+run_migrations()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Снимок справочника органов
+    load_organ_catalog()
+    # Поисковый индекс справочника врачей
+    load_doctor_search_index()
+    # Планировщик напоминаний о приеме
+    if settings.appointment_reminders_enabled:
+        reminder_scheduler.start()
+    # Периодический пересчет оценок риска пациентов
+    if settings.population_risk_enabled:
+        population_risk_scheduler.start()
+    yield
+    await reminder_scheduler.stop()
+    await population_risk_scheduler.stop()
 
-# Создание таблиц в базе данных
-Base.metadata.create_all(bind=engine)
 
 # Создание экземпляра FastAPI
 app = FastAPI(
@@ -17,7 +40,8 @@ app = FastAPI(
     version="1.0.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -33,6 +57,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Курсор следующей страницы списков
 )
 
 # Подключение API роутеров
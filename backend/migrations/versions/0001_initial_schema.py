@@ -0,0 +1,175 @@
+"""Начальная схема базы данных
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "patients",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("first_name", sa.String(100), nullable=False),
+        sa.Column("last_name", sa.String(100), nullable=False),
+        sa.Column("date_of_birth", sa.String(10), nullable=False),
+        sa.Column("gender", sa.String(10), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone", sa.String(20), nullable=False),
+        sa.Column("address", sa.Text()),
+        sa.Column("emergency_contact_name", sa.String(200)),
+        sa.Column("emergency_contact_phone", sa.String(20)),
+        sa.Column("emergency_contact_relationship", sa.String(50)),
+        sa.Column("allergies", sa.JSON()),
+        sa.Column("blood_type", sa.String(5)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("is_active", sa.Boolean()),
+    )
+
+    op.create_table(
+        "doctors",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("first_name", sa.String(100), nullable=False),
+        sa.Column("last_name", sa.String(100), nullable=False),
+        sa.Column("specialization", sa.String(100), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("phone", sa.String(20), nullable=False),
+        sa.Column("license_number", sa.String(50), nullable=False, unique=True),
+        sa.Column("experience", sa.Integer()),
+        sa.Column("rating", sa.Float()),
+        sa.Column("avatar", sa.String(500)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("is_active", sa.Boolean()),
+    )
+
+    op.create_table(
+        "organs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("label", sa.String(100), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("position_x", sa.Float(), nullable=False),
+        sa.Column("position_y", sa.Float(), nullable=False),
+        sa.Column("width", sa.Float(), nullable=False),
+        sa.Column("height", sa.Float(), nullable=False),
+        sa.Column("normal_function", sa.Text()),
+        sa.Column("common_diseases", sa.JSON()),
+        sa.Column("health_tips", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("is_active", sa.Boolean()),
+    )
+
+    op.create_table(
+        "medications",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("generic_name", sa.String(200)),
+        sa.Column("dosage_form", sa.String(50)),
+        sa.Column("strength", sa.String(50)),
+        sa.Column("manufacturer", sa.String(200)),
+        sa.Column("instructions", sa.Text()),
+        sa.Column("side_effects", sa.JSON()),
+        sa.Column("contraindications", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("is_active", sa.Boolean()),
+    )
+
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("type", sa.String(20), nullable=False),
+        sa.Column("recipient_id", sa.String(), nullable=False),
+        sa.Column("recipient_type", sa.String(20), nullable=False),
+        sa.Column("is_read", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("read_at", sa.DateTime(timezone=True)),
+    )
+
+    op.create_table(
+        "medical_records",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("doctor_id", sa.String(), sa.ForeignKey("doctors.id"), nullable=False),
+        sa.Column("date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("diagnosis", sa.Text(), nullable=False),
+        sa.Column("symptoms", sa.JSON()),
+        sa.Column("treatment", sa.Text()),
+        sa.Column("medications", sa.JSON()),
+        sa.Column("follow_up", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+
+    op.create_table(
+        "appointments",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("doctor_id", sa.String(), sa.ForeignKey("doctors.id"), nullable=False),
+        sa.Column("date", sa.String(10), nullable=False),
+        sa.Column("time", sa.String(5), nullable=False),
+        sa.Column("duration", sa.Integer()),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("status", sa.String(20)),
+        sa.Column("notes", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+
+    op.create_table(
+        "health_data",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("heart_rate", sa.Integer()),
+        sa.Column("blood_pressure_systolic", sa.Integer()),
+        sa.Column("blood_pressure_diastolic", sa.Integer()),
+        sa.Column("temperature", sa.Float()),
+        sa.Column("oxygen_saturation", sa.Integer()),
+        sa.Column("weight", sa.Float()),
+        sa.Column("height", sa.Float()),
+        sa.Column("bmi", sa.Float()),
+        sa.Column("recorded_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "research_items",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("status", sa.String(20)),
+        sa.Column("date_ordered", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("date_completed", sa.DateTime(timezone=True)),
+        sa.Column("results", sa.Text()),
+        sa.Column("file_url", sa.String(500)),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("research_items")
+    op.drop_table("health_data")
+    op.drop_table("appointments")
+    op.drop_table("medical_records")
+    op.drop_table("notifications")
+    op.drop_table("medications")
+    op.drop_table("organs")
+    op.drop_table("doctors")
+    op.drop_table("patients")
@@ -0,0 +1,62 @@
+"""Составные индексы для частых фильтров
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Расписание врача, слоты и статистика: doctor_id + date (+ time, status);
+    # duration включен в индекс на PostgreSQL, чтобы запрос слотов не читал таблицу
+    op.create_index(
+        "ix_appointments_doctor_date_time_status",
+        "appointments",
+        ["doctor_id", "date", "time", "status"],
+        postgresql_include=["duration"]
+    )
+
+    # Назначения пациента по дате
+    op.create_index(
+        "ix_appointments_patient_date",
+        "appointments",
+        ["patient_id", "date"]
+    )
+
+    # История и последние показатели пациента
+    op.create_index(
+        "ix_health_data_patient_recorded_at",
+        "health_data",
+        ["patient_id", "recorded_at"]
+    )
+
+    # Непрочитанные уведомления получателя в порядке создания
+    op.create_index(
+        "ix_notifications_recipient_read_created",
+        "notifications",
+        ["recipient_id", "is_read", "created_at"]
+    )
+
+    # Медицинская история пациента
+    op.create_index(
+        "ix_medical_records_patient_date",
+        "medical_records",
+        ["patient_id", "date"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_medical_records_patient_date", table_name="medical_records")
+    op.drop_index("ix_notifications_recipient_read_created", table_name="notifications")
+    op.drop_index("ix_health_data_patient_recorded_at", table_name="health_data")
+    op.drop_index("ix_appointments_patient_date", table_name="appointments")
+    op.drop_index("ix_appointments_doctor_date_time_status", table_name="appointments")
@@ -0,0 +1,34 @@
+"""Дневные агрегаты показателей здоровья
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "health_daily_rollup",
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), primary_key=True),
+        sa.Column("metric", sa.String(50), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("sum", sa.Float(), nullable=False),
+        sa.Column("sum_sq", sa.Float(), nullable=False),
+        sa.Column("min_value", sa.Float()),
+        sa.Column("max_value", sa.Float()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("health_daily_rollup")
@@ -0,0 +1,28 @@
+"""Приоритет уведомлений
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.add_column(
+            sa.Column("priority", sa.String(20), server_default="medium")
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("notifications") as batch_op:
+        batch_op.drop_column("priority")
@@ -0,0 +1,36 @@
+"""Счетчики непрочитанных уведомлений по получателю
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notification_unread_counters",
+        sa.Column("recipient_id", sa.String(), primary_key=True),
+        sa.Column("unread_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+    # Начальные значения по уже существующим уведомлениям
+    op.execute(
+        "INSERT INTO notification_unread_counters (recipient_id, unread_count) "
+        "SELECT recipient_id, COUNT(*) FROM notifications "
+        "WHERE is_read = false GROUP BY recipient_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("notification_unread_counters")
@@ -0,0 +1,38 @@
+"""Учет отправленных напоминаний о приеме
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Выборка назначений, попадающих в окно напоминаний
+    op.create_index(
+        "ix_appointments_date_time",
+        "appointments",
+        ["date", "time"]
+    )
+
+    op.create_table(
+        "appointment_reminders",
+        sa.Column("appointment_id", sa.String(), sa.ForeignKey("appointments.id"), primary_key=True),
+        sa.Column("hours_before", sa.Integer(), primary_key=True),
+        sa.Column("notification_id", sa.String(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("appointment_reminders")
+    op.drop_index("ix_appointments_date_time", table_name="appointments")
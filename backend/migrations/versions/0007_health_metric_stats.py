@@ -0,0 +1,38 @@
+"""Дневные счетчики показаний и скетчи пациентов по метрикам здоровья
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:06
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "health_metric_daily_counts",
+        sa.Column("metric", sa.String(50), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        "health_metric_sketch_registers",
+        sa.Column("metric", sa.String(50), primary_key=True),
+        sa.Column("register", sa.Integer(), primary_key=True),
+        sa.Column("rank", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("health_metric_sketch_registers")
+    op.drop_table("health_metric_daily_counts")
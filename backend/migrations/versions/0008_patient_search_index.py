@@ -0,0 +1,55 @@
+"""Полнотекстовый индекс поиска пациентов
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:07
+
+На SQLite - таблица FTS5 с триграммным токенизатором и patients.id,
+синхронизируемая триггерами (см. app/database/patient_search.py).
+На PostgreSQL - GIN-индекс pg_trgm по строке "имя фамилия email",
+который обслуживает ILIKE '%q%'.
+"""
+from alembic import op
+
+from app.database.patient_search import (
+    PATIENT_SEARCH_TABLE,
+    create_patient_search_triggers,
+    drop_patient_search_triggers,
+    rebuild_patient_search_index
+)
+
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        op.execute(PATIENT_SEARCH_TABLE)
+
+        # Триггеры поддерживают индекс при любой записи в patients
+        create_patient_search_triggers(op.execute)
+        rebuild_patient_search_index(op.execute)
+
+    elif dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX ix_patients_search_trgm ON patients USING gin "
+            "((first_name || ' ' || last_name || ' ' || email) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        drop_patient_search_triggers(op.execute)
+        op.execute("DROP TABLE IF EXISTS patients_fts")
+
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_patients_search_trgm")
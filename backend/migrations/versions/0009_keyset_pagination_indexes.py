@@ -0,0 +1,30 @@
+"""Индексы keyset-пагинации списков
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:08
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Ключ сортировки списка + id: страница по курсору - диапазон по индексу
+    op.create_index("ix_patients_last_name_id", "patients", ["last_name", "id"])
+    op.create_index("ix_doctors_last_name_id", "doctors", ["last_name", "id"])
+    op.create_index("ix_appointments_date_id", "appointments", ["date", "id"])
+    op.create_index("ix_notifications_created_id", "notifications", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_created_id", table_name="notifications")
+    op.drop_index("ix_appointments_date_id", table_name="appointments")
+    op.drop_index("ix_doctors_last_name_id", table_name="doctors")
+    op.drop_index("ix_patients_last_name_id", table_name="patients")
@@ -0,0 +1,38 @@
+"""Материализованные оценки риска пациентов
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:09
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "patient_risk_scores",
+        sa.Column("patient_id", sa.String(), sa.ForeignKey("patients.id"), primary_key=True),
+        sa.Column("risk_score", sa.Integer(), nullable=False),
+        sa.Column("risk_level", sa.String(20), nullable=False),
+        sa.Column("risk_factors", sa.JSON()),
+        sa.Column("last_recorded_at", sa.DateTime(timezone=True)),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    # Список пациентов с наибольшим риском (в целом и по уровню риска)
+    op.create_index("ix_patient_risk_scores_score", "patient_risk_scores", ["risk_score"])
+    op.create_index("ix_patient_risk_scores_level_score", "patient_risk_scores", ["risk_level", "risk_score"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_patient_risk_scores_level_score", table_name="patient_risk_scores")
+    op.drop_index("ix_patient_risk_scores_score", table_name="patient_risk_scores")
+    op.drop_table("patient_risk_scores")
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+import pytest
+
+# Тесты работают с отдельной временной базой SQLite: переменные окружения
+# задаются до импорта app, так как движок создается при импорте настроек
+_database_dir = tempfile.mkdtemp(prefix="medit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ["DEBUG"] = "false"
+
+from app.database.database import SessionLocal, run_migrations  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Схема тестовой базы по миграциям Alembic"""
+    run_migrations()
+    yield
+
+
+@pytest.fixture
+def db():
+    """Сессия тестовой базы; строки, созданные тестом, удаляет сам тест"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
@@ -0,0 +1,56 @@
+from datetime import datetime
+import uuid
+
+from app.models.models import Appointment, AppointmentReminder, Notification, NotificationUnreadCounter
+from app.services.appointment_reminder_service import AppointmentReminderService
+
+
+def test_already_reminded_appointment_does_not_abandon_batch(db):
+    """Напоминание об одном назначении уже записал другой процесс: остальные из пачки отправляются"""
+    now = datetime(2099, 3, 1, 9, 0)
+    patient_id = str(uuid.uuid4())
+    appointment_ids = [str(uuid.uuid4()) for _ in range(3)]
+    db.execute(
+        Appointment.__table__.insert(),
+        [
+            {
+                "id": appointment_id,
+                "patient_id": patient_id,
+                "doctor_id": str(uuid.uuid4()),
+                "date": "2099-03-01",
+                "time": f"1{index}:00",
+                "duration": 30,
+                "type": "consultation",
+                "status": "scheduled"
+            }
+            for index, appointment_id in enumerate(appointment_ids)
+        ]
+    )
+    db.commit()
+    
+    service = AppointmentReminderService(db)
+    try:
+        appointments = service.get_due_appointments(now, 24, 10)
+        assert [appointment.id for appointment in appointments] == appointment_ids
+        
+        # Параллельная рассылка успела записать напоминание о втором назначении
+        db.add(AppointmentReminder(appointment_id=appointment_ids[1], hours_before=24, notification_id=str(uuid.uuid4())))
+        db.commit()
+        
+        assert service._send_batch(appointments, 24) == 2
+        db.commit()
+        
+        sent = db.query(Notification).filter(Notification.recipient_id == patient_id).count()
+        assert sent == 2
+        assert service.counters.get_unread_count(patient_id) == 2
+        assert service.dispatch_due_reminders(now, 24)["sent"] == 0
+    finally:
+        db.query(AppointmentReminder).filter(
+            AppointmentReminder.appointment_id.in_(appointment_ids)
+        ).delete(synchronize_session=False)
+        db.query(Appointment).filter(Appointment.id.in_(appointment_ids)).delete(synchronize_session=False)
+        db.query(Notification).filter(Notification.recipient_id == patient_id).delete(synchronize_session=False)
+        db.query(NotificationUnreadCounter).filter(
+            NotificationUnreadCounter.recipient_id == patient_id
+        ).delete(synchronize_session=False)
+        db.commit()
@@ -0,0 +1,36 @@
+from datetime import date, time
+import uuid
+
+from app.models.models import Appointment
+from app.services.appointment_service import AppointmentService
+
+
+def test_time_slot_taken_respects_duration(db):
+    doctor_id = str(uuid.uuid4())
+    appointment_id = str(uuid.uuid4())
+    db.add(Appointment(
+        id=appointment_id,
+        patient_id=str(uuid.uuid4()),
+        doctor_id=doctor_id,
+        date="2099-03-01",
+        time="10:00",
+        duration=60,
+        type="consultation",
+        status="scheduled"
+    ))
+    db.commit()
+    
+    service = AppointmentService(db)
+    day = date(2099, 3, 1)
+    try:
+        assert service.is_time_slot_taken(doctor_id, day, time(10, 15))
+        assert service.is_time_slot_taken(doctor_id, day, time(9, 45))
+        assert not service.is_time_slot_taken(doctor_id, day, time(9, 30))
+        assert not service.is_time_slot_taken(doctor_id, day, time(11, 0))
+        assert service.is_time_slot_taken(doctor_id, day, time(9, 0), duration=90)
+        
+        # Перенос самого назначения не конфликтует с ним же
+        assert not service.is_time_slot_taken(doctor_id, day, time(10, 15), appointment_id)
+    finally:
+        db.query(Appointment).filter(Appointment.id == appointment_id).delete(synchronize_session=False)
+        db.commit()
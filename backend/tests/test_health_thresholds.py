@@ -0,0 +1,35 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.health_service import HealthService
+from app.services.health_thresholds import (
+    health_thresholds, STATUS_NORMAL, STATUS_BORDERLINE, STATUS_WARNING, STATUS_CRITICAL
+)
+
+
+def test_heart_rate_bands_are_disjoint():
+    codes = health_thresholds.classify("heart_rate", [80, 105, 120, 149, 151, 45, 39])
+    
+    assert codes.tolist() == [
+        STATUS_NORMAL, STATUS_BORDERLINE, STATUS_WARNING, STATUS_WARNING,
+        STATUS_CRITICAL, STATUS_WARNING, STATUS_CRITICAL
+    ]
+
+
+def test_default_critical_ranges_are_kept():
+    assert health_thresholds.critical_ranges["heart_rate"] == {"min": 40, "max": 150}
+
+
+def test_health_service_treats_borderline_outside_normal_as_warning():
+    service = HealthService(None)
+    reading = SimpleNamespace(
+        patient_id="patient", recorded_at=datetime(2026, 10, 18), heart_rate=108,
+        blood_pressure_systolic=135, blood_pressure_diastolic=None, temperature=None,
+        oxygen_saturation=None
+    )
+    
+    assert service._get_metric_status(105, "heart_rate") == "warning"
+    assert service._get_metric_status(135, "blood_pressure_systolic") == "normal"
+    assert [(alert["metric"], alert["severity"]) for alert in service._collect_alerts([reading])] == [
+        ("heart_rate", "warning")
+    ]
@@ -0,0 +1,81 @@
+import uuid
+
+from app.models.models import Notification, NotificationUnreadCounter
+from app.schemas.schemas import NotificationUpdate
+from app.services.notification_counter_service import NotificationCounterService
+from app.services.notification_service import NotificationService
+
+
+def _add_notifications(db, recipient_id, count):
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    db.execute(
+        Notification.__table__.insert(),
+        [
+            {
+                "id": notification_id,
+                "title": "Тест",
+                "message": "Тест",
+                "type": "info",
+                "recipient_id": recipient_id,
+                "recipient_type": "patient",
+                "is_read": False
+            }
+            for notification_id in ids
+        ]
+    )
+    db.commit()
+    return ids
+
+
+def _cleanup(db, *recipient_ids):
+    db.query(Notification).filter(Notification.recipient_id.in_(recipient_ids)).delete(synchronize_session=False)
+    db.query(NotificationUnreadCounter).filter(
+        NotificationUnreadCounter.recipient_id.in_(recipient_ids)
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def test_reconcile_recounts_drifted_and_missing_counters(db):
+    drifted, missing = str(uuid.uuid4()), str(uuid.uuid4())
+    _add_notifications(db, drifted, 2)
+    _add_notifications(db, missing, 1)
+    counters = NotificationCounterService(db)
+    counters.add({drifted: 5})
+    db.commit()
+    
+    try:
+        drift = counters.reconcile(drifted)
+        drift += counters.reconcile(missing)
+        db.commit()
+        
+        assert sorted((item["recipient_id"], item["stored"], item["actual"]) for item in drift) == sorted([
+            (drifted, 5, 2),
+            (missing, None, 1),
+        ])
+        assert counters.get_unread_count(drifted) == 2
+        assert counters.get_unread_count(missing) == 1
+        assert counters.reconcile(drifted, repair=False) == []
+    finally:
+        _cleanup(db, drifted, missing)
+
+
+def test_read_status_change_and_delete_adjust_counter_once(db):
+    recipient_id = str(uuid.uuid4())
+    first, second = _add_notifications(db, recipient_id, 2)
+    service = NotificationService(db)
+    service.counters.add({recipient_id: 2})
+    db.commit()
+    
+    try:
+        service.update_notification(first, NotificationUpdate(is_read=True, title="Прочитано"))
+        service.update_notification(first, NotificationUpdate(is_read=True))
+        assert service.counters.get_unread_count(recipient_id) == 1
+        
+        # Удаление прочитанного счетчик не меняет, непрочитанного - уменьшает
+        assert service.delete_notification(first)
+        assert service.counters.get_unread_count(recipient_id) == 1
+        assert service.delete_notification(second)
+        assert service.counters.get_unread_count(recipient_id) == 0
+        assert not service.delete_notification(second)
+    finally:
+        _cleanup(db, recipient_id)
@@ -0,0 +1,123 @@
+from sqlalchemy.dialects.postgresql import asyncpg
+from datetime import datetime, timezone
+import uuid
+
+import pytest
+
+from app.core.pagination import encode_cursor, keyset_condition, keyset_paginate
+from app.models.models import Appointment, Notification, Patient
+from app.services.doctor_service import DoctorService
+
+
+def test_keyset_walks_rows_created_in_same_second(db):
+    """created_at из server_default (без микросекунд): все страницы проходятся и обход заканчивается"""
+    recipient_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(7)]
+    db.execute(
+        Notification.__table__.insert(),
+        [
+            {
+                "id": notification_id,
+                "title": "Тест",
+                "message": "Тест",
+                "type": "info",
+                "recipient_id": recipient_id,
+                "recipient_type": "patient",
+                "is_read": False
+            }
+            for notification_id in ids
+        ]
+    )
+    db.commit()
+    
+    try:
+        query = db.query(Notification).filter(Notification.recipient_id == recipient_id)
+        columns = [Notification.created_at, Notification.id]
+        
+        seen = []
+        cursor = None
+        for _ in range(len(ids) + 1):
+            page = keyset_paginate(query, columns, limit=3, cursor=cursor, descending=True)
+            seen.extend(notification.id for notification in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        
+        assert cursor is None
+        assert seen == sorted(ids, reverse=True)
+    finally:
+        db.query(Notification).filter(Notification.recipient_id == recipient_id).delete()
+        db.commit()
+
+
+def test_keyset_condition_compares_typed_datetime_on_postgresql():
+    """На PostgreSQL курсор по дате сравнивается с timestamp, а не с varchar"""
+    columns = [Notification.created_at, Notification.id]
+    cursor = encode_cursor([datetime(2026, 10, 18, 10, 0, 0, tzinfo=timezone.utc), "id"])
+    
+    condition = keyset_condition(columns, cursor, "postgresql", descending=True)
+    compiled = condition.compile(dialect=asyncpg.dialect())
+    
+    assert str(compiled).startswith("(notifications.created_at, notifications.id) < ($1::TIMESTAMP WITH TIME ZONE,")
+    assert datetime(2026, 10, 18, 10, 0, 0, tzinfo=timezone.utc) in compiled.params.values()
+
+
+def test_doctor_patients_walk_by_cursor(db):
+    """Агрегированный список пациентов врача проходится курсором по ID пациента"""
+    doctor_id = str(uuid.uuid4())
+    patient_ids = [str(uuid.uuid4()) for _ in range(5)]
+    db.execute(
+        Patient.__table__.insert(),
+        [
+            {
+                "id": patient_id,
+                "first_name": "Тест",
+                "last_name": f"Пациент {index}",
+                "date_of_birth": "1980-01-01",
+                "gender": "other",
+                "email": f"{patient_id}@example.com",
+                "phone": "+70000000000",
+                "is_active": True
+            }
+            for index, patient_id in enumerate(patient_ids)
+        ]
+    )
+    db.execute(
+        Appointment.__table__.insert(),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "patient_id": patient_id,
+                "doctor_id": doctor_id,
+                "date": f"2099-03-0{day}",
+                "time": "10:00",
+                "type": "consultation",
+                "status": "scheduled"
+            }
+            for patient_id in patient_ids
+            for day in (1, 2)
+        ]
+    )
+    db.commit()
+    
+    service = DoctorService(db)
+    try:
+        seen = []
+        cursor = None
+        for _ in range(len(patient_ids)):
+            page = service.get_doctor_patients(doctor_id, limit=2, cursor=cursor)
+            seen.extend(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        
+        assert cursor is None
+        assert [patient["id"] for patient in seen] == sorted(patient_ids)
+        assert {(patient["appointment_count"], patient["last_appointment"]) for patient in seen} == {(2, "2099-03-02")}
+        
+        with pytest.raises(ValueError):
+            service.get_doctor_patients(doctor_id, cursor="не курсор")
+    finally:
+        db.query(Appointment).filter(Appointment.doctor_id == doctor_id).delete(synchronize_session=False)
+        db.query(Patient).filter(Patient.id.in_(patient_ids)).delete(synchronize_session=False)
+        db.commit()
@@ -0,0 +1,118 @@
+from datetime import date, datetime
+import csv
+import gzip
+import io
+import json
+import uuid
+
+import pytest
+
+from app.models.models import Appointment, HealthData, Patient
+from app.services.patient_export_service import EXPORT_SECTIONS, PatientExportService, stream_patient_export
+
+DATE_FROM = date(2099, 3, 1)
+DATE_TO = date(2099, 3, 31)
+
+
+@pytest.fixture
+def patient_id(db):
+    """Пациент с двумя показателями и назначением; медицинских записей нет"""
+    patient_id = str(uuid.uuid4())
+    db.execute(Patient.__table__.insert(), {
+        "id": patient_id,
+        "first_name": "Тест",
+        "last_name": "Экспорт",
+        "date_of_birth": "1980-01-01",
+        "gender": "other",
+        "email": f"{patient_id}@example.com",
+        "phone": "+70000000000",
+        "allergies": ["пыльца"],
+        "is_active": True
+    })
+    db.execute(HealthData.__table__.insert(), [
+        {"id": str(uuid.uuid4()), "patient_id": patient_id, "heart_rate": 70, "recorded_at": datetime(2099, 3, 2, 8, 0)},
+        {"id": str(uuid.uuid4()), "patient_id": patient_id, "heart_rate": 75, "recorded_at": datetime(2099, 3, 3, 8, 0)},
+        # Вне периода
+        {"id": str(uuid.uuid4()), "patient_id": patient_id, "heart_rate": 80, "recorded_at": datetime(2099, 4, 1, 8, 0)}
+    ])
+    db.execute(Appointment.__table__.insert(), {
+        "id": str(uuid.uuid4()),
+        "patient_id": patient_id,
+        "doctor_id": str(uuid.uuid4()),
+        "date": "2099-03-10",
+        "time": "10:00",
+        "type": "consultation",
+        "status": "scheduled"
+    })
+    db.commit()
+    
+    yield patient_id
+    
+    db.query(HealthData).filter(HealthData.patient_id == patient_id).delete(synchronize_session=False)
+    db.query(Appointment).filter(Appointment.patient_id == patient_id).delete(synchronize_session=False)
+    db.query(Patient).filter(Patient.id == patient_id).delete(synchronize_session=False)
+    db.commit()
+
+
+def _export(patient_id, format, compress=False, date_from=DATE_FROM, date_to=DATE_TO):
+    data = b"".join(stream_patient_export(patient_id, format, date_from, date_to, compress=compress))
+    return (gzip.decompress(data) if compress else data).decode("utf-8")
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_json_export(patient_id, compress):
+    document = json.loads(_export(patient_id, "json", compress))
+    
+    assert document["patient"]["id"] == patient_id
+    assert document["patient"]["allergies"] == ["пыльца"]
+    assert document["period"] == {"from": "2099-03-01", "to": "2099-03-31"}
+    assert [record["heart_rate"] for record in document["health_data"]] == [70, 75]
+    assert [record["date"] for record in document["appointments"]] == ["2099-03-10"]
+    assert document["medical_records"] == []
+
+
+def test_json_export_with_all_sections_empty(patient_id):
+    document = json.loads(_export(patient_id, "json", date_from=date(2098, 1, 1), date_to=date(2098, 1, 31)))
+    
+    assert document["patient"]["id"] == patient_id
+    assert {section: document[section] for section in EXPORT_SECTIONS} == {section: [] for section in EXPORT_SECTIONS}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_ndjson_export(patient_id, compress):
+    records = [json.loads(line) for line in _export(patient_id, "ndjson", compress).splitlines()]
+    
+    assert [record["record_type"] for record in records] == ["patient", "health_data", "health_data", "appointments"]
+    assert records[0]["id"] == patient_id
+    assert records[2]["heart_rate"] == 75
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_csv_export(patient_id, compress):
+    rows = list(csv.DictReader(io.StringIO(_export(patient_id, "csv", compress))))
+    
+    assert [row["record_type"] for row in rows] == ["patient", "health_data", "health_data", "appointments"]
+    assert json.loads(rows[0]["allergies"]) == ["пыльца"]
+    assert rows[1]["heart_rate"] == "70"
+    assert rows[3]["time"] == "10:00"
+    assert rows[3]["heart_rate"] == ""
+
+
+def test_export_of_missing_patient_is_empty_document():
+    document = json.loads(_export(str(uuid.uuid4()), "json"))
+    
+    assert document["patient"] is None
+    assert all(document[section] == [] for section in EXPORT_SECTIONS)
+
+
+@pytest.mark.parametrize("current, following, expected", [
+    (None, "health_data", ',"health_data":['),
+    (None, "medical_records", ',"health_data":[],"appointments":[],"medical_records":['),
+    ("health_data", "appointments", '],"appointments":['),
+    ("health_data", "medical_records", '],"appointments":[],"medical_records":['),
+    ("appointments", None, '],"medical_records":[]'),
+    ("medical_records", None, ']'),
+    (None, None, ',"health_data":[],"appointments":[],"medical_records":[]')
+])
+def test_open_sections(current, following, expected):
+    assert PatientExportService(None)._open_sections(current, following) == expected
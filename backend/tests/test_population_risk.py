@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.api import api_router
+from app.models.models import HealthData, Patient, PatientRiskScore
+from app.services.population_risk_service import PopulationRiskService
+
+
+def _add_patient(db, is_active=True):
+    patient_id = str(uuid.uuid4())
+    db.execute(Patient.__table__.insert(), {
+        "id": patient_id,
+        "first_name": "Тест",
+        "last_name": "Риск",
+        "date_of_birth": "1980-01-01",
+        "gender": "other",
+        "email": f"{patient_id}@example.com",
+        "phone": "+70000000000",
+        "is_active": is_active
+    })
+    return patient_id
+
+
+def _add_reading(db, patient_id, days_ago, **values):
+    db.execute(HealthData.__table__.insert(), {
+        "id": str(uuid.uuid4()),
+        "patient_id": patient_id,
+        "recorded_at": datetime.utcnow() - timedelta(days=days_ago),
+        **values
+    })
+
+
+@pytest.fixture
+def patients(db):
+    """Пациенты с известными последними показаниями, по имени ожидаемого исхода"""
+    patients = {name: _add_patient(db) for name in ("high", "medium_5", "medium_3", "low", "minimal")}
+    patients["inactive"] = _add_patient(db, is_active=False)
+    
+    # 3 + 3: два критических значения
+    _add_reading(db, patients["high"], 1, heart_rate=160, blood_pressure_systolic=190)
+    # 3 + 1 + 1: критическое и два пограничных
+    _add_reading(db, patients["medium_5"], 1, heart_rate=160, blood_pressure_systolic=135, blood_pressure_diastolic=85)
+    # Учитывается последнее показание: прежнее нормальное, новое критическое
+    _add_reading(db, patients["medium_3"], 5, heart_rate=70)
+    _add_reading(db, patients["medium_3"], 1, heart_rate=35)
+    _add_reading(db, patients["low"], 1, blood_pressure_systolic=135)
+    # Прежнее критическое показание перекрыто нормальным
+    _add_reading(db, patients["minimal"], 5, heart_rate=160)
+    _add_reading(db, patients["minimal"], 1, heart_rate=70)
+    _add_reading(db, patients["inactive"], 1, heart_rate=160)
+    db.commit()
+    
+    yield patients
+    
+    ids = list(patients.values())
+    db.query(PatientRiskScore).filter(PatientRiskScore.patient_id.in_(ids)).delete(synchronize_session=False)
+    db.query(HealthData).filter(HealthData.patient_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Patient).filter(Patient.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
+
+
+def test_scores_levels_and_factors(db, patients):
+    assessments = {
+        assessment["patient_id"]: assessment
+        for assessment in PopulationRiskService(db).assess(list(patients.values()))
+    }
+    
+    assert patients["inactive"] not in assessments
+    assert {name: (assessments[patient_id]["risk_score"], assessments[patient_id]["risk_level"])
+            for name, patient_id in patients.items() if name != "inactive"} == {
+        "high": (6, "high"),
+        "medium_5": (5, "medium"),
+        "medium_3": (3, "medium"),
+        "low": (1, "low"),
+        "minimal": (0, "minimal")
+    }
+    
+    factors = assessments[patients["medium_5"]]["risk_factors"]
+    # Критические факторы первыми
+    assert (factors[0]["metric"], factors[0]["value"], factors[0]["severity"]) == ("heart_rate", 160.0, "high")
+    assert sorted((factor["metric"], factor["value"], factor["severity"]) for factor in factors[1:]) == [
+        ("blood_pressure_diastolic", 85.0, "medium"),
+        ("blood_pressure_systolic", 135.0, "medium")
+    ]
+    assert [factor["value"] for factor in assessments[patients["medium_3"]]["risk_factors"]] == [35.0]
+    assert assessments[patients["minimal"]]["risk_factors"] == []
+
+
+def test_top_risk_excludes_patients_deactivated_after_refresh(db, patients):
+    service = PopulationRiskService(db)
+    computed_at = datetime.utcnow()
+    db.execute(PatientRiskScore.__table__.insert(), [
+        {**assessment, "computed_at": computed_at}
+        for assessment in service.assess([patients["high"], patients["medium_3"]])
+    ])
+    db.query(Patient).filter(Patient.id == patients["medium_3"]).update({"is_active": False}, synchronize_session=False)
+    db.commit()
+    
+    top = [row["patient_id"] for row in service.get_top_risk(limit=500)]
+    assert patients["high"] in top
+    assert patients["medium_3"] not in top
+    assert [row["patient_id"] for row in service.get_top_risk("medium", limit=500) if row["patient_id"] in patients.values()] == []
+
+
+def test_risk_assessment_endpoint_reports_computed_at(db, patients):
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+    client = TestClient(app)
+    
+    # Таблица еще не пересчитывалась
+    assert db.query(PatientRiskScore).count() == 0
+    assert client.get("/api/v1/analytics/patients/risk-assessment").status_code == 503
+    
+    computed_at = datetime(2099, 3, 1, 12, 0)
+    db.execute(PatientRiskScore.__table__.insert(), [
+        {**assessment, "computed_at": computed_at}
+        for assessment in PopulationRiskService(db).assess([patients["high"]])
+    ])
+    db.commit()
+    
+    response = client.get("/api/v1/analytics/patients/risk-assessment", params={"risk_level": "high"})
+    assert response.status_code == 200
+    assert response.json()["computed_at"].startswith("2099-03-01T12:00:00")
+    assert [row["patient_id"] for row in response.json()["patients"]] == [patients["high"]]
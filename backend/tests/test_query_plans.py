@@ -0,0 +1,49 @@
+from sqlalchemy import and_, desc, text
+from datetime import datetime
+import pytest
+
+from app.models.models import Appointment, HealthData, MedicalRecord, Notification
+
+
+def query_plan(db, query) -> str:
+    """План SQLite (EXPLAIN QUERY PLAN) для запроса ORM с подставленными параметрами"""
+    sql = query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    return "\n".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+# Запросы сервисов по горячим колонкам и индексы миграции 0002, которые они должны использовать
+QUERY_SHAPES = {
+    "ix_appointments_doctor_date_time_status": lambda db: db.query(Appointment).filter(
+        and_(
+            Appointment.doctor_id == "doctor",
+            Appointment.date == "2026-10-18",
+            Appointment.status.in_(["scheduled", "confirmed"])
+        )
+    ).order_by(Appointment.time),
+    "ix_appointments_patient_date": lambda db: db.query(Appointment).filter(
+        Appointment.patient_id == "patient"
+    ).order_by(desc(Appointment.date)),
+    "ix_health_data_patient_recorded_at": lambda db: db.query(HealthData).filter(
+        and_(
+            HealthData.patient_id == "patient",
+            HealthData.recorded_at >= datetime(2026, 9, 18)
+        )
+    ).order_by(desc(HealthData.recorded_at)),
+    "ix_notifications_recipient_read_created": lambda db: db.query(Notification).filter(
+        and_(
+            Notification.recipient_id == "patient",
+            Notification.is_read == False
+        )
+    ).order_by(desc(Notification.created_at)),
+    "ix_medical_records_patient_date": lambda db: db.query(MedicalRecord).filter(
+        MedicalRecord.patient_id == "patient"
+    ).order_by(desc(MedicalRecord.date))
+}
+
+
+@pytest.mark.parametrize("index_name", sorted(QUERY_SHAPES))
+def test_query_uses_composite_index(db, index_name):
+    plan = query_plan(db, QUERY_SHAPES[index_name](db))
+    
+    assert f"USING INDEX {index_name}" in plan or f"USING COVERING INDEX {index_name}" in plan, plan
+    assert "USE TEMP B-TREE" not in plan, plan
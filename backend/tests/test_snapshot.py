@@ -0,0 +1,101 @@
+import uuid
+
+from app.core.snapshot import SnapshotHolder
+from app.models.models import Doctor, Organ
+from app.services.doctor_search_index import DoctorSearchIndexHolder
+from app.services.organ_catalog import OrganCatalogHolder
+
+
+class _InterleavedHolder(SnapshotHolder):
+    """Первая перестройка заканчивается после второй, начатой позже"""
+    
+    def __init__(self):
+        super().__init__()
+        self.built = []
+    
+    def build(self, db, version):
+        if version == 1:
+            self.reload(db)
+        self.built.append(version)
+        return f"snapshot {version}"
+
+
+def test_older_snapshot_does_not_replace_newer():
+    holder = _InterleavedHolder()
+    
+    assert holder.reload(None) == "snapshot 2"
+    assert holder.built == [2, 1]
+    assert holder.get(None) == "snapshot 2"
+
+
+class _ProbedHolder(SnapshotHolder):
+    """Снимок - сигнатура источника на момент построения"""
+    
+    def __init__(self, check_interval):
+        super().__init__(check_interval)
+        self.signature = 1
+    
+    def build(self, db, version):
+        return f"snapshot of {self.signature}"
+    
+    def probe(self, db):
+        return self.signature
+
+
+def test_snapshot_rebuilt_when_source_changes_elsewhere():
+    holder = _ProbedHolder(check_interval=0)
+    assert holder.get(None) == "snapshot of 1"
+    
+    # Запись в другом воркере: reload здесь не вызывался
+    holder.signature = 2
+    assert holder.get(None) == "snapshot of 2"
+
+
+def test_source_not_probed_within_check_interval():
+    holder = _ProbedHolder(check_interval=3600)
+    assert holder.get(None) == "snapshot of 1"
+    
+    holder.signature = 2
+    assert holder.get(None) == "snapshot of 1"
+
+
+def test_organ_catalog_sees_writes_of_other_workers(db):
+    # Два воркера - два снимка; запись идет мимо второго
+    writer, reader = OrganCatalogHolder(check_interval=0), OrganCatalogHolder(check_interval=0)
+    before = len(reader.get(db).organs)
+    
+    organ = Organ(
+        id=str(uuid.uuid4()), name="spleen", label="Селезенка",
+        position_x=0.6, position_y=0.4, width=0.05, height=0.05,
+    )
+    db.add(organ)
+    db.commit()
+    
+    try:
+        writer.reload(db)
+        assert len(reader.get(db).organs) == before + 1
+    finally:
+        db.delete(organ)
+        db.commit()
+
+
+def test_doctor_search_index_sees_updates_of_other_workers(db):
+    doctor = Doctor(
+        first_name="Анна", last_name="Соколова", specialization="Кардиолог",
+        email=f"{uuid.uuid4()}@example.com", phone="+70000000000", license_number=str(uuid.uuid4()),
+    )
+    db.add(doctor)
+    db.commit()
+    
+    try:
+        writer, reader = DoctorSearchIndexHolder(check_interval=0), DoctorSearchIndexHolder(check_interval=0)
+        assert [d["id"] for d in reader.get(db).by_specialization("кардиолог")] == [doctor.id]
+        
+        doctor.specialization = "Невролог"
+        db.commit()
+        writer.reload(db)
+        
+        assert reader.get(db).by_specialization("кардиолог") == []
+    finally:
+        db.delete(doctor)
+        db.commit()